@@ -1,7 +1,8 @@
 from django.contrib import admin
 from django.forms import BaseInlineFormSet
 from django.core.exceptions import ValidationError
-from .models import Category, Transaction, TransactionItem
+from .models import Category, ReportJob, Transaction, TransactionItem
+from .totals import deferred_totals
 
 
 class TransactionItemInline(admin.TabularInline):
@@ -27,8 +28,21 @@ class TransactionAdmin(admin.ModelAdmin):
     inlines = [TransactionItemInline]
     ordering = ('-date',)
 
+    def save_related(self, request, form, formsets, change):
+        # Itens editados no inline: total_amount recalculado numa única UPDATE
+        with deferred_totals():
+            super().save_related(request, form, formsets, change)
+
 
 @admin.register(TransactionItem)
 class TransactionItemAdmin(admin.ModelAdmin):
     list_display = ('transaction', 'category', 'amount')
-    list_filter = ('category',)
\ No newline at end of file
+    list_filter = ('category',)
+
+
+@admin.register(ReportJob)
+class ReportJobAdmin(admin.ModelAdmin):
+    list_display = ('report', 'user', 'status', 'created_at', 'finished_at')
+    list_filter = ('status', 'report')
+    readonly_fields = ('file_path', 'error', 'created_at', 'started_at', 'finished_at')
+    ordering = ('-created_at',)
\ No newline at end of file
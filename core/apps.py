@@ -4,3 +4,12 @@ from django.apps import AppConfig
 class CoreConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'core'
+
+    def ready(self):
+        # Registra os sinais que mantêm os consolidados mensais e o cache por usuário
+        from . import signals  # noqa: F401
+
+        # Log de consultas lentas em todas as conexões, inclusive fora das requisições
+        from django.db.backends.signals import connection_created
+        from .slow_queries import install
+        connection_created.connect(install, dispatch_uid='core.slow_queries')
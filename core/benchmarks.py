@@ -0,0 +1,263 @@
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from .models import Category, Transaction
+import math
+import time
+import tracemalloc
+
+
+def _get(url_name, **params):
+    def scenario(client, context):
+        return client.get(reverse(url_name), params)
+    return scenario
+
+
+def _report_filters(context):
+    return {'start_date': context['start_date'].isoformat(), 'end_date': context['end_date'].isoformat()}
+
+
+def _report(url_name, export_format=None):
+    def scenario(client, context):
+        params = _report_filters(context)
+        if export_format:
+            params['format'] = export_format
+        return client.get(reverse(url_name), params)
+    return scenario
+
+
+def _item_form_data(items, prefix='items'):
+    data = {
+        f'{prefix}-TOTAL_FORMS': str(len(items)),
+        f'{prefix}-INITIAL_FORMS': str(sum(1 for item in items if item.get('id'))),
+        f'{prefix}-MIN_NUM_FORMS': '0',
+        f'{prefix}-MAX_NUM_FORMS': '1000',
+    }
+    for index, item in enumerate(items):
+        for key, value in item.items():
+            data[f'{prefix}-{index}-{key}'] = value
+    return data
+
+
+def _create_transaction(client, context):
+    data = {'description': 'Benchmark', 'date': context['end_date'].isoformat()}
+    data.update(_item_form_data([
+        {'category': context['income'].pk, 'amount': '150.00'},
+        {'category': context['expense'].pk, 'amount': '42.50'},
+    ]))
+    return client.post(reverse('transaction_create'), data)
+
+
+def _update_transaction(client, context):
+    transaction = context['transaction']
+    data = {'description': transaction.description, 'date': transaction.date.isoformat()}
+    data.update(_item_form_data([
+        {'id': item.pk, 'transaction': transaction.pk, 'category': item.category_id, 'amount': str(item.amount)}
+        for item in transaction.items.all()
+    ]))
+    return client.post(reverse('transaction_update', args=[transaction.pk]), data)
+
+
+# Cenários medidos: nome -> função(client, contexto) que faz a requisição
+SCENARIOS = {
+    'dashboard': _get('dashboard'),
+    'report_transactions': _report('report_transactions'),
+    'report_transactions_pdf': _report('report_transactions', 'pdf'),
+    'report_transactions_by_category': _report('report_transactions_by_category'),
+    'report_transactions_by_category_pdf': _report('report_transactions_by_category', 'pdf'),
+    'report_transactions_by_month': _report('report_transactions_by_month'),
+    'report_transactions_by_month_pdf': _report('report_transactions_by_month', 'pdf'),
+    'transaction_list': _get('transaction_list'),
+    'transaction_list_search': _get('transaction_list', search='mercado'),
+    'transaction_list_dates': _get('transaction_list', start_date='2000-01-01', end_date='2100-12-31'),
+    'transaction_list_income': _get('transaction_list', type=Category.INCOME),
+    'transaction_list_expense': _get('transaction_list', type=Category.EXPENSE),
+    'transaction_create': _create_transaction,
+    'transaction_update': _update_transaction,
+}
+
+
+def scenario_context(user):
+    """
+    Dados usados pelos cenários: o período coberto pelo razão do usuário,
+    uma categoria de cada tipo e uma transação para editar
+    """
+    transactions = Transaction.objects.filter(owner=user)
+    first = transactions.order_by('date').first()
+    last = transactions.order_by('-date', '-id').first()
+    categories = Category.objects.filter(user=user)
+    return {
+        'start_date': first.date,
+        'end_date': last.date,
+        'income': categories.filter(type=Category.INCOME).first(),
+        'expense': categories.filter(type=Category.EXPENSE).first(),
+        'transaction': last,
+    }
+
+
+def percentile(values, percent):
+    """
+    Percentil pelo método do posto mais próximo
+    """
+    ordered = sorted(values)
+    rank = max(1, math.ceil(percent / 100 * len(ordered)))
+    return ordered[rank - 1]
+
+
+def _consume(response):
+    # Respostas em streaming (PDF, CSV) só fazem o trabalho ao serem lidas
+    if response.streaming:
+        for _ in response.streaming_content:
+            pass
+    response.close()
+
+
+def _request(scenario, client, context, warm_cache):
+    if not warm_cache:
+        cache.clear()
+    response = scenario(client, context)
+    _consume(response)
+    return response
+
+
+def measure_peak_memory(scenario, client, context, warm_cache=False):
+    """
+    Pico de memória alocada (bytes) durante uma requisição, incluindo a
+    leitura de respostas em streaming
+    """
+    tracemalloc.start()
+    try:
+        _request(scenario, client, context, warm_cache)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return peak
+
+
+def run_scenario(name, user, context, repeat=10, warmup=1, warm_cache=False):
+    """
+    Executa o cenário e devolve os percentis de tempo (ms), o número de
+    consultas e o pico de memória (KiB). A memória é medida em uma execução
+    à parte, porque o tracemalloc deixa o código bem mais lento.
+    """
+    scenario = SCENARIOS[name]
+    client = Client()
+    client.force_login(user)
+
+    for _ in range(warmup):
+        _request(scenario, client, context, warm_cache)
+
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        response = _request(scenario, client, context, warm_cache)
+        timings.append((time.perf_counter() - started) * 1000)
+
+    with CaptureQueriesContext(connection) as queries:
+        _request(scenario, client, context, warm_cache)
+    # Lido já, porque a próxima requisição esvazia o log de consultas
+    query_count = len(queries)
+
+    peak = measure_peak_memory(scenario, client, context, warm_cache)
+
+    return {
+        'status': response.status_code,
+        'p50_ms': round(percentile(timings, 50), 3),
+        'p90_ms': round(percentile(timings, 90), 3),
+        'p99_ms': round(percentile(timings, 99), 3),
+        'min_ms': round(min(timings), 3),
+        'max_ms': round(max(timings), 3),
+        'queries': query_count,
+        'peak_memory_kb': round(peak / 1024, 1),
+    }
+
+
+def compare_results(baseline, current, threshold=0.2, min_delta_ms=2.0):
+    """
+    Compara duas execuções (o conteúdo de 'results' do JSON) e retorna a
+    lista de regressões como (escala, cenário, métrica, antes, depois).
+    Tempo e memória regridem se piorarem mais que `threshold`; o tempo
+    também precisa piorar mais que `min_delta_ms` para não acusar ruído.
+    O número de consultas regride com qualquer aumento.
+    """
+    regressions = []
+    for scale, scenarios in current.items():
+        for name, result in scenarios.items():
+            before = baseline.get(scale, {}).get(name)
+            if before is None:
+                continue
+            if (result['p50_ms'] > before['p50_ms'] * (1 + threshold)
+                    and result['p50_ms'] - before['p50_ms'] > min_delta_ms):
+                regressions.append((scale, name, 'p50_ms', before['p50_ms'], result['p50_ms']))
+            if result['queries'] > before['queries']:
+                regressions.append((scale, name, 'queries', before['queries'], result['queries']))
+            if result['peak_memory_kb'] > before['peak_memory_kb'] * (1 + threshold):
+                regressions.append((scale, name, 'peak_memory_kb', before['peak_memory_kb'], result['peak_memory_kb']))
+    return regressions
+
+
+# Relatórios medidos no modo de memória e seus orçamentos de pico em KiB,
+# como (fixo, por mil itens do razão). Os agregados e os PDFs por categoria e
+# por mês não dependem do volume; a listagem HTML guarda as transações na
+# memória. No PDF de transações cada página pronta vai para disco e só fica
+# o seu registro no documento (~2,5 KiB por página de 35 linhas), então o
+# orçamento por mil itens falha se linhas ou páginas voltarem a se acumular.
+MEMORY_BUDGETS = {
+    'report_transactions': (1024, 5120),
+    'report_transactions_pdf': (768, 96),
+    'report_transactions_by_category': (512, 0),
+    'report_transactions_by_category_pdf': (1024, 0),
+    'report_transactions_by_month': (512, 0),
+    'report_transactions_by_month_pdf': (1024, 0),
+}
+
+# Expoente máximo de crescimento do pico entre duas escalas (1 = linear)
+MAX_MEMORY_GROWTH = 1.15
+
+
+def memory_budget_kb(name, items):
+    fixed, per_thousand = MEMORY_BUDGETS[name]
+    return fixed + per_thousand * items / 1000
+
+
+def run_memory_scenario(name, user, context, warmup=1):
+    """
+    Pico de memória (KiB) de um relatório com o cache vazio, depois de
+    `warmup` execuções para que importações e caches do processo não contem
+    """
+    scenario = SCENARIOS[name]
+    client = Client()
+    client.force_login(user)
+    for _ in range(warmup):
+        _request(scenario, client, context, warm_cache=False)
+    return round(measure_peak_memory(scenario, client, context) / 1024, 1)
+
+
+def memory_regressions(results, max_growth=MAX_MEMORY_GROWTH):
+    """
+    Verifica os picos medidos ({itens: {cenário: KiB}}) e retorna a lista de
+    problemas como (cenário, itens, descrição): pico acima do orçamento ou
+    crescendo mais rápido que o número de itens entre duas escalas
+    """
+    problems = []
+    scales = sorted(results)
+    for items in scales:
+        for name, peak_kb in results[items].items():
+            budget = memory_budget_kb(name, items)
+            if peak_kb > budget:
+                problems.append((name, items, f'pico de {peak_kb:.0f} KiB acima do orçamento de {budget:.0f} KiB'))
+    for smaller, larger in zip(scales, scales[1:]):
+        for name, peak_kb in results[larger].items():
+            before = results[smaller].get(name)
+            if not before:
+                continue
+            growth = math.log(peak_kb / before) / math.log(larger / smaller)
+            if growth > max_growth:
+                problems.append((
+                    name, larger,
+                    f'pico cresceu de {before:.0f} para {peak_kb:.0f} KiB com {smaller} -> {larger} itens '
+                    f'(expoente {growth:.2f} > {max_growth})'
+                ))
+    return problems
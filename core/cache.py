@@ -0,0 +1,106 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection, transaction
+from datetime import date
+from .metrics import CACHE_REQUESTS
+import functools
+import hashlib
+import time
+
+
+def _version_key(user_id):
+    return f'core:data-version:{user_id}'
+
+
+def _initial_version():
+    # Um valor novo a cada inicialização evita reaproveitar entradas antigas
+    # caso o contador seja descartado pelo backend de cache
+    return time.time_ns()
+
+
+def get_data_version(user_id):
+    """
+    Retorna o contador de versão dos dados do usuário
+    """
+    key = _version_key(user_id)
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, _initial_version(), timeout=None)
+        version = cache.get(key)
+    return version
+
+
+def _increment(user_id):
+    key = _version_key(user_id)
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, _initial_version(), timeout=None)
+
+
+def bump_data_version(user_id):
+    """
+    Invalida todos os resultados em cache do usuário.
+    Dentro de uma transação do banco, incrementa de novo após o commit para que
+    leituras concorrentes feitas antes do commit não fiquem gravadas na versão nova.
+    """
+    if user_id is None:
+        return
+    _increment(user_id)
+    if connection.in_atomic_block:
+        transaction.on_commit(functools.partial(_increment, user_id))
+
+
+def _normalize(value):
+    if isinstance(value, date):
+        return value.isoformat()
+    if isinstance(value, (list, tuple)):
+        return [_normalize(item) for item in value]
+    if isinstance(value, dict):
+        return {str(key): _normalize(item) for key, item in sorted(value.items())}
+    if value in ('', 'None'):
+        return None
+    return value if value is None or isinstance(value, (int, float)) else str(value)
+
+
+def make_cache_key(namespace, user_id, params):
+    """
+    Monta a chave a partir do usuário, dos parâmetros normalizados e da
+    versão atual dos dados do usuário
+    """
+    digest = hashlib.md5(repr(_normalize(params)).encode()).hexdigest()
+    return f'core:{namespace}:{user_id}:{get_data_version(user_id)}:{digest}'
+
+
+def get_or_compute(user, namespace, params, compute):
+    """
+    Retorna o resultado em cache para o usuário ou o calcula e armazena
+    """
+    user_id = getattr(user, 'pk', user)
+    key = make_cache_key(namespace, user_id, params)
+    result = cache.get(key)
+    if result is None:
+        CACHE_REQUESTS.inc(namespace=namespace, result='miss')
+        result = compute()
+        cache.set(key, result, getattr(settings, 'FINANCE_CACHE_TIMEOUT', 60 * 60))
+    else:
+        CACHE_REQUESTS.inc(namespace=namespace, result='hit')
+    return result
+
+
+def cached_per_user(namespace):
+    """
+    Decorador para funções cujo primeiro argumento é o usuário dono dos dados
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(user, *args, **kwargs):
+            return get_or_compute(
+                user,
+                namespace,
+                [args, kwargs],
+                lambda: func(user, *args, **kwargs),
+            )
+        wrapper.uncached = func
+        return wrapper
+    return decorator
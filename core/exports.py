@@ -0,0 +1,62 @@
+from django.http import StreamingHttpResponse
+from datetime import date
+from decimal import Decimal
+import csv
+import json
+
+
+EXPORT_FORMATS = {
+    'csv': 'text/csv; charset=utf-8',
+    'ndjson': 'application/x-ndjson; charset=utf-8',
+}
+
+
+class _Echo:
+    """
+    Pseudo-buffer para o csv.writer: devolve a linha formatada em vez de guardá-la
+    """
+
+    def write(self, value):
+        return value
+
+
+def _json_default(value):
+    if isinstance(value, Decimal):
+        return str(value)
+    if isinstance(value, date):
+        return value.isoformat()
+    raise TypeError(f'Tipo não serializável: {type(value).__name__}')
+
+
+def csv_lines(header, rows):
+    """
+    Gera as linhas do CSV uma a uma, começando pelo cabeçalho
+    """
+    writer = csv.writer(_Echo())
+    # BOM para o Excel reconhecer o arquivo como UTF-8
+    yield '\ufeff' + writer.writerow(header)
+    for row in rows:
+        yield writer.writerow(row)
+
+
+def ndjson_lines(fields, rows):
+    """
+    Gera um objeto JSON por linha com as chaves `fields`
+    """
+    for row in rows:
+        yield json.dumps(dict(zip(fields, row)), default=_json_default, ensure_ascii=False) + '\n'
+
+
+def export_response(export_format, filename, columns, rows):
+    """
+    Resposta em streaming no formato pedido. `columns` é uma lista de pares
+    (campo, título): o título vai no cabeçalho do CSV e o campo nas chaves do NDJSON.
+    """
+    if export_format == 'csv':
+        content = csv_lines([title for _, title in columns], rows)
+    else:
+        content = ndjson_lines([field for field, _ in columns], rows)
+
+    response = StreamingHttpResponse(content, content_type=EXPORT_FORMATS[export_format])
+    response['Content-Disposition'] = f'attachment; filename="{filename}.{export_format}"'
+    return response
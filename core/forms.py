@@ -1,6 +1,7 @@
 from django import forms
-from django.forms import inlineformset_factory
+from django.forms import BaseInlineFormSet, inlineformset_factory
 from .models import Transaction, TransactionItem, Category
+from .imports import IMPORT_FORMATS
 from decimal import Decimal
 from django.utils import timezone
 
@@ -41,9 +42,12 @@ class TransactionItemForm(forms.ModelForm):
 
     def __init__(self, *args, **kwargs):
         user = kwargs.pop('user', None)
+        category_choices = kwargs.pop('category_choices', None)
         super().__init__(*args, **kwargs)
         if user:
             self.fields['category'].queryset = Category.objects.filter(user=user)
+        if category_choices is not None:
+            self.fields['category'].choices = category_choices
 
     def clean_amount(self):
         amount = self.cleaned_data.get('amount')
@@ -52,11 +56,66 @@ class TransactionItemForm(forms.ModelForm):
         return amount
 
 
+class BaseTransactionItemFormSet(BaseInlineFormSet):
+    """
+    As opções de categoria são lidas uma vez e compartilhadas por todos os
+    formulários do formset, em vez de uma consulta por item
+    """
+    _category_choices = None
+
+    def get_form_kwargs(self, index):
+        kwargs = super().get_form_kwargs(index)
+        user = kwargs.get('user')
+        if user:
+            if self._category_choices is None:
+                field = forms.ModelChoiceField(queryset=Category.objects.filter(user=user))
+                # Sem list(): ele chamaria len() no iterador, que faz um COUNT
+                self._category_choices = [choice for choice in field.choices]
+            kwargs['category_choices'] = self._category_choices
+        return kwargs
+
+
 # Cria o formset inline para TransactionItem
 TransactionItemFormSet = inlineformset_factory(
     Transaction, 
     TransactionItem, 
     form=TransactionItemForm,
+    formset=BaseTransactionItemFormSet,
     extra=1,
     can_delete=True
-)
\ No newline at end of file
+)
+
+
+class TransactionImportForm(forms.Form):
+    FORMAT_CHOICES = [('', 'Detectar pela extensão')] + [(value, value.upper()) for value in IMPORT_FORMATS]
+
+    file = forms.FileField(
+        label='Extrato (CSV ou OFX)',
+        widget=forms.ClearableFileInput(attrs={'class': 'form-control', 'accept': '.csv,.ofx'})
+    )
+    format = forms.ChoiceField(
+        label='Formato',
+        choices=FORMAT_CHOICES,
+        required=False,
+        widget=forms.Select(attrs={'class': 'form-select'})
+    )
+    income_category = forms.ModelChoiceField(
+        label='Categoria para créditos sem categoria',
+        queryset=Category.objects.none(),
+        required=False,
+        widget=forms.Select(attrs={'class': 'form-select'})
+    )
+    expense_category = forms.ModelChoiceField(
+        label='Categoria para débitos sem categoria',
+        queryset=Category.objects.none(),
+        required=False,
+        widget=forms.Select(attrs={'class': 'form-select'})
+    )
+
+    def __init__(self, *args, **kwargs):
+        user = kwargs.pop('user', None)
+        super().__init__(*args, **kwargs)
+        if user:
+            categories = Category.objects.filter(user=user)
+            self.fields['income_category'].queryset = categories.filter(type=Category.INCOME)
+            self.fields['expense_category'].queryset = categories.filter(type=Category.EXPENSE)
\ No newline at end of file
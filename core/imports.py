@@ -0,0 +1,295 @@
+from django.db import transaction
+from .cache import bump_data_version
+from .models import Category, Transaction, TransactionItem
+from .rollups import apply_balance_delta, apply_delta
+from .totals import refresh_totals
+from collections import defaultdict
+from datetime import date, datetime
+from decimal import Decimal, InvalidOperation
+import codecs
+import csv
+import html
+import io
+import itertools
+import re
+import unicodedata
+
+
+IMPORT_FORMATS = ('csv', 'ofx')
+
+IMPORT_BATCH_SIZE = 1000
+
+# Erros guardados no resultado; os demais são apenas contados
+MAX_REPORTED_ERRORS = 50
+
+DESCRIPTION_MAX_LENGTH = Transaction._meta.get_field('description').max_length
+
+# Cabeçalhos aceitos no CSV (sem acentos, em minúsculas) para cada campo
+CSV_COLUMNS = {
+    'date': ('data', 'date', 'data lancamento', 'data do lancamento'),
+    'description': ('descricao', 'description', 'historico', 'lancamento', 'memo'),
+    'amount': ('valor', 'amount', 'valor (r$)'),
+    'category': ('categoria', 'category'),
+}
+
+_OFX_TAG = re.compile(r'<(/?)([A-Za-z0-9.]+)>([^<]*)')
+_OFX_READ_SIZE = 64 * 1024
+
+
+class StatementError(ValueError):
+    """
+    Arquivo que não pode ser lido como extrato (formato ou cabeçalho inválido)
+    """
+
+
+def _normalize(text):
+    text = unicodedata.normalize('NFKD', text.strip().casefold())
+    return ''.join(char for char in text if not unicodedata.combining(char))
+
+
+def parse_amount(text):
+    """
+    Aceita valores como "1234.56", "-1.234,56" ou "R$ 50,00"
+    """
+    value = text.replace('R$', '').replace(' ', '').replace('\xa0', '')
+    if ',' in value and '.' in value:
+        # O separador que aparece por último é o decimal
+        if value.rfind(',') > value.rfind('.'):
+            value = value.replace('.', '').replace(',', '.')
+        else:
+            value = value.replace(',', '')
+    else:
+        value = value.replace(',', '.')
+    try:
+        return Decimal(value).quantize(Decimal('0.01'))
+    except InvalidOperation:
+        raise ValueError(f'Valor inválido: {text!r}')
+
+
+def parse_statement_date(text):
+    """
+    Aceita AAAA-MM-DD, DD/MM/AAAA e o formato do OFX (AAAAMMDD[hhmmss...])
+    """
+    value = text.strip()
+    try:
+        return date.fromisoformat(value[:10])
+    except ValueError:
+        pass
+    for pattern, size in (('%d/%m/%Y', 10), ('%Y%m%d', 8)):
+        try:
+            return datetime.strptime(value[:size], pattern).date()
+        except ValueError:
+            continue
+    raise ValueError(f'Data inválida: {text!r}')
+
+
+def csv_rows(stream, encoding='utf-8-sig'):
+    """
+    Lê o CSV linha a linha. Gera (linha, data, descrição, valor, categoria)
+    com os textos brutos; a categoria é None se a coluna não existir.
+    """
+    text = io.TextIOWrapper(stream, encoding=encoding, newline='')
+    header_line = text.readline()
+    delimiter = ';' if header_line.count(';') > header_line.count(',') else ','
+    reader = csv.reader(itertools.chain([header_line], text), delimiter=delimiter)
+
+    header = [_normalize(name) for name in next(reader, [])]
+    positions = {}
+    for field, aliases in CSV_COLUMNS.items():
+        for index, name in enumerate(header):
+            if name in aliases:
+                positions[field] = index
+                break
+    missing = [field for field in ('date', 'description', 'amount') if field not in positions]
+    if missing:
+        raise StatementError('Cabeçalho do CSV sem as colunas: ' + ', '.join(missing))
+
+    category_index = positions.get('category')
+    for row in reader:
+        if not any(cell.strip() for cell in row):
+            continue
+        try:
+            yield (
+                reader.line_num,
+                row[positions['date']],
+                row[positions['description']],
+                row[positions['amount']],
+                row[category_index] if category_index is not None else None,
+            )
+        except IndexError:
+            yield reader.line_num, None, None, None, None
+
+
+def _ofx_encoding(head):
+    head = head.upper()
+    if b'UTF-8' in head:
+        return 'utf-8'
+    if b'CHARSET:1252' in head:
+        return 'cp1252'
+    return 'utf-8'
+
+
+def _ofx_tags(stream, encoding=None):
+    """
+    Gera (fechamento, tag, valor) lendo o arquivo em blocos. Funciona tanto
+    com o OFX 1.x (SGML, tags sem fechamento) quanto com o 2.x (XML).
+    """
+    chunk = stream.read(_OFX_READ_SIZE)
+    decoder = codecs.getincrementaldecoder(encoding or _ofx_encoding(chunk[:1024]))()
+    buffer = ''
+    while chunk:
+        buffer += decoder.decode(chunk)
+        # Só processa tags cujo valor já terminou (há um '<' depois dele)
+        end = buffer.rfind('<')
+        for match in _OFX_TAG.finditer(buffer, 0, max(end, 0)):
+            yield match.group(1) == '/', match.group(2).upper(), match.group(3).strip()
+        buffer = buffer[max(end, 0):]
+        chunk = stream.read(_OFX_READ_SIZE)
+    buffer += decoder.decode(b'', final=True)
+    for match in _OFX_TAG.finditer(buffer):
+        yield match.group(1) == '/', match.group(2).upper(), match.group(3).strip()
+
+
+def ofx_rows(stream, encoding=None):
+    """
+    Gera (número da transação, data, descrição, valor, None) para cada
+    <STMTTRN> do extrato OFX
+    """
+    current = None
+    number = 0
+    for closing, tag, value in _ofx_tags(stream, encoding):
+        if tag == 'STMTTRN':
+            if closing and current is not None:
+                yield (
+                    number,
+                    current.get('DTPOSTED', ''),
+                    current.get('MEMO') or current.get('NAME', ''),
+                    current.get('TRNAMT', ''),
+                    None,
+                )
+                current = None
+            elif not closing:
+                number += 1
+                current = {}
+        elif current is not None and not closing and value:
+            current[tag] = html.unescape(value)
+
+
+def detect_format(filename):
+    return 'ofx' if filename.lower().endswith('.ofx') else 'csv'
+
+
+def statement_rows(stream, import_format, encoding=None):
+    if import_format == 'ofx':
+        return ofx_rows(stream, encoding)
+    return csv_rows(stream, encoding or 'utf-8-sig')
+
+
+def bulk_create_transactions(pending, batch_size=IMPORT_BATCH_SIZE):
+    """
+    Grava uma lista de pares (transação, [itens]) com dois bulk_create e a
+    esvazia; os totais das transações saem de uma UPDATE sobre os itens gravados.
+    Não dispara sinais: consolidados e cache ficam por conta de quem chama.
+    """
+    transactions = Transaction.objects.bulk_create(
+        [transaction_obj for transaction_obj, _ in pending], batch_size=batch_size
+    )
+    items = []
+    for transaction_obj, (_, transaction_items) in zip(transactions, pending):
+        for item in transaction_items:
+            item.transaction_id = transaction_obj.pk
+            items.append(item)
+    TransactionItem.objects.bulk_create(items, batch_size=batch_size)
+    refresh_totals(transaction_obj.pk for transaction_obj in transactions)
+    pending.clear()
+
+
+def import_transactions(user, rows, income_category=None, expense_category=None,
+                        batch_size=IMPORT_BATCH_SIZE):
+    """
+    Importa as linhas do extrato como transações de um item, gravando em lotes
+    com bulk_create dentro de uma única transação do banco.
+
+    A categoria de cada linha vem da coluna de categoria (pelo nome, entre as
+    categorias do usuário) ou, na falta dela, de `income_category` para valores
+    positivos e de `expense_category` para negativos. Linhas inválidas, inclusive
+    as cujo sinal do valor contradiz o tipo da categoria informada, são
+    ignoradas e relatadas em `errors`.
+
+    Como bulk_create não dispara sinais, os consolidados mensais e os saldos
+    de fechamento são atualizados ao final e o cache do usuário é invalidado.
+    """
+    categories = {_normalize(category.name): category for category in Category.objects.filter(user=user)}
+    result = {'created': 0, 'error_count': 0, 'errors': []}
+    rollup_deltas = defaultdict(lambda: [Decimal('0'), 0])
+    balance_deltas = defaultdict(Decimal)
+    pending = []
+
+    def reject(line, message):
+        result['error_count'] += 1
+        if len(result['errors']) < MAX_REPORTED_ERRORS:
+            result['errors'].append((line, message))
+
+    with transaction.atomic():
+        for line, raw_date, raw_description, raw_amount, raw_category in rows:
+            if raw_date is None:
+                reject(line, 'Linha com colunas faltando')
+                continue
+            try:
+                day = parse_statement_date(raw_date)
+                amount = parse_amount(raw_amount)
+            except ValueError as exc:
+                reject(line, str(exc))
+                continue
+
+            description = ' '.join(raw_description.split())[:DESCRIPTION_MAX_LENGTH]
+            if not description:
+                reject(line, 'Descrição vazia')
+                continue
+            if not amount:
+                reject(line, 'Valor zerado')
+                continue
+
+            if raw_category and raw_category.strip():
+                category = categories.get(_normalize(raw_category))
+                if category is None:
+                    reject(line, f'Categoria não encontrada: {raw_category.strip()}')
+                    continue
+                if (amount > 0) != (category.type == Category.INCOME):
+                    sign = 'positivo' if amount > 0 else 'negativo'
+                    reject(line, f'Valor {sign} não combina com a categoria {category.name}')
+                    continue
+            else:
+                category = income_category if amount > 0 else expense_category
+                if category is None:
+                    reject(line, 'Sem categoria para o lançamento')
+                    continue
+
+            amount = abs(amount)
+            item = TransactionItem(category_id=category.pk, amount=amount)
+            item.set_entry_type(category.type)
+            pending.append((
+                Transaction(description=description, date=day, owner_id=user.pk),
+                [item],
+            ))
+            delta = rollup_deltas[(day.year, day.month, category.pk)]
+            delta[0] += amount
+            delta[1] += 1
+            balance_deltas[(day.year, day.month)] += item.signed_amount
+            result['created'] += 1
+
+            if len(pending) >= batch_size:
+                bulk_create_transactions(pending, batch_size)
+
+        if pending:
+            bulk_create_transactions(pending, batch_size)
+
+        for (year, month, category_id), (total, count) in rollup_deltas.items():
+            apply_delta(user.pk, date(year, month, 1), category_id, total, count)
+        for (year, month), balance in sorted(balance_deltas.items()):
+            apply_balance_delta(user.pk, date(year, month, 1), balance)
+
+        if result['created']:
+            bump_data_version(user.pk)
+
+    return result
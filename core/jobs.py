@@ -0,0 +1,111 @@
+from concurrent.futures import ThreadPoolExecutor
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.utils import timezone
+from .metrics import registry
+from .models import ReportJob
+from .pdf import build_pdf
+from .reports import REPORTS
+from pathlib import Path
+import logging
+import os
+import threading
+
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=getattr(settings, 'REPORT_JOB_WORKERS', 2),
+                thread_name_prefix='report-job',
+            )
+        return _executor
+
+
+def report_jobs_dir():
+    path = Path(getattr(settings, 'REPORT_JOBS_DIR', Path(settings.BASE_DIR) / 'report_jobs'))
+    path.mkdir(parents=True, exist_ok=True)
+    return path
+
+
+def submit_report_job(user, report, params):
+    """
+    Registra a tarefa e, se configurado, agenda sua execução no pool de threads
+    do próprio processo após o commit. Caso contrário a tarefa fica pendente
+    até ser processada pelo comando run_report_jobs.
+    """
+    job = ReportJob.objects.create(user=user, report=report, params=params)
+    if getattr(settings, 'REPORT_JOBS_IN_PROCESS', True):
+        transaction.on_commit(lambda: _get_executor().submit(_run_in_thread, job.pk))
+    return job
+
+
+def _run_in_thread(job_id):
+    close_old_connections()
+    try:
+        run_report_job(job_id)
+    finally:
+        # Cada thread abre sua própria conexão com o banco
+        close_old_connections()
+
+
+def run_report_job(job_id):
+    """
+    Gera o PDF de uma tarefa pendente. Retorna False se outra execução já a pegou.
+    """
+    claimed = ReportJob.objects.filter(pk=job_id, status=ReportJob.PENDING).update(
+        status=ReportJob.RUNNING,
+        started_at=timezone.now(),
+    )
+    if not claimed:
+        return False
+
+    job = ReportJob.objects.select_related('user').get(pk=job_id)
+    report = REPORTS[job.report](job.user, job.params)
+    path = report_jobs_dir() / f'{job.pk}.pdf'
+    partial_path = path.with_suffix('.pdf.part')
+
+    try:
+        with open(partial_path, 'wb') as output:
+            build_pdf(report.flowables(), output)
+        os.replace(partial_path, path)
+    except Exception as exc:
+        logger.exception('Falha ao gerar o relatório da tarefa %s', job.pk)
+        partial_path.unlink(missing_ok=True)
+        ReportJob.objects.filter(pk=job.pk).update(
+            status=ReportJob.FAILED,
+            error=str(exc),
+            finished_at=timezone.now(),
+        )
+        return True
+
+    ReportJob.objects.filter(pk=job.pk).update(
+        status=ReportJob.DONE,
+        file_path=str(path),
+        finished_at=timezone.now(),
+    )
+    return True
+
+
+def run_pending_jobs(limit=None):
+    """
+    Processa as tarefas pendentes em ordem de criação. Retorna quantas executou.
+    """
+    pending = ReportJob.objects.filter(status=ReportJob.PENDING).order_by('created_at', 'pk')
+    if limit:
+        pending = pending[:limit]
+
+    processed = 0
+    for job_id in list(pending.values_list('pk', flat=True)):
+        if run_report_job(job_id):
+            processed += 1
+    # Fora do servidor web ninguém mais grava as métricas deste processo
+    registry.flush(force=True)
+    return processed
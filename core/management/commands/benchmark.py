@@ -0,0 +1,198 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test.utils import setup_test_environment, teardown_test_environment
+from core.benchmarks import (
+    MEMORY_BUDGETS, SCENARIOS, compare_results, memory_budget_kb, memory_regressions,
+    run_memory_scenario, run_scenario, scenario_context,
+)
+from core.seeding import generate_user_ledger, seed_months, seed_username
+import django
+import json
+import math
+import platform
+import time
+
+
+class Command(BaseCommand):
+    help = (
+        'Mede as telas principais em conjuntos de dados de tamanhos crescentes '
+        'e grava os resultados em JSON (em um banco de teste separado)'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--scales',
+            default='20,200',
+            help='Transações por mês de cada conjunto de dados, separadas por vírgula (padrão: 20,200)'
+        )
+        parser.add_argument('--years', type=int, default=1, help='Anos de histórico (padrão: 1)')
+        parser.add_argument('--items-per-tx', type=int, default=3, help='Máximo de itens por transação (padrão: 3)')
+        parser.add_argument('--seed', type=int, default=42, help='Semente dos dados gerados (padrão: 42)')
+        parser.add_argument('--repeat', type=int, default=10, help='Execuções medidas por cenário (padrão: 10)')
+        parser.add_argument('--warmup', type=int, default=1, help='Execuções descartadas antes de medir (padrão: 1)')
+        parser.add_argument(
+            '--scenario',
+            action='append',
+            choices=sorted(SCENARIOS),
+            help='Cenário a medir (pode repetir; padrão: todos)'
+        )
+        parser.add_argument(
+            '--warm-cache',
+            action='store_true',
+            help='Mantém o cache entre as execuções (padrão: limpa antes de cada uma)'
+        )
+        parser.add_argument('--output', help='Arquivo JSON de saída')
+        parser.add_argument('--compare', help='JSON de uma execução anterior para comparar')
+        parser.add_argument(
+            '--threshold',
+            type=float,
+            default=0.2,
+            help='Piora relativa tolerada em tempo e memória (padrão: 0.2 = 20%%)'
+        )
+        parser.add_argument('--keepdb', action='store_true', help='Mantém o banco de teste ao final')
+        parser.add_argument(
+            '--memory',
+            action='store_true',
+            help='Mede só o pico de memória dos relatórios (HTML e PDF) e falha acima dos orçamentos '
+                 'ou com crescimento mais que linear'
+        )
+        parser.add_argument(
+            '--items',
+            default='1000,10000,100000',
+            help='Itens do razão em cada conjunto de dados no modo --memory (padrão: 1000,10000,100000)'
+        )
+
+    def handle(self, *args, **options):
+        scale_option = 'items' if options['memory'] else 'scales'
+        try:
+            scales = [int(scale) for scale in options[scale_option].split(',')]
+        except ValueError:
+            raise CommandError(f'--{scale_option} deve ser uma lista de inteiros separados por vírgula')
+        if options['repeat'] < 1 or any(scale < 1 for scale in scales):
+            raise CommandError(f'--repeat e --{scale_option} devem ser maiores que zero')
+
+        baseline = None
+        if options['compare']:
+            try:
+                with open(options['compare']) as baseline_file:
+                    baseline = json.load(baseline_file)['results']
+            except (OSError, ValueError, KeyError) as exc:
+                raise CommandError(f"Não foi possível ler {options['compare']}: {exc}")
+
+        months = seed_months(options['years'])
+
+        # Sem DEBUG, como em produção (e sem guardar todas as consultas)
+        setup_test_environment(debug=False)
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, keepdb=options['keepdb'])
+        try:
+            password_hash = make_password('123456')
+            if options['memory']:
+                results = self.measure_memory(scales, months, password_hash, options)
+            else:
+                results = self.measure_latency(scales, months, password_hash, options)
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0, keepdb=options['keepdb'])
+            teardown_test_environment()
+
+        if options['output']:
+            with open(options['output'], 'w') as output:
+                json.dump({
+                    'meta': {
+                        'created_at': time.strftime('%Y-%m-%dT%H:%M:%S'),
+                        'python': platform.python_version(),
+                        'django': django.get_version(),
+                        'database': connection.vendor,
+                        'options': {
+                            key: options[key]
+                            for key in (
+                                'scales', 'years', 'items_per_tx', 'seed', 'repeat', 'warmup', 'warm_cache',
+                                'memory', 'items',
+                            )
+                        },
+                    },
+                    'results': results,
+                }, output, indent=2)
+            self.stdout.write(self.style.SUCCESS(f"Resultados gravados em {options['output']}"))
+
+        if options['memory']:
+            problems = memory_regressions({
+                int(label): {name: result['peak_memory_kb'] for name, result in scenarios.items()}
+                for label, scenarios in results.items()
+            })
+            for name, items, problem in problems:
+                self.stdout.write(self.style.ERROR(f'{name} ({items} itens): {problem}'))
+            if problems:
+                raise CommandError(f'{len(problems)} problemas de memória', returncode=1)
+            self.stdout.write(self.style.SUCCESS('Picos de memória dentro dos orçamentos e com crescimento linear'))
+            return
+
+        if baseline is not None:
+            regressions = compare_results(baseline, results, threshold=options['threshold'])
+            for scale, name, metric, before, after in regressions:
+                self.stdout.write(self.style.ERROR(f'{scale} {name}: {metric} {before} -> {after}'))
+            if regressions:
+                raise CommandError(f'{len(regressions)} regressões em relação a {options["compare"]}', returncode=1)
+            self.stdout.write(self.style.SUCCESS('Nenhuma regressão em relação à execução anterior'))
+
+    def measure_latency(self, scales, months, password_hash, options):
+        results = {}
+        for scale in scales:
+            transactions, items = generate_user_ledger(
+                1, months, scale, options['items_per_tx'], options['seed'], password_hash
+            )
+            user = User.objects.get(username=seed_username(1))
+            context = scenario_context(user)
+            label = f'{scale}/mes'
+            self.stdout.write(self.style.MIGRATE_HEADING(
+                f'Escala {label}: {transactions} transações, {items} itens'
+            ))
+
+            results[label] = {}
+            for name in options['scenario'] or SCENARIOS:
+                result = run_scenario(
+                    name, user, context,
+                    repeat=options['repeat'],
+                    warmup=options['warmup'],
+                    warm_cache=options['warm_cache'],
+                )
+                result.update(transactions=transactions, items=items)
+                results[label][name] = result
+                self.stdout.write(
+                    f"  {name:<38} p50 {result['p50_ms']:>9.1f} ms  p90 {result['p90_ms']:>9.1f} ms  "
+                    f"{result['queries']:>4} consultas  {result['peak_memory_kb']:>9.1f} KiB"
+                )
+        return results
+
+    def measure_memory(self, scales, months, password_hash, options):
+        # Transações por mês para chegar perto do número de itens pedido,
+        # com (1 + items_per_tx) / 2 itens por transação em média
+        items_per_tx = (1 + options['items_per_tx']) / 2
+        results = {}
+        for target in scales:
+            tx_per_month = max(1, math.ceil(target / (len(months) * items_per_tx)))
+            transactions, items = generate_user_ledger(
+                1, months, tx_per_month, options['items_per_tx'], options['seed'], password_hash
+            )
+            user = User.objects.get(username=seed_username(1))
+            context = scenario_context(user)
+            self.stdout.write(self.style.MIGRATE_HEADING(
+                f'{target} itens: {transactions} transações, {items} itens'
+            ))
+
+            # O orçamento usa o número de itens realmente gerado
+            results[str(items)] = {}
+            for name in options['scenario'] or MEMORY_BUDGETS:
+                if name not in MEMORY_BUDGETS:
+                    continue
+                peak_kb = run_memory_scenario(name, user, context, warmup=options['warmup'])
+                budget_kb = memory_budget_kb(name, items)
+                results[str(items)][name] = {
+                    'transactions': transactions,
+                    'items': items,
+                    'peak_memory_kb': peak_kb,
+                    'budget_kb': round(budget_kb, 1),
+                }
+                self.stdout.write(f'  {name:<38} {peak_kb:>10.1f} KiB  (orçamento {budget_kb:>10.1f} KiB)')
+        return results
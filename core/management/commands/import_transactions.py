@@ -0,0 +1,87 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.contrib.auth.models import User
+from core.imports import (
+    IMPORT_BATCH_SIZE, IMPORT_FORMATS, StatementError, detect_format, import_transactions, statement_rows,
+)
+from core.models import Category
+import time
+
+
+class Command(BaseCommand):
+    help = 'Importa transações de um extrato bancário em CSV ou OFX'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Arquivo do extrato')
+        parser.add_argument('--user', required=True, help='Nome do usuário dono das transações')
+        parser.add_argument(
+            '--format',
+            choices=IMPORT_FORMATS,
+            help='Formato do arquivo (padrão: pela extensão)'
+        )
+        parser.add_argument(
+            '--encoding',
+            help='Codificação do arquivo (padrão: UTF-8 no CSV, o declarado no cabeçalho no OFX)'
+        )
+        parser.add_argument(
+            '--income-category',
+            help='Categoria de receita para lançamentos positivos sem categoria'
+        )
+        parser.add_argument(
+            '--expense-category',
+            help='Categoria de despesa para lançamentos negativos sem categoria'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=IMPORT_BATCH_SIZE,
+            help=f'Transações gravadas por lote (padrão: {IMPORT_BATCH_SIZE})'
+        )
+
+    def _category(self, user, name, category_type):
+        if not name:
+            return None
+        try:
+            return Category.objects.get(user=user, name=name, type=category_type)
+        except Category.DoesNotExist:
+            raise CommandError(f'Categoria não encontrada para {user.username}: {name}')
+
+    def handle(self, *args, **options):
+        try:
+            user = User.objects.get(username=options['user'])
+        except User.DoesNotExist:
+            raise CommandError(f"Usuário não encontrado: {options['user']}")
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size deve ser maior que zero')
+
+        income_category = self._category(user, options['income_category'], Category.INCOME)
+        expense_category = self._category(user, options['expense_category'], Category.EXPENSE)
+        import_format = options['format'] or detect_format(options['path'])
+
+        started = time.perf_counter()
+        try:
+            with open(options['path'], 'rb') as stream:
+                result = import_transactions(
+                    user,
+                    statement_rows(stream, import_format, options['encoding']),
+                    income_category=income_category,
+                    expense_category=expense_category,
+                    batch_size=options['batch_size'],
+                )
+        except OSError as exc:
+            raise CommandError(f'Não foi possível ler o arquivo: {exc}')
+        except (StatementError, UnicodeDecodeError) as exc:
+            raise CommandError(f'Extrato inválido: {exc}')
+        elapsed = time.perf_counter() - started
+
+        for line, message in result['errors']:
+            self.stdout.write(self.style.WARNING(f'Linha {line}: {message}'))
+        if result['error_count'] > len(result['errors']):
+            self.stdout.write(self.style.WARNING(
+                f"... e mais {result['error_count'] - len(result['errors'])} linhas com erro"
+            ))
+
+        rate = result['created'] / elapsed if elapsed else 0
+        self.stdout.write(self.style.SUCCESS(
+            f"{result['created']} transações importadas em {elapsed:.2f}s ({rate:.0f} linhas/s); "
+            f"{result['error_count']} linhas ignoradas"
+        ))
@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.contrib.auth.models import User
+from core.rollups import rebuild_rollups
+
+
+class Command(BaseCommand):
+    help = 'Recalcula os consolidados mensais por categoria e os saldos de fechamento a partir dos itens de transação'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--user',
+            help='Nome do usuário a reconstruir (padrão: todos os usuários)'
+        )
+
+    def handle(self, *args, **options):
+        user = None
+        if options['user']:
+            try:
+                user = User.objects.get(username=options['user'])
+            except User.DoesNotExist:
+                raise CommandError(f"Usuário não encontrado: {options['user']}")
+
+        rows = rebuild_rollups(user)
+
+        self.stdout.write(
+            self.style.SUCCESS(f'Consolidados mensais reconstruídos: {rows} linhas')
+        )
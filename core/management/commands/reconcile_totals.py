@@ -0,0 +1,81 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from core.money import to_decimal
+from core.totals import RECONCILE_BATCH_SIZE, reconcile_range, user_ranges
+from concurrent.futures import ProcessPoolExecutor
+import multiprocessing
+import time
+
+
+class Command(BaseCommand):
+    help = 'Confere e corrige o valor total das transações a partir dos itens, relatando as divergências'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=1,
+            help='Processos em paralelo, cada um com um intervalo de usuários (padrão: 1)'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=RECONCILE_BATCH_SIZE,
+            help=f'Transações conferidas por consulta (padrão: {RECONCILE_BATCH_SIZE})'
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Só relata as divergências, sem corrigir'
+        )
+
+    def handle(self, *args, **options):
+        for option in ('workers', 'batch_size'):
+            if options[option] < 1:
+                raise CommandError(f"--{option.replace('_', '-')} deve ser maior que zero")
+
+        workers = options['workers']
+        if workers > 1 and 'fork' not in multiprocessing.get_all_start_methods():
+            self.stdout.write(self.style.WARNING('Processos paralelos exigem fork; conferindo em um só processo'))
+            workers = 1
+
+        ranges = user_ranges(workers)
+        jobs = [
+            (first, last, options['batch_size'], options['dry_run'])
+            for first, last in ranges
+        ]
+
+        started = time.perf_counter()
+        if workers > 1 and len(jobs) > 1:
+            # Os processos filhos não podem herdar conexões abertas
+            connections.close_all()
+            with ProcessPoolExecutor(len(jobs), mp_context=multiprocessing.get_context('fork')) as executor:
+                results = list(self._report_ranges(jobs, executor.map(reconcile_range, *zip(*jobs))))
+        else:
+            results = list(self._report_ranges(jobs, (reconcile_range(*job) for job in jobs)))
+        elapsed = time.perf_counter() - started
+
+        checked = sum(result['checked'] for result in results)
+        drifted = sum(result['drifted'] for result in results)
+        drift = to_decimal(sum(result['drift_cents'] for result in results))
+        summary = (
+            f'{checked} transações conferidas em {elapsed:.1f}s, '
+            f'{drifted} com total divergente (R$ {drift:.2f} de diferença)'
+        )
+        if not drifted:
+            self.stdout.write(self.style.SUCCESS(summary))
+        elif options['dry_run']:
+            self.stdout.write(self.style.WARNING(f'{summary}; nada foi corrigido (--dry-run)'))
+        else:
+            self.stdout.write(self.style.SUCCESS(f'{summary}; totais corrigidos'))
+
+    def _report_ranges(self, jobs, results):
+        for job, result in zip(jobs, results):
+            self.stdout.write(
+                f"Usuários {job[0]}-{job[1]}: {result['checked']} transações, {result['drifted']} divergentes"
+            )
+            for pk, stored, expected in result['examples']:
+                self.stdout.write(
+                    f'    transação {pk}: R$ {to_decimal(stored):.2f} guardado, R$ {to_decimal(expected):.2f} pelos itens'
+                )
+            yield result
@@ -0,0 +1,36 @@
+from django.core.management.base import BaseCommand
+from core.jobs import run_pending_jobs
+import time
+
+
+class Command(BaseCommand):
+    help = 'Processa as tarefas de relatório pendentes'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--loop',
+            action='store_true',
+            help='Continua aguardando novas tarefas em vez de sair'
+        )
+        parser.add_argument(
+            '--interval',
+            type=float,
+            default=2.0,
+            help='Segundos entre verificações no modo --loop (padrão: 2)'
+        )
+        parser.add_argument(
+            '--limit',
+            type=int,
+            help='Número máximo de tarefas por verificação'
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            processed = run_pending_jobs(options['limit'])
+            if processed:
+                self.stdout.write(
+                    self.style.SUCCESS(f'Tarefas de relatório processadas: {processed}')
+                )
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
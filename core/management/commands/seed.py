@@ -1,15 +1,46 @@
-from django.core.management.base import BaseCommand
+from django.core.management.base import BaseCommand, CommandError
+from django.contrib.auth.hashers import make_password
 from django.contrib.auth.models import User
+from django.db import connections, transaction
 from core.models import Category, Transaction, TransactionItem
+from core.seeding import SEED_BATCH_SIZE, generate_entries, prepare_user, seed_months, seed_username, write_entries
+from concurrent.futures import ProcessPoolExecutor
 from django.utils import timezone
+import multiprocessing
 import random
+import time
 from decimal import Decimal
 
 
 class Command(BaseCommand):
     help = 'Preenche o banco de dados com dados de exemplo'
 
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--users',
+            type=int,
+            help='Modo em escala: gera o razão de N usuários (seed0001, seed0002, ...)'
+        )
+        parser.add_argument('--years', type=int, default=1, help='Anos de histórico por usuário (padrão: 1)')
+        parser.add_argument(
+            '--until',
+            help='Último mês gerado, AAAA-MM (padrão: o último mês completo)'
+        )
+        parser.add_argument('--tx-per-month', type=int, default=60, help='Transações por mês (padrão: 60)')
+        parser.add_argument('--items-per-tx', type=int, default=3, help='Máximo de itens por transação (padrão: 3)')
+        parser.add_argument('--seed', type=int, default=42, help='Semente do gerador aleatório (padrão: 42)')
+        parser.add_argument('--workers', type=int, default=1, help='Processos gerando usuários em paralelo')
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=SEED_BATCH_SIZE,
+            help=f'Transações gravadas por lote (padrão: {SEED_BATCH_SIZE})'
+        )
+
     def handle(self, *args, **options):
+        if options['users'] is not None:
+            return self.handle_scale(options)
+
         # Cria usuário demo
         if not User.objects.filter(username='demo').exists():
             user = User.objects.create_user(
@@ -62,58 +93,110 @@ class Command(BaseCommand):
         year = today.year
         month = today.month
 
-        # Exclui transações existentes do usuário demo no mês atual para evitar duplicatas
-        Transaction.objects.filter(
-            owner=user,
-            date__year=year,
-            date__month=month
-        ).delete()
-
-        # Cria 20 transações de exemplo
-        descriptions = [
-            'Compra no supermercado', 'Pagamento de conta de luz', 'Salário mensal',
-            'Consulta médica', 'Curso online', 'Cinema', 'Combustível',
-            'Restaurante', 'Compra de roupas', 'Hotéis', 'Viagem', 'Presente',
-            'Manutenção do carro', 'Internet', 'Telefone', 'Academia',
-            'Livros', 'Eletrônicos', 'Móveis', 'Decoração'
-        ]
-
-        for i in range(20):
-            # Data aleatória no mês atual
-            day = random.randint(1, 28)  # Evita problemas com fevereiro
-            date = timezone.datetime(year, month, day).date()
-
-            # Cria transação
-            transaction = Transaction.objects.create(
-                description=random.choice(descriptions),
-                date=date,
-                owner=user
-            )
-
-            # Cria 1-3 itens para esta transação
-            num_items = random.randint(1, 3)
-            total_amount = Decimal('0.00')
-
-            for j in range(num_items):
-                category = random.choice(categories)
-                amount = Decimal(random.randint(10, 500)) + Decimal(random.randint(0, 99)) / 100
-
-                TransactionItem.objects.create(
-                    transaction=transaction,
-                    category=category,
-                    amount=amount
+        # Grava tudo (transações, itens e consolidados dos sinais) em uma única transação do banco
+        with transaction.atomic():
+            # Exclui transações existentes do usuário demo no mês atual para evitar duplicatas
+            Transaction.objects.filter(
+                owner=user,
+                date__year=year,
+                date__month=month
+            ).delete()
+
+            # Cria 20 transações de exemplo
+            descriptions = [
+                'Compra no supermercado', 'Pagamento de conta de luz', 'Salário mensal',
+                'Consulta médica', 'Curso online', 'Cinema', 'Combustível',
+                'Restaurante', 'Compra de roupas', 'Hotéis', 'Viagem', 'Presente',
+                'Manutenção do carro', 'Internet', 'Telefone', 'Academia',
+                'Livros', 'Eletrônicos', 'Móveis', 'Decoração'
+            ]
+
+            for i in range(20):
+                # Data aleatória no mês atual
+                day = random.randint(1, 28)  # Evita problemas com fevereiro
+                date = timezone.datetime(year, month, day).date()
+
+                # Cria transação
+                tx = Transaction.objects.create(
+                    description=random.choice(descriptions),
+                    date=date,
+                    owner=user
                 )
 
-                # Calcula o valor total baseado no tipo da categoria
-                if category.type == Category.INCOME:
-                    total_amount += amount
-                else:
-                    total_amount -= amount
+                # Cria 1-3 itens para esta transação; o valor total é mantido pelos sinais
+                num_items = random.randint(1, 3)
 
-            # Atualiza o valor total da transação
-            transaction.total_amount = total_amount
-            transaction.save()
+                for j in range(num_items):
+                    category = random.choice(categories)
+                    amount = Decimal(random.randint(10, 500)) + Decimal(random.randint(0, 99)) / 100
+
+                    TransactionItem.objects.create(
+                        transaction=tx,
+                        category=category,
+                        amount=amount
+                    )
 
         self.stdout.write(
             self.style.SUCCESS('Banco de dados preenchido com sucesso com dados de exemplo')
-        )
\ No newline at end of file
+        )
+
+    def handle_scale(self, options):
+        """
+        Gera o razão de vários usuários com bulk_create. Com --workers, os
+        sorteios rodam em vários processos (um usuário por tarefa), mas só o
+        processo principal grava: o SQLite aceita um único escritor por vez
+        """
+        for option in ('users', 'years', 'tx_per_month', 'items_per_tx', 'workers', 'batch_size'):
+            if options[option] < 1:
+                raise CommandError(f"--{option.replace('_', '-')} deve ser maior que zero")
+        until = None
+        if options['until']:
+            try:
+                year, month = (int(part) for part in options['until'].split('-'))
+                if not 1 <= month <= 12:
+                    raise ValueError
+            except ValueError:
+                raise CommandError('--until deve estar no formato AAAA-MM')
+            until = (year, month)
+
+        months = seed_months(options['years'], until)
+        # O hash é caro (PBKDF2); calculado uma vez e reaproveitado por todos
+        password_hash = make_password('123456')
+        indexes = range(1, options['users'] + 1)
+
+        workers = options['workers']
+        if workers > 1 and 'fork' not in multiprocessing.get_all_start_methods():
+            self.stdout.write(self.style.WARNING('Processos paralelos exigem fork; gerando em um só processo'))
+            workers = 1
+
+        started = time.perf_counter()
+        users = [prepare_user(index, password_hash) for index in indexes]
+        jobs = [
+            (index, months, options['tx_per_month'], options['items_per_tx'], options['seed'], categories)
+            for index, (_, categories) in zip(indexes, users)
+        ]
+        if workers > 1:
+            # Os processos filhos só sorteiam e não podem herdar conexões abertas
+            connections.close_all()
+            with ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context('fork')) as executor:
+                generated = executor.map(generate_entries, *zip(*jobs))
+                results = list(self._write_users(indexes, users, generated, options['batch_size']))
+        else:
+            generated = (generate_entries(*job) for job in jobs)
+            results = list(self._write_users(indexes, users, generated, options['batch_size']))
+        elapsed = time.perf_counter() - started
+
+        transactions = sum(result[0] for result in results)
+        items = sum(result[1] for result in results)
+        rate = (transactions + items) / elapsed if elapsed else 0
+        self.stdout.write(self.style.SUCCESS(
+            f'{transactions} transações e {items} itens gerados para {len(results)} usuários '
+            f'em {elapsed:.1f}s ({rate:.0f} linhas/s). Senha dos usuários: 123456'
+        ))
+
+    def _write_users(self, indexes, users, generated, batch_size):
+        # Grava cada usuário assim que o seu sorteio fica pronto
+        for index, (user_id, _), entries in zip(indexes, users, generated):
+            result = write_entries(user_id, entries, batch_size)
+            self.stdout.write(f'{seed_username(index)}: {result[0]} transações, {result[1]} itens')
+            yield result
\ No newline at end of file
@@ -0,0 +1,34 @@
+from django.core.management.base import BaseCommand, CommandError
+from core.slow_queries import log_path, read_entries, summarize
+import textwrap
+
+
+class Command(BaseCommand):
+    help = 'Resume o log de consultas lentas agrupando por SQL normalizado, ordenado pelo tempo total'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--file', help='Log a resumir (padrão: SLOW_QUERY_LOG, com as cópias rotacionadas)')
+        parser.add_argument('--limit', type=int, default=10, help='Quantidade de consultas exibidas (padrão: 10)')
+        parser.add_argument('--width', type=int, default=160, help='Largura máxima do SQL exibido (padrão: 160)')
+
+    def handle(self, *args, **options):
+        path = options['file'] or log_path()
+        summary = summarize(read_entries(path))
+        if not summary:
+            raise CommandError(f'Nenhuma consulta lenta registrada em {path}')
+
+        total_ms = sum(group['total_ms'] for group in summary)
+        self.stdout.write(self.style.MIGRATE_HEADING(
+            f"{sum(group['count'] for group in summary)} consultas lentas, "
+            f'{len(summary)} distintas, {total_ms:.1f} ms no total'
+        ))
+        for rank, group in enumerate(summary[:options['limit']], start=1):
+            self.stdout.write(
+                f"\n#{rank}  total {group['total_ms']:.1f} ms ({group['total_ms'] / total_ms:.0%})  "
+                f"{group['count']}x  média {group['mean_ms']:.1f} ms  máx {group['max_ms']:.1f} ms"
+            )
+            self.stdout.write(textwrap.indent(
+                textwrap.shorten(group['fingerprint'], options['width'], placeholder=' ...'), '    '
+            ))
+            for frame, count in group['frames'][:3]:
+                self.stdout.write(f"    <- {frame or 'origem desconhecida'} ({count}x)")
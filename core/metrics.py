@@ -0,0 +1,246 @@
+from django.conf import settings
+from pathlib import Path
+import json
+import math
+import os
+import threading
+import time
+
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERY_COUNT_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500)
+
+# Intervalo mínimo (s) entre gravações do arquivo de métricas do processo
+FLUSH_INTERVAL = 1.0
+
+
+class Metric:
+    """
+    Métrica com rótulos. Counter e gauge guardam um número por combinação de
+    rótulos; histogram guarda [contagens por faixa, soma, total].
+    """
+
+    def __init__(self, registry, kind, name, documentation, labelnames=(), buckets=None):
+        self.registry = registry
+        self.kind = kind
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets) if buckets else None
+        self.values = {}
+
+    def _key(self, labels):
+        return tuple(str(labels.get(name, '')) for name in self.labelnames)
+
+    def inc(self, amount=1, **labels):
+        with self.registry.lock:
+            key = self._key(labels)
+            self.values[key] = self.values.get(key, 0) + amount
+
+    def observe(self, value, **labels):
+        with self.registry.lock:
+            key = self._key(labels)
+            data = self.values.get(key)
+            if data is None:
+                data = self.values[key] = [[0] * len(self.buckets), 0.0, 0]
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    data[0][index] += 1
+            data[1] += value
+            data[2] += 1
+
+    def snapshot(self):
+        return {
+            'kind': self.kind,
+            'help': self.documentation,
+            'labelnames': list(self.labelnames),
+            'buckets': list(self.buckets) if self.buckets else None,
+            'values': [[list(key), value] for key, value in self.values.items()],
+        }
+
+
+class Registry:
+    """
+    Registro de métricas do processo. Com METRICS_DIR configurado, cada processo
+    grava seu estado em <pid>.json e a exposição soma os arquivos de todos os
+    processos, para que qualquer worker responda pelo servidor inteiro.
+    """
+
+    def __init__(self):
+        self.lock = threading.RLock()
+        self.metrics = {}
+        self.collectors = []
+        self._last_flush = 0.0
+
+    def _register(self, kind, name, documentation, labelnames=(), buckets=None):
+        metric = Metric(self, kind, name, documentation, labelnames, buckets)
+        self.metrics[name] = metric
+        return metric
+
+    def counter(self, name, documentation, labelnames=()):
+        return self._register('counter', name, documentation, labelnames)
+
+    def histogram(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+        return self._register('histogram', name, documentation, labelnames, buckets)
+
+    def collector(self, func):
+        """
+        Registra uma função chamada na exposição que devolve gauges calculados
+        na hora, como (nome, ajuda, [(rótulos, valor)])
+        """
+        self.collectors.append(func)
+        return func
+
+    def snapshot(self):
+        with self.lock:
+            return {name: metric.snapshot() for name, metric in self.metrics.items()}
+
+    def directory(self):
+        path = getattr(settings, 'METRICS_DIR', None)
+        return Path(path) if path else None
+
+    def flush(self, force=False):
+        """
+        Grava o estado do processo no diretório compartilhado, no máximo uma
+        vez por FLUSH_INTERVAL, a menos que `force`
+        """
+        directory = self.directory()
+        now = time.monotonic()
+        if directory is None or (not force and now - self._last_flush < FLUSH_INTERVAL):
+            return
+        self._last_flush = now
+        directory.mkdir(parents=True, exist_ok=True)
+        path = directory / f'{os.getpid()}.json'
+        partial_path = directory / f'{os.getpid()}.json.part'
+        with open(partial_path, 'w') as output:
+            json.dump(self.snapshot(), output)
+        os.replace(partial_path, path)
+
+    def _snapshots(self):
+        """
+        Estado de todos os processos: os arquivos dos outros e a memória deste
+        """
+        snapshots = [self.snapshot()]
+        directory = self.directory()
+        if directory is None or not directory.exists():
+            return snapshots
+        own = f'{os.getpid()}.json'
+        for path in directory.glob('*.json'):
+            if path.name == own:
+                continue
+            try:
+                with open(path) as source:
+                    snapshots.append(json.load(source))
+            except (OSError, ValueError):
+                # Arquivo sendo substituído; entra na próxima coleta
+                continue
+        return snapshots
+
+    def collect(self):
+        """
+        Soma os estados de todos os processos: nome -> (métrica, {rótulos: valor})
+        """
+        merged = {}
+        for snapshot in self._snapshots():
+            for name, data in snapshot.items():
+                metric = self.metrics.get(name)
+                if metric is None:
+                    continue
+                values = merged.setdefault(name, (metric, {}))[1]
+                for labels, value in data['values']:
+                    key = tuple(labels)
+                    current = values.get(key)
+                    if metric.kind == 'histogram':
+                        if current is None:
+                            current = values[key] = [[0] * len(metric.buckets), 0.0, 0]
+                        current[0] = [a + b for a, b in zip(current[0], value[0])]
+                        current[1] += value[1]
+                        current[2] += value[2]
+                    else:
+                        values[key] = (current or 0) + value
+        return merged
+
+    def expose(self):
+        """
+        Texto no formato de exposição do Prometheus (versão 0.0.4)
+        """
+        lines = []
+        for name, (metric, values) in sorted(self.collect().items()):
+            lines.append(f'# HELP {name} {metric.documentation}')
+            lines.append(f'# TYPE {name} {metric.kind}')
+            for key, value in sorted(values.items()):
+                labels = list(zip(metric.labelnames, key))
+                if metric.kind == 'histogram':
+                    buckets, total_sum, count = value
+                    for bound, bucket_count in zip(metric.buckets, buckets):
+                        lines.append(f'{name}_bucket{_labels(labels + [("le", _number(bound))])} {bucket_count}')
+                    lines.append(f'{name}_bucket{_labels(labels + [("le", "+Inf")])} {count}')
+                    lines.append(f'{name}_sum{_labels(labels)} {_number(total_sum)}')
+                    lines.append(f'{name}_count{_labels(labels)} {count}')
+                else:
+                    lines.append(f'{name}{_labels(labels)} {_number(value)}')
+        for collector in self.collectors:
+            name, documentation, samples = collector()
+            lines.append(f'# HELP {name} {documentation}')
+            lines.append(f'# TYPE {name} gauge')
+            for labels, value in samples:
+                lines.append(f'{name}{_labels(list(labels.items()))} {_number(value)}')
+        return '\n'.join(lines) + '\n'
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _labels(pairs):
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in pairs) + '}'
+
+
+def _number(value):
+    if isinstance(value, float):
+        if math.isinf(value):
+            return '+Inf' if value > 0 else '-Inf'
+        return repr(value)
+    return str(value)
+
+
+registry = Registry()
+
+REQUEST_LATENCY = registry.histogram(
+    'finance_request_duration_seconds',
+    'Tempo de resposta das requisições por view',
+    ['view'],
+)
+REQUEST_QUERIES = registry.histogram(
+    'finance_request_queries',
+    'Consultas ao banco por requisição, por view',
+    ['view'],
+    buckets=QUERY_COUNT_BUCKETS,
+)
+PDF_BYTES = registry.counter(
+    'finance_pdf_bytes_total',
+    'Bytes de PDF gerados',
+)
+CACHE_REQUESTS = registry.counter(
+    'finance_cache_requests_total',
+    'Consultas ao cache de dados por usuário, por resultado',
+    ['namespace', 'result'],
+)
+
+
+@registry.collector
+def _report_jobs():
+    # Lido do banco: vale para as tarefas de todos os processos,
+    # inclusive as executadas pelo comando run_report_jobs
+    from .models import ReportJob
+
+    counts = dict.fromkeys((ReportJob.PENDING, ReportJob.RUNNING), 0)
+    for status in ReportJob.objects.filter(status__in=list(counts)).values_list('status', flat=True):
+        counts[status] += 1
+    return (
+        'finance_report_jobs_active',
+        'Tarefas de relatório pendentes ou em execução',
+        [({'status': status.lower()}, count) for status, count in counts.items()],
+    )
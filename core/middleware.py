@@ -0,0 +1,148 @@
+from django.conf import settings
+from django.db import connections
+from django.http import FileResponse
+from django.shortcuts import render
+from .metrics import REQUEST_LATENCY, REQUEST_QUERIES, registry
+from .timing import finish_request, sql_timer, start_request
+from contextlib import ExitStack
+from pathlib import Path
+import cProfile
+import io
+import json
+import logging
+import os
+import pstats
+import time
+import uuid
+
+
+timing_logger = logging.getLogger('core.timing')
+
+PROFILE_SORT_KEYS = ('cumulative', 'tottime', 'calls')
+PROFILE_STATS_LIMIT = 80
+
+
+class TimingMiddleware:
+    """
+    Mede cada requisição (total, SQL, templates, geração de PDF) e publica os
+    tempos no cabeçalho Server-Timing, em uma linha de log JSON no logger
+    core.timing e nos histogramas expostos em /metrics. O conteúdo de respostas em streaming é gerado depois que a
+    view retorna e por isso não entra na medição.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        timings, token = start_request()
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(sql_timer))
+                response = self.get_response(request)
+        finally:
+            finish_request(token)
+
+        total_ms = timings.total_ms()
+        template_ms = timings.spans.get('template', 0.0)
+        pdf_ms = timings.spans.get('pdf', 0.0)
+        # O que sobra é Python: views, agregações, serialização
+        app_ms = max(total_ms - timings.sql_ms - sum(timings.spans.values()), 0.0)
+
+        metrics = [
+            f'total;dur={total_ms:.1f}',
+            f'db;dur={timings.sql_ms:.1f};desc="{timings.queries} queries"',
+            f'app;dur={app_ms:.1f}',
+        ]
+        for name, duration in sorted(timings.spans.items()):
+            metrics.append(f'{name};dur={duration:.1f}')
+        response['Server-Timing'] = ', '.join(metrics)
+
+        match = request.resolver_match
+        view = match.url_name if match else None
+        REQUEST_LATENCY.observe(total_ms / 1000, view=view or 'unmatched')
+        REQUEST_QUERIES.observe(timings.queries, view=view or 'unmatched')
+        registry.flush()
+
+        timing_logger.info(json.dumps({
+            'method': request.method,
+            'path': request.path,
+            'view': view,
+            'status': response.status_code,
+            'total_ms': round(total_ms, 2),
+            'db_ms': round(timings.sql_ms, 2),
+            'queries': timings.queries,
+            'template_ms': round(template_ms, 2),
+            'pdf_ms': round(pdf_ms, 2),
+            'app_ms': round(app_ms, 2),
+        }))
+        return response
+
+
+class ProfilerMiddleware:
+    """
+    Com ?_profile=1, executa a requisição de um usuário da equipe sob o cProfile,
+    grava o perfil em PROFILES_DIR e devolve as estatísticas no lugar da resposta
+    (?_profile=download devolve o arquivo .prof). Respostas em streaming, como
+    os PDFs, são consumidas dentro do perfil. Para os demais usuários o
+    parâmetro é ignorado.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        mode = request.GET.get('_profile')
+        if mode not in ('1', 'download') or not request.user.is_staff:
+            return self.get_response(request)
+
+        profile = cProfile.Profile()
+        try:
+            profile.enable()
+        except ValueError:
+            # Outro profiler já está ativo neste processo
+            return self.get_response(request)
+        started = time.perf_counter()
+        try:
+            response = self.get_response(request)
+            if response.streaming:
+                for _ in response.streaming_content:
+                    pass
+            response.close()
+        finally:
+            profile.disable()
+        elapsed_ms = (time.perf_counter() - started) * 1000
+
+        path = self.save(profile, request)
+        if mode == 'download':
+            return FileResponse(
+                open(path, 'rb'),
+                as_attachment=True,
+                filename=path.name,
+                content_type='application/octet-stream',
+            )
+
+        sort = request.GET.get('_profile_sort')
+        if sort not in PROFILE_SORT_KEYS:
+            sort = PROFILE_SORT_KEYS[0]
+        stream = io.StringIO()
+        pstats.Stats(profile, stream=stream).sort_stats(sort).print_stats(PROFILE_STATS_LIMIT)
+        return render(request, 'core/profile.html', {
+            'method': request.method,
+            'path': request.path,
+            'status': response.status_code,
+            'elapsed_ms': elapsed_ms,
+            'profile_path': path,
+            'sort': sort,
+            'sort_keys': PROFILE_SORT_KEYS,
+            'stats': stream.getvalue(),
+        })
+
+    def save(self, profile, request):
+        directory = Path(getattr(settings, 'PROFILES_DIR', 'profiles'))
+        directory.mkdir(parents=True, exist_ok=True)
+        match = request.resolver_match
+        name = match.url_name if match else 'request'
+        path = directory / f"{time.strftime('%Y%m%d-%H%M%S')}-{name}-{os.getpid()}-{uuid.uuid4().hex[:8]}.prof"
+        profile.dump_stats(path)
+        return path
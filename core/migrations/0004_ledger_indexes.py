@@ -0,0 +1,19 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0003_reportjob'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='transaction',
+            index=models.Index(fields=['owner', 'date'], name='core_tx_owner_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='transactionitem',
+            index=models.Index(fields=['transaction', 'category', 'amount'], name='core_item_tx_cat_amount_idx'),
+        ),
+    ]
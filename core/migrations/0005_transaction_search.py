@@ -0,0 +1,75 @@
+from django.db import migrations
+from django.db.utils import OperationalError
+
+
+# Índice FTS5 com conteúdo externo: guarda apenas os termos, o texto continua em
+# core_transaction. O tokenizador remove acentos, então "agua" encontra "Água".
+CREATE_SQL = [
+    """
+    CREATE VIRTUAL TABLE core_transaction_fts USING fts5(
+        description,
+        content='core_transaction',
+        content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2'
+    )
+    """,
+    """
+    CREATE TRIGGER core_transaction_fts_insert AFTER INSERT ON core_transaction BEGIN
+        INSERT INTO core_transaction_fts(rowid, description) VALUES (new.id, new.description);
+    END
+    """,
+    """
+    CREATE TRIGGER core_transaction_fts_delete AFTER DELETE ON core_transaction BEGIN
+        INSERT INTO core_transaction_fts(core_transaction_fts, rowid, description)
+        VALUES ('delete', old.id, old.description);
+    END
+    """,
+    """
+    CREATE TRIGGER core_transaction_fts_update AFTER UPDATE OF description ON core_transaction BEGIN
+        INSERT INTO core_transaction_fts(core_transaction_fts, rowid, description)
+        VALUES ('delete', old.id, old.description);
+        INSERT INTO core_transaction_fts(rowid, description) VALUES (new.id, new.description);
+    END
+    """,
+    "INSERT INTO core_transaction_fts(core_transaction_fts) VALUES ('rebuild')",
+]
+
+DROP_SQL = [
+    'DROP TRIGGER IF EXISTS core_transaction_fts_insert',
+    'DROP TRIGGER IF EXISTS core_transaction_fts_delete',
+    'DROP TRIGGER IF EXISTS core_transaction_fts_update',
+    'DROP TABLE IF EXISTS core_transaction_fts',
+]
+
+
+def create_search_index(apps, schema_editor):
+    # Só o SQLite tem FTS5; nos demais bancos a busca usa icontains
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    try:
+        with schema_editor.connection.cursor() as cursor:
+            cursor.execute("SELECT 1 FROM pragma_module_list WHERE name = 'fts5'")
+            if cursor.fetchone() is None:
+                return
+    except OperationalError:
+        return
+    for sql in CREATE_SQL:
+        schema_editor.execute(sql)
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    for sql in DROP_SQL:
+        schema_editor.execute(sql)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0004_ledger_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,36 @@
+from django.db import migrations, models
+from django.db.models import F
+
+
+def backfill_entry_type(apps, schema_editor):
+    # Uma UPDATE por tipo, sem carregar os itens em memória
+    TransactionItem = apps.get_model('core', 'TransactionItem')
+    TransactionItem.objects.filter(category__type='INCOME').update(
+        entry_type='INCOME', signed_amount=F('amount')
+    )
+    TransactionItem.objects.filter(category__type='EXPENSE').update(
+        entry_type='EXPENSE', signed_amount=-F('amount')
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0006_category_name_per_user'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='transactionitem',
+            name='entry_type',
+            field=models.CharField(choices=[('INCOME', 'Receita'), ('EXPENSE', 'Despesa')], default='EXPENSE', editable=False, max_length=10),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='transactionitem',
+            name='signed_amount',
+            field=models.DecimalField(decimal_places=2, default=0, editable=False, max_digits=12),
+            preserve_default=False,
+        ),
+        migrations.RunPython(backfill_entry_type, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,61 @@
+# Generated by Django 5.2.18 on 2026-10-17 03:08
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import BigIntegerField, F, Sum
+from django.db.models.functions import Cast, ExtractMonth, ExtractYear, Round
+from core.money import to_decimal
+
+
+def backfill_checkpoints(apps, schema_editor):
+    # Saldo de fechamento de cada mês com itens: soma acumulada por usuário,
+    # em centavos inteiros como em core.money (o SQLite soma REAL)
+    TransactionItem = apps.get_model('core', 'TransactionItem')
+    BalanceCheckpoint = apps.get_model('core', 'BalanceCheckpoint')
+    monthly = TransactionItem.objects.annotate(
+        year=ExtractYear('transaction__date'),
+        month=ExtractMonth('transaction__date'),
+    ).values('transaction__owner_id', 'year', 'month').annotate(
+        total=Sum(Cast(Round(F('signed_amount') * 100), BigIntegerField()))
+    ).order_by('transaction__owner_id', 'year', 'month')
+
+    checkpoints = []
+    user_id = None
+    balance = 0
+    for row in monthly:
+        if row['transaction__owner_id'] != user_id:
+            user_id = row['transaction__owner_id']
+            balance = 0
+        balance += row['total']
+        checkpoints.append(BalanceCheckpoint(
+            user_id=user_id, year=row['year'], month=row['month'], balance=to_decimal(balance)
+        ))
+    BalanceCheckpoint.objects.bulk_create(checkpoints, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0007_transactionitem_entry_type'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BalanceCheckpoint',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('year', models.PositiveSmallIntegerField()),
+                ('month', models.PositiveSmallIntegerField()),
+                ('balance', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Saldo de Fechamento',
+                'verbose_name_plural': 'Saldos de Fechamento',
+                'unique_together': {('user', 'year', 'month')},
+            },
+        ),
+        migrations.RunPython(backfill_checkpoints, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 5.2.18 on 2026-10-17 04:04
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0008_balancecheckpoint'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='transactionitem',
+            name='core_item_tx_cat_amount_idx',
+        ),
+        migrations.AddIndex(
+            model_name='transactionitem',
+            index=models.Index(fields=['transaction', 'category', 'entry_type', 'amount', 'signed_amount'], name='core_item_tx_cat_type_amt_idx'),
+        ),
+    ]
@@ -12,7 +12,7 @@ class Category(models.Model):
         (EXPENSE, 'Despesa'),
     ]
 
-    name = models.CharField(max_length=100, unique=True)
+    name = models.CharField(max_length=100)
     type = models.CharField(max_length=10, choices=CATEGORY_TYPES)
     user = models.ForeignKey(User, on_delete=models.CASCADE)
 
@@ -22,7 +22,10 @@ class Category(models.Model):
     class Meta:
         verbose_name = 'Categoria'
         verbose_name_plural = 'Categorias'
-        unique_together = ('user', 'name')  # Ensures category names are unique per user
+        constraints = [
+            # Nomes de categoria são únicos por usuário
+            models.UniqueConstraint(fields=['user', 'name'], name='core_category_user_name_unique'),
+        ]
 
 
 class Transaction(models.Model):
@@ -37,6 +40,10 @@ class Transaction(models.Model):
     class Meta:
         verbose_name = 'Transação'
         verbose_name_plural = 'Transações'
+        indexes = [
+            # Todas as consultas filtram por dono e intervalo de datas
+            models.Index(fields=['owner', 'date'], name='core_tx_owner_date_idx'),
+        ]
 
 
 class TransactionItem(models.Model):
@@ -47,10 +54,123 @@ class TransactionItem(models.Model):
         decimal_places=2, 
         validators=[MinValueValidator(Decimal('0.01'))]
     )
+    # Cópias do tipo da categoria e do valor com sinal (negativo para despesas),
+    # para somar receitas, despesas e saldo sem juntar a tabela de categorias.
+    # Preenchidas em save(); quando o tipo de uma categoria muda, core/signals.py
+    # atualiza os itens dela em lotes
+    entry_type = models.CharField(max_length=10, choices=Category.CATEGORY_TYPES, editable=False)
+    signed_amount = models.DecimalField(max_digits=12, decimal_places=2, editable=False)
 
     def __str__(self):
         return f"{self.category.name} - {self.amount}"
 
+    @staticmethod
+    def sign(entry_type):
+        return 1 if entry_type == Category.INCOME else -1
+
+    def set_entry_type(self, entry_type=None):
+        """
+        Preenche entry_type e signed_amount a partir da categoria (ou do tipo informado)
+        """
+        self.entry_type = entry_type or self.category.type
+        self.signed_amount = self.sign(self.entry_type) * Decimal(str(self.amount))
+
+    def save(self, *args, **kwargs):
+        self.set_entry_type()
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None:
+            kwargs['update_fields'] = {*update_fields, 'entry_type', 'signed_amount'}
+        super().save(*args, **kwargs)
+
     class Meta:
         verbose_name = 'Item de Transação'
-        verbose_name_plural = 'Itens de Transação'
\ No newline at end of file
+        verbose_name_plural = 'Itens de Transação'
+        indexes = [
+            # Cobre as agregações por transação e categoria (por tipo, valor ou
+            # valor com sinal) sem ler a tabela; também atende buscas por
+            # (transaction, category)
+            models.Index(
+                fields=['transaction', 'category', 'entry_type', 'amount', 'signed_amount'],
+                name='core_item_tx_cat_type_amt_idx',
+            ),
+        ]
+
+
+class MonthlyCategoryTotal(models.Model):
+    """
+    Consolidado mensal por categoria, mantido incrementalmente a cada escrita
+    de itens de transação (veja core/rollups.py)
+    """
+    user = models.ForeignKey(User, on_delete=models.CASCADE)
+    year = models.PositiveSmallIntegerField()
+    month = models.PositiveSmallIntegerField()
+    category = models.ForeignKey(Category, on_delete=models.CASCADE)
+    total = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    count = models.PositiveIntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.category.name} - {self.month:02d}/{self.year}"
+
+    class Meta:
+        verbose_name = 'Total Mensal por Categoria'
+        verbose_name_plural = 'Totais Mensais por Categoria'
+        unique_together = ('user', 'year', 'month', 'category')
+
+
+class BalanceCheckpoint(models.Model):
+    """
+    Saldo acumulado do usuário no fim de cada mês com movimento, mantido
+    incrementalmente junto com os consolidados mensais (veja core/rollups.py)
+    """
+    user = models.ForeignKey(User, on_delete=models.CASCADE)
+    year = models.PositiveSmallIntegerField()
+    month = models.PositiveSmallIntegerField()
+    balance = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+
+    def __str__(self):
+        return f"{self.user} - {self.month:02d}/{self.year}"
+
+    class Meta:
+        verbose_name = 'Saldo de Fechamento'
+        verbose_name_plural = 'Saldos de Fechamento'
+        unique_together = ('user', 'year', 'month')
+
+
+class ReportJob(models.Model):
+    """
+    Geração de relatório em PDF executada fora do ciclo da requisição
+    (veja core/jobs.py)
+    """
+    PENDING = 'PENDING'
+    RUNNING = 'RUNNING'
+    DONE = 'DONE'
+    FAILED = 'FAILED'
+    STATUSES = [
+        (PENDING, 'Pendente'),
+        (RUNNING, 'Em execução'),
+        (DONE, 'Concluído'),
+        (FAILED, 'Falhou'),
+    ]
+
+    REPORTS = [
+        ('transactions', 'Relatório de Transações'),
+        ('transactions_by_category', 'Transações por Categoria'),
+        ('transactions_by_month', 'Transações por Mês'),
+    ]
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE)
+    report = models.CharField(max_length=30, choices=REPORTS)
+    params = models.JSONField(default=dict, blank=True)
+    status = models.CharField(max_length=10, choices=STATUSES, default=PENDING)
+    file_path = models.CharField(max_length=500, blank=True)
+    error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"{self.get_report_display()} - {self.get_status_display()}"
+
+    class Meta:
+        verbose_name = 'Tarefa de Relatório'
+        verbose_name_plural = 'Tarefas de Relatório'
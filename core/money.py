@@ -0,0 +1,35 @@
+from django.db.models import BigIntegerField, F, Sum
+from django.db.models.functions import Cast, Round
+from decimal import Decimal, ROUND_HALF_UP
+
+
+def cents(expression):
+    """
+    Valor em centavos inteiros. O SQLite guarda decimais como REAL, então cada
+    valor é arredondado para centavos antes de entrar em uma soma, que passa a
+    ser feita em inteiros (exata) em vez de ponto flutuante
+    """
+    if isinstance(expression, str):
+        expression = F(expression)
+    return Cast(Round(expression * 100), BigIntegerField())
+
+
+def sum_cents(expression, **extra):
+    """
+    SUM em centavos inteiros; aceita os mesmos argumentos de Sum (ex.: filter)
+    """
+    return Sum(cents(expression), **extra)
+
+
+def to_decimal(value):
+    """
+    Centavos inteiros (ou None) -> Decimal com duas casas
+    """
+    return Decimal(value or 0).scaleb(-2)
+
+
+def to_cents(amount):
+    """
+    Decimal -> centavos inteiros
+    """
+    return int((Decimal(amount) * 100).to_integral_value(rounding=ROUND_HALF_UP))
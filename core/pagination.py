@@ -0,0 +1,119 @@
+from django.db.models import Q
+import base64
+import json
+
+
+class InvalidCursor(Exception):
+    pass
+
+
+def encode_cursor(values, backwards=False):
+    """
+    Codifica a posição (valores das colunas de ordenação) em um token opaco
+    """
+    payload = json.dumps([backwards, [str(value) for value in values]], separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+
+def decode_cursor(token):
+    """
+    Inverso de encode_cursor; retorna (valores como texto, backwards)
+    """
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        backwards, values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except (ValueError, TypeError):
+        raise InvalidCursor(token)
+    if not isinstance(backwards, bool) or not isinstance(values, list):
+        raise InvalidCursor(token)
+    return values, backwards
+
+
+class KeysetPage:
+    def __init__(self, object_list, next_cursor, previous_cursor):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+
+    @property
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+
+class KeysetPaginator:
+    """
+    Paginação por posição (keyset) em ordem decrescente de `fields`.
+    Cada página filtra a partir da última linha vista, em vez de usar OFFSET,
+    então o custo não cresce com o número da página e não há COUNT.
+    O último campo deve ser único (normalmente 'id') para desempatar.
+    """
+
+    def __init__(self, queryset, per_page, fields=('date', 'id')):
+        self.queryset = queryset
+        self.per_page = per_page
+        self.fields = fields
+
+    def _parse(self, values):
+        if len(values) != len(self.fields):
+            raise InvalidCursor(values)
+        model_fields = [self.queryset.model._meta.get_field(name) for name in self.fields]
+        try:
+            return [field.to_python(value) for field, value in zip(model_fields, values)]
+        except Exception:
+            raise InvalidCursor(values)
+
+    def _seek(self, values, lookup):
+        # (a, b) < (x, y)  ==  a < x OR (a = x AND b < y)
+        condition = Q()
+        for index, name in enumerate(self.fields):
+            equal = {field: value for field, value in zip(self.fields[:index], values)}
+            condition |= Q(**equal, **{f'{name}__{lookup}': values[index]})
+        return condition
+
+    def _position(self, obj):
+        return [getattr(obj, name) for name in self.fields]
+
+    def page(self, cursor=None):
+        """
+        Página a partir do cursor (None para a primeira). Busca uma linha a
+        mais que o tamanho da página para saber se existe continuação.
+        """
+        backwards = False
+        queryset = self.queryset
+        if cursor:
+            values, backwards = decode_cursor(cursor)
+            values = self._parse(values)
+            queryset = queryset.filter(self._seek(values, 'gt' if backwards else 'lt'))
+
+        if backwards:
+            ordering = list(self.fields)
+        else:
+            ordering = [f'-{name}' for name in self.fields]
+        rows = list(queryset.order_by(*ordering)[:self.per_page + 1])
+        has_more = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+        if backwards:
+            rows.reverse()
+
+        if not rows:
+            return KeysetPage(rows, None, None)
+
+        # Voltando, sempre há uma página seguinte (a de onde viemos);
+        # avançando, sempre há uma anterior se partimos de um cursor
+        has_next = has_more if not backwards else True
+        has_previous = has_more if backwards else bool(cursor)
+        return KeysetPage(
+            rows,
+            encode_cursor(self._position(rows[-1])) if has_next else None,
+            encode_cursor(self._position(rows[0]), backwards=True) if has_previous else None,
+        )
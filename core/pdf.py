@@ -0,0 +1,202 @@
+from django.http import FileResponse
+from reportlab import rl_config
+from reportlab.lib import colors
+from reportlab.lib.pagesizes import A4
+from reportlab.pdfbase import pdfdoc
+from reportlab.pdfgen import canvas
+from reportlab.platypus import SimpleDocTemplate, Table, TableStyle
+from .metrics import PDF_BYTES
+from .timing import timed
+import tempfile
+
+
+# Linhas por tabela: cabe em uma página A4, então cada página repete o cabeçalho
+PDF_ROWS_PER_TABLE = 35
+
+# Itens lidos do banco por vez ao percorrer o relatório
+PDF_CHUNK_SIZE = 500
+
+DATA_TABLE_STYLE = TableStyle([
+    ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
+    ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+    ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+    ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+    ('FONTSIZE', (0, 0), (-1, 0), 12),
+    ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
+    ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
+    ('FONTNAME', (0, 1), (-1, -1), 'Helvetica'),
+    ('FONTSIZE', (0, 1), (-1, -1), 10),
+    ('GRID', (0, 0), (-1, -1), 1, colors.black)
+])
+
+
+class FlowableStream(list):
+    """
+    Lista de flowables preenchida sob demanda a partir de um iterador.
+    O reportlab consome a lista pela frente (del flowables[0]), então só
+    algumas tabelas ficam em memória por vez, em vez do relatório inteiro.
+    """
+
+    def __init__(self, iterable, lookahead=2):
+        super().__init__()
+        self._source = iter(iterable)
+        self._lookahead = lookahead
+
+    def _fill(self):
+        while self._source is not None and list.__len__(self) < self._lookahead:
+            try:
+                self.append(next(self._source))
+            except StopIteration:
+                self._source = None
+
+    def __len__(self):
+        self._fill()
+        return list.__len__(self)
+
+    def __getitem__(self, index):
+        self._fill()
+        return list.__getitem__(self, index)
+
+
+class SpooledPageStream(pdfdoc.PDFObject):
+    """
+    Conteúdo de uma página já formatado e guardado em arquivo temporário;
+    só volta para a memória, por um instante, quando o documento é gravado
+    """
+    __RefOnly__ = 1
+
+    def __init__(self, spool, offset, length):
+        self.spool = spool
+        self.offset = offset
+        self.length = length
+
+    def format(self, document):
+        self.spool.seek(self.offset)
+        return self.spool.read(self.length)
+
+
+class StreamingPDFDocument(pdfdoc.PDFDocument):
+    """
+    PDFDocument que grava cada objeto direto no arquivo de saída, em vez de
+    juntar o documento inteiro em memória antes de gravar
+    """
+    _output = None
+
+    def SaveToFile(self, filename, canvas):
+        if hasattr(filename, 'write'):
+            self._output = filename
+        super().SaveToFile(filename, canvas)
+
+    # O format() do ReportLab guarda em self.__accum__ o PDFFile que acumula a
+    # saída; ao recebê-lo, o cabeçalho já escrito vai para o arquivo e as
+    # próximas escritas também. O format() então devolve b'' para SaveToFile.
+    def _set_accum(self, pdf_file):
+        if self._output is not None:
+            for chunk in pdf_file.strings:
+                self._output.write(chunk)
+            pdf_file.strings = []
+            pdf_file.write = self._output.write
+        self.__dict__['_accum'] = pdf_file
+
+    def _del_accum(self):
+        del self.__dict__['_accum']
+
+    __accum__ = property(lambda self: self.__dict__['_accum'], _set_accum, _del_accum)
+
+
+class StreamingCanvas(canvas.Canvas):
+    """
+    Canvas que tira cada página da memória assim que ela termina: o conteúdo
+    vai para um arquivo temporário e o documento é gravado direto na saída.
+    Sem isso o ReportLab guarda o texto de todas as páginas até o fim.
+
+    Depende de detalhes internos do PDFDocument e do PDFPage; por isso o
+    reportlab fica fixado na versão testada (requirements.txt) e os testes
+    comparam as páginas geradas com as do Canvas padrão.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._doc.__class__ = StreamingPDFDocument
+        self._spool = tempfile.TemporaryFile()
+        self._shared_resources = {}
+
+    def _basic_resources(self, has_images):
+        # Os mesmos recursos que o PDFPage.check_format montaria para a página
+        resources = self._shared_resources.get(has_images)
+        if resources is None:
+            resources = self._shared_resources[has_images] = pdfdoc.PDFResourceDictionary()
+            resources.basicFonts()
+            if has_images:
+                resources.allProcs()
+            else:
+                resources.basicProcs()
+        return resources
+
+    def showPage(self):
+        super().showPage()
+        page = self._doc.Pages.pages[-1]
+        stream = pdfdoc.PDFStream(content=page.stream)
+        if page.compression:
+            stream.filters = [pdfdoc.PDFBase85Encode, pdfdoc.PDFZCompress] if rl_config.useA85 else [pdfdoc.PDFZCompress]
+        data = stream.format(self._doc)
+        offset = self._spool.seek(0, 2)
+        self._spool.write(data)
+        page.Contents = SpooledPageStream(self._spool, offset, len(data))
+        page.stream = None
+        if not (page.XObjects or page.ExtGState or page._shadingUsed or page._colorsUsed):
+            # Páginas só com texto e desenhos simples têm os mesmos recursos: um objeto para todas
+            page.Resources = self._basic_resources(page.hasImages)
+
+    def save(self):
+        try:
+            super().save()
+        finally:
+            self._spool.close()
+
+
+def chunked_tables(header, rows, col_widths=None, rows_per_table=PDF_ROWS_PER_TABLE):
+    """
+    Gera tabelas do tamanho de uma página, cada uma repetindo o cabeçalho
+    """
+    chunk = [header]
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) > rows_per_table:
+            yield Table(chunk, colWidths=col_widths, repeatRows=1, style=DATA_TABLE_STYLE)
+            chunk = [header]
+    if len(chunk) > 1:
+        yield Table(chunk, colWidths=col_widths, repeatRows=1, style=DATA_TABLE_STYLE)
+
+
+def build_pdf(flowables, output):
+    """
+    Monta o PDF em `output` (arquivo aberto em modo binário) a partir de um
+    iterável de flowables, consumido aos poucos, com as páginas prontas fora
+    da memória
+    """
+    doc = SimpleDocTemplate(output, pagesize=A4)
+    with timed('pdf'):
+        doc.build(FlowableStream(flowables), canvasmaker=StreamingCanvas)
+    PDF_BYTES.inc(output.tell())
+
+
+def pdf_file_response(flowables, filename):
+    """
+    Grava o PDF em um arquivo temporário e o devolve via FileResponse,
+    sem manter cópias do documento em memória
+    """
+    output = tempfile.TemporaryFile()
+    try:
+        build_pdf(flowables, output)
+    except Exception:
+        output.close()
+        raise
+    output.seek(0)
+    # O FileResponse fecha (e assim remove) o arquivo temporário ao terminar
+    return FileResponse(
+        output,
+        as_attachment=True,
+        filename=filename,
+        content_type='application/pdf',
+    )
@@ -0,0 +1,389 @@
+from django.db.models import Exists, OuterRef, Prefetch
+from django.shortcuts import render
+from django.utils.dateparse import parse_date
+from functools import cached_property
+from reportlab.lib import colors
+from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+from reportlab.platypus import Table, TableStyle, Paragraph, Spacer
+from .exports import EXPORT_FORMATS, export_response
+from .models import Category, Transaction, TransactionItem
+from .pdf import PDF_CHUNK_SIZE, chunked_tables, pdf_file_response
+from .rollups import category_totals_between, monthly_totals_between
+from .services import get_transaction_report_totals
+
+
+SUMMARY_TABLE_STYLE = TableStyle([
+    ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
+    ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+    ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+    ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+    ('FONTSIZE', (0, 0), (-1, 0), 14),
+    ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
+    ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
+    ('FONTNAME', (0, 1), (-1, -1), 'Helvetica'),
+    ('FONTSIZE', (0, 1), (-1, -1), 12),
+    ('GRID', (0, 0), (-1, -1), 1, colors.black)
+])
+
+
+def parse_filter_date(value):
+    """
+    Converte o filtro de data da query string, ignorando valores vazios ou inválidos
+    """
+    if not value or value == 'None':
+        return None
+    try:
+        return parse_date(value)
+    except ValueError:
+        return None
+
+
+def report_filters(params):
+    """
+    Normaliza os filtros dos relatórios (query string ou dicionário salvo)
+    """
+    category_id = params.get('category')
+    return {
+        'start_date': parse_filter_date(params.get('start_date')),
+        'end_date': parse_filter_date(params.get('end_date')),
+        'category_id': int(category_id) if category_id and str(category_id).isdigit() else None,
+    }
+
+
+def filter_transactions(user, filters):
+    """
+    Transações do usuário que passam pelos filtros do relatório
+    """
+    transactions = Transaction.objects.filter(owner=user)
+    if filters['start_date']:
+        transactions = transactions.filter(date__gte=filters['start_date'])
+    if filters['end_date']:
+        transactions = transactions.filter(date__lte=filters['end_date'])
+    if filters['category_id']:
+        # EXISTS em vez de JOIN: cada transação aparece uma só vez
+        transactions = transactions.filter(Exists(TransactionItem.objects.filter(
+            transaction=OuterRef('pk'),
+            category_id=filters['category_id'],
+        )))
+    return transactions
+
+
+def transaction_report_items(transactions):
+    """
+    Itens das transações do relatório, em ordem, como tuplas
+    (data, descrição, categoria, valor, tipo)
+    """
+    return TransactionItem.objects.filter(
+        transaction__in=transactions.values('pk')
+    ).order_by(
+        '-transaction__date', 'transaction_id', 'id'
+    ).values_list(
+        'transaction__date', 'transaction__description', 'category__name', 'amount', 'entry_type'
+    )
+
+
+def _header(title, user, filters, with_category=True):
+    """
+    Título e descrição dos filtros aplicados
+    """
+    styles = getSampleStyleSheet()
+    title_style = ParagraphStyle(
+        'CustomTitle',
+        parent=styles['Heading1'],
+        fontSize=18,
+        spaceAfter=30,
+    )
+
+    yield Paragraph(title, title_style)
+    yield Spacer(1, 20)
+
+    filter_text = "Filtros aplicados: "
+    if filters['start_date']:
+        filter_text += f"De {filters['start_date'].strftime('%d/%m/%Y')} "
+    if filters['end_date']:
+        filter_text += f"Até {filters['end_date'].strftime('%d/%m/%Y')} "
+    category = None
+    if with_category and filters['category_id']:
+        category = Category.objects.filter(id=filters['category_id'], user=user).first()
+        if category:
+            filter_text += f"Categoria: {category.name}"
+
+    if not (filters['start_date'] or filters['end_date'] or category):
+        filter_text += "Nenhum"
+
+    yield Paragraph(filter_text, styles['Normal'])
+    yield Spacer(1, 20)
+
+
+def _summary(total_income, total_expense, balance):
+    summary_data = [
+        ['Receitas', 'Despesas', 'Saldo'],
+        [f'R$ {total_income:.2f}', f'R$ {total_expense:.2f}', f'R$ {balance:.2f}']
+    ]
+    yield Table(summary_data, style=SUMMARY_TABLE_STYLE)
+    yield Spacer(1, 30)
+
+
+def _section(title, tables):
+    """
+    Título da seção seguido das tabelas, omitido se não houver linhas
+    """
+    first_table = next(tables, None)
+    if first_table is not None:
+        yield Paragraph(title, getSampleStyleSheet()['Heading2'])
+        yield Spacer(1, 12)
+        yield first_table
+        yield from tables
+
+
+def _money(value):
+    return f'R$ {value:.2f}'
+
+
+def _type_label(category_type):
+    return 'Receita' if category_type == Category.INCOME else 'Despesa'
+
+
+def _date(value):
+    return value.strftime('%d/%m/%Y')
+
+
+def _month(value):
+    year, month = value.split('-')
+    return f'{month}/{year}'
+
+
+def _totals(income, expense, **data):
+    return dict(data, income=income, expense=expense, balance=income - expense)
+
+
+class Report:
+    """
+    Relatório declarativo: as subclasses definem as colunas, como
+    (campo, título, formato no PDF), o template e a agregação. A agregação roda
+    uma única vez por relatório, na primeira leitura de `data`, e serve a todos
+    os formatos; os resultados ficam no cache por usuário, compartilhados
+    entre a prévia em HTML e as exportações.
+    """
+    name = None
+    title = None
+    section_title = None
+    filename = None
+    template = None
+    columns = ()
+    col_widths = None
+    category_filter = True
+
+    def __init__(self, user, params):
+        self.user = user
+        self.params = params
+        self.filters = report_filters(params)
+        if not self.category_filter:
+            self.filters['category_id'] = None
+
+    @cached_property
+    def data(self):
+        return self.aggregate()
+
+    def aggregate(self):
+        """
+        Consultas de agregação; retorna um dicionário com ao menos income,
+        expense e balance
+        """
+        raise NotImplementedError
+
+    def rows(self):
+        """
+        Linhas do relatório com os valores brutos, na ordem de `columns`
+        """
+        raise NotImplementedError
+
+    def context(self):
+        """
+        Contexto do template HTML
+        """
+        return {
+            'report': self,
+            'start_date': self.params.get('start_date'),
+            'end_date': self.params.get('end_date'),
+            'category_id': self.params.get('category'),
+            'total_income': self.data['income'],
+            'total_expense': self.data['expense'],
+            'balance': self.data['balance'],
+        }
+
+    def flowables(self):
+        """
+        Conteúdo do PDF, consumido aos poucos pelo build_pdf
+        """
+        yield from _header(self.title, self.user, self.filters, with_category=self.category_filter)
+        yield from _summary(self.data['income'], self.data['expense'], self.data['balance'])
+
+        rows = (
+            [format_value(value) for (_, _, format_value), value in zip(self.columns, row)]
+            for row in self.rows()
+        )
+        yield from _section(self.section_title, chunked_tables(
+            [title for _, title, _ in self.columns],
+            rows,
+            col_widths=self.col_widths,
+        ))
+
+
+class TransactionsReport(Report):
+    name = 'transactions'
+    title = 'Relatório de Transações'
+    section_title = 'Transações'
+    filename = 'relatorio_transacoes'
+    template = 'core/report_transactions.html'
+    columns = (
+        ('date', 'Data', _date),
+        ('description', 'Descrição', str),
+        ('category', 'Categoria', str),
+        ('amount', 'Valor', _money),
+        ('type', 'Tipo', _type_label),
+    )
+    col_widths = [60, 150, 100, 76, 65]
+
+    def aggregate(self):
+        return get_transaction_report_totals(
+            self.user, self.filters['start_date'], self.filters['end_date'], self.filters['category_id']
+        )
+
+    def transactions(self):
+        return filter_transactions(self.user, self.filters)
+
+    def rows(self):
+        # Lidos em blocos, sem carregar o relatório inteiro na memória
+        return transaction_report_items(self.transactions()).iterator(chunk_size=PDF_CHUNK_SIZE)
+
+    def context(self):
+        context = super().context()
+        # Itens e categorias carregados de uma vez, em vez de uma consulta por transação no template.
+        # As categorias vêm em uma consulta à parte para que cada uma exista uma única vez em
+        # memória, em vez de uma cópia por item como no select_related
+        context['transactions'] = self.transactions().order_by('-date', '-id').prefetch_related(
+            Prefetch('items', queryset=TransactionItem.objects.order_by('id')),
+            'items__category',
+        )
+        context['categories'] = Category.objects.filter(user=self.user).order_by('name')
+        return context
+
+
+class TransactionsByCategoryReport(Report):
+    name = 'transactions_by_category'
+    title = 'Relatório de Transações por Categoria'
+    section_title = 'Transações por Categoria'
+    filename = 'relatorio_transacoes_categoria'
+    template = 'core/report_transactions_by_category.html'
+    columns = (
+        ('category', 'Categoria', str),
+        ('type', 'Tipo', _type_label),
+        ('total', 'Total', _money),
+        ('count', 'Quantidade', str),
+    )
+    category_filter = False
+
+    def aggregate(self):
+        # Agrupado no banco, pelos consolidados mensais (bordas do período pelos itens)
+        category_totals = category_totals_between(self.user, self.filters['start_date'], self.filters['end_date'])
+        return _totals(
+            sum(data['total'] for data in category_totals.values() if data['type'] == Category.INCOME),
+            sum(data['total'] for data in category_totals.values() if data['type'] == Category.EXPENSE),
+            category_totals=category_totals,
+        )
+
+    def rows(self):
+        return (
+            [name, data['type'], data['total'], data['count']]
+            for name, data in self.data['category_totals'].items()
+        )
+
+    def context(self):
+        context = super().context()
+        context['category_totals'] = self.data['category_totals']
+        return context
+
+
+class TransactionsByMonthReport(Report):
+    name = 'transactions_by_month'
+    title = 'Relatório de Transações por Mês'
+    section_title = 'Transações por Mês'
+    filename = 'relatorio_transacoes_mes'
+    template = 'core/report_transactions_by_month.html'
+    columns = (
+        ('month', 'Mês', _month),
+        ('income', 'Receitas', _money),
+        ('expense', 'Despesas', _money),
+        ('balance', 'Saldo', _money),
+        ('count', 'Quantidade', str),
+    )
+
+    def aggregate(self):
+        # Agrupado no banco, pelos consolidados mensais (bordas do período pelos itens)
+        months = [
+            (f'{year:04d}-{month:02d}', data)
+            for (year, month), data in sorted(monthly_totals_between(
+                self.user, self.filters['start_date'], self.filters['end_date'], self.filters['category_id']
+            ).items())
+        ]
+        return _totals(
+            sum(data['income'] for _, data in months),
+            sum(data['expense'] for _, data in months),
+            months=months,
+        )
+
+    def rows(self):
+        return (
+            [key, data['income'], data['expense'], data['income'] - data['expense'], data['count']]
+            for key, data in self.data['months']
+        )
+
+    def context(self):
+        context = super().context()
+        context['monthly_totals'] = [
+            (key, {
+                'name': _month(key),
+                'income': data['income'],
+                'expense': data['expense'],
+                'balance': data['income'] - data['expense'],
+                'count': data['count'],
+            })
+            for key, data in self.data['months']
+        ]
+        context['categories'] = Category.objects.filter(user=self.user).order_by('name')
+        return context
+
+
+# Relatórios disponíveis: nome -> classe
+REPORTS = {
+    report.name: report
+    for report in (TransactionsReport, TransactionsByCategoryReport, TransactionsByMonthReport)
+}
+
+
+def render_html(request, report):
+    return render(request, report.template, report.context())
+
+
+def render_pdf(request, report):
+    return pdf_file_response(report.flowables(), f'{report.filename}.pdf')
+
+
+def _export_renderer(export_format):
+    def render_export(request, report):
+        return export_response(
+            export_format,
+            report.filename,
+            [(field, title) for field, title, _ in report.columns],
+            report.rows(),
+        )
+    return render_export
+
+
+# Formatos de saída (?format=): nome -> função(request, relatório) que monta a resposta
+RENDERERS = {
+    'html': render_html,
+    'pdf': render_pdf,
+    **{export_format: _export_renderer(export_format) for export_format in EXPORT_FORMATS},
+}
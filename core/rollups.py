@@ -0,0 +1,351 @@
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Q, Sum
+from django.db.models.functions import ExtractMonth, ExtractYear
+from .cache import cached_per_user
+from .models import BalanceCheckpoint, Category, MonthlyCategoryTotal, TransactionItem
+from .money import sum_cents, to_cents, to_decimal
+from datetime import date, timedelta
+import calendar
+
+
+def month_bounds(year, month):
+    """
+    Retorna o primeiro e o último dia de um mês
+    """
+    last_day = calendar.monthrange(year, month)[1]
+    return date(year, month, 1), date(year, month, last_day)
+
+
+def apply_delta(user_id, day, category_id, amount, count):
+    """
+    Soma `amount` e `count` ao consolidado (usuário, ano, mês, categoria) de `day`.
+    Valores negativos removem itens do consolidado.
+    """
+    if not amount and not count:
+        return
+
+    key = {
+        'user_id': user_id,
+        'year': day.year,
+        'month': day.month,
+        'category_id': category_id,
+    }
+    updated = MonthlyCategoryTotal.objects.filter(**key).update(
+        total=F('total') + amount,
+        count=F('count') + count,
+    )
+    if updated:
+        return
+
+    try:
+        with transaction.atomic():
+            MonthlyCategoryTotal.objects.create(total=amount, count=count, **key)
+    except IntegrityError:
+        # Outra requisição criou a linha ao mesmo tempo
+        MonthlyCategoryTotal.objects.filter(**key).update(
+            total=F('total') + amount,
+            count=F('count') + count,
+        )
+
+
+def _checkpoints_from(user_id, year, month):
+    return BalanceCheckpoint.objects.filter(user_id=user_id).filter(
+        Q(year__gt=year) | Q(year=year, month__gte=month)
+    )
+
+
+def _checkpoint_before(user_id, year, month):
+    """
+    Último saldo de fechamento anterior ao mês, ou None
+    """
+    return BalanceCheckpoint.objects.filter(user_id=user_id).filter(
+        Q(year__lt=year) | Q(year=year, month__lt=month)
+    ).order_by('-year', '-month').values_list('balance', flat=True).first()
+
+
+def apply_balance_delta(user_id, day, amount):
+    """
+    Soma `amount` (com sinal) ao saldo de fechamento do mês de `day` e de
+    todos os meses seguintes, criando o fechamento do mês se ainda não existir
+    """
+    if not amount:
+        return
+
+    _checkpoints_from(user_id, day.year, day.month).update(balance=F('balance') + amount)
+    key = {'user_id': user_id, 'year': day.year, 'month': day.month}
+    if BalanceCheckpoint.objects.filter(**key).exists():
+        return
+
+    # Primeiro movimento do mês: parte do fechamento anterior
+    opening = _checkpoint_before(user_id, day.year, day.month) or 0
+    try:
+        with transaction.atomic():
+            BalanceCheckpoint.objects.create(balance=opening + amount, **key)
+    except IntegrityError:
+        # Outra requisição criou o fechamento ao mesmo tempo, sem este valor
+        BalanceCheckpoint.objects.filter(**key).update(balance=F('balance') + amount)
+
+
+def apply_transaction_delta(transaction_id, user_id, day, sign):
+    """
+    Soma (sign=1) ou remove (sign=-1) todos os itens de uma transação do
+    consolidado e do saldo de fechamento do mês de `day`
+    """
+    grouped = TransactionItem.objects.filter(transaction_id=transaction_id).values(
+        'category_id'
+    ).annotate(total=sum_cents('amount'), signed=sum_cents('signed_amount'), count=Count('id'))
+
+    balance = 0
+    for row in grouped:
+        apply_delta(user_id, day, row['category_id'], sign * to_decimal(row['total']), sign * row['count'])
+        balance += row['signed']
+    apply_balance_delta(user_id, day, sign * to_decimal(balance))
+
+
+@transaction.atomic
+def rebuild_rollups(user=None):
+    """
+    Recalcula os consolidados mensais e os saldos de fechamento a partir dos
+    itens de transação. Sem usuário, reconstrói as tabelas inteiras.
+    Retorna o número de consolidados criados.
+    """
+    rollups = MonthlyCategoryTotal.objects.all()
+    items = TransactionItem.objects.all()
+    if user is not None:
+        rollups = rollups.filter(user=user)
+        items = items.filter(transaction__owner=user)
+
+    rollups.delete()
+
+    grouped = items.annotate(
+        year=ExtractYear('transaction__date'),
+        month=ExtractMonth('transaction__date'),
+    ).values(
+        'transaction__owner_id', 'year', 'month', 'category_id'
+    ).annotate(total=sum_cents('amount'), count=Count('id')).order_by()
+
+    rows = [
+        MonthlyCategoryTotal(
+            user_id=row['transaction__owner_id'],
+            year=row['year'],
+            month=row['month'],
+            category_id=row['category_id'],
+            total=to_decimal(row['total']),
+            count=row['count'],
+        )
+        for row in grouped
+    ]
+    MonthlyCategoryTotal.objects.bulk_create(rows, batch_size=1000)
+    rebuild_checkpoints(user)
+    return len(rows)
+
+
+@transaction.atomic
+def rebuild_checkpoints(user=None):
+    """
+    Recalcula os saldos de fechamento a partir dos itens de transação.
+    Sem usuário, reconstrói a tabela inteira. Retorna o número de linhas criadas.
+    """
+    checkpoints = BalanceCheckpoint.objects.all()
+    items = TransactionItem.objects.all()
+    if user is not None:
+        checkpoints = checkpoints.filter(user=user)
+        items = items.filter(transaction__owner=user)
+
+    checkpoints.delete()
+
+    monthly = items.annotate(
+        year=ExtractYear('transaction__date'),
+        month=ExtractMonth('transaction__date'),
+    ).values(
+        'transaction__owner_id', 'year', 'month'
+    ).annotate(total=sum_cents('signed_amount')).order_by('transaction__owner_id', 'year', 'month')
+
+    # Soma acumulada em centavos, reiniciada a cada usuário
+    rows = []
+    user_id = None
+    balance = 0
+    for row in monthly:
+        if row['transaction__owner_id'] != user_id:
+            user_id = row['transaction__owner_id']
+            balance = 0
+        balance += row['total']
+        rows.append(BalanceCheckpoint(
+            user_id=user_id,
+            year=row['year'],
+            month=row['month'],
+            balance=to_decimal(balance),
+        ))
+    BalanceCheckpoint.objects.bulk_create(rows, batch_size=1000)
+    return len(rows)
+
+
+def opening_balance_cents(user, day):
+    """
+    Saldo do usuário antes de `day`, em centavos: o fechamento do mês
+    anterior (uma busca pelo índice) mais os itens do mês até a véspera
+    """
+    user_id = getattr(user, 'pk', user)
+    balance = to_cents(_checkpoint_before(user_id, day.year, day.month) or 0)
+    if day.day != 1:
+        balance += TransactionItem.objects.filter(
+            transaction__owner_id=user_id,
+            transaction__date__range=(day.replace(day=1), day - timedelta(days=1)),
+        ).aggregate(total=sum_cents('signed_amount'))['total'] or 0
+    return balance
+
+
+def opening_balance(user, day):
+    """
+    Saldo do usuário antes de `day`
+    """
+    return to_decimal(opening_balance_cents(user, day))
+
+
+def _month_index(day):
+    return day.year * 12 + day.month - 1
+
+
+def _split_range(start_date, end_date):
+    """
+    Divide o intervalo [start_date, end_date] em meses completos (atendidos
+    pelos consolidados) e pedaços de mês nas bordas (atendidos pelos itens).
+    Retorna (meses, bordas), onde meses é None quando não há mês completo ou
+    uma tupla (primeiro, último) de índices ano*12+mes-1, com None indicando
+    intervalo aberto daquele lado.
+    """
+    if start_date and end_date and start_date > end_date:
+        return None, []
+
+    first_month = _month_index(start_date) if start_date else None
+    last_month = _month_index(end_date) if end_date else None
+    edges = []
+
+    if start_date and start_date.day != 1:
+        month_end = month_bounds(start_date.year, start_date.month)[1]
+        if end_date and end_date <= month_end:
+            return None, [(start_date, end_date)]
+        edges.append((start_date, month_end))
+        first_month += 1
+
+    if end_date:
+        month_start, month_end = month_bounds(end_date.year, end_date.month)
+        if end_date != month_end:
+            edges.append((month_start, end_date))
+            last_month -= 1
+
+    if first_month is not None and last_month is not None and first_month > last_month:
+        return None, edges
+    return (first_month, last_month), edges
+
+
+def _rollup_queryset(user, months):
+    """
+    Consolidados do usuário entre dois índices de mês (inclusive)
+    """
+    first_month, last_month = months
+    queryset = MonthlyCategoryTotal.objects.filter(user=user, count__gt=0)
+    if first_month is not None:
+        year, month = divmod(first_month, 12)
+        queryset = queryset.filter(Q(year__gt=year) | Q(year=year, month__gte=month + 1))
+    if last_month is not None:
+        year, month = divmod(last_month, 12)
+        queryset = queryset.filter(Q(year__lt=year) | Q(year=year, month__lte=month + 1))
+    return queryset
+
+
+@cached_per_user('category-totals-between')
+def category_totals_between(user, start_date=None, end_date=None):
+    """
+    Totais e quantidades por categoria no intervalo de datas (inclusive).
+    Retorna um dicionário nome -> {'type', 'total', 'count'}.
+    """
+    months, edges = _split_range(start_date, end_date)
+    sources = []
+
+    if months:
+        sources.append(
+            _rollup_queryset(user, months).values(
+                'category__name', 'category__type'
+            ).annotate(total=sum_cents('total'), count=Sum('count')).order_by()
+        )
+    for edge_start, edge_end in edges:
+        sources.append(
+            TransactionItem.objects.filter(
+                transaction__owner=user,
+                transaction__date__range=(edge_start, edge_end),
+            ).values(
+                'category__name', 'category__type'
+            ).annotate(total=sum_cents('amount'), count=Count('id')).order_by()
+        )
+
+    # Somas em centavos inteiros, convertidas para Decimal só no resultado
+    category_totals = {}
+    for source in sources:
+        for row in source:
+            data = category_totals.setdefault(row['category__name'], {
+                'type': row['category__type'],
+                'total': 0,
+                'count': 0,
+            })
+            data['total'] += row['total']
+            data['count'] += row['count']
+
+    for data in category_totals.values():
+        data['total'] = to_decimal(data['total'])
+    return dict(sorted(category_totals.items()))
+
+
+@cached_per_user('monthly-totals-between')
+def monthly_totals_between(user, start_date=None, end_date=None, category_id=None):
+    """
+    Receitas, despesas e quantidade de itens por mês no intervalo de datas.
+    Retorna um dicionário (ano, mês) -> {'income', 'expense', 'count'}.
+    """
+    months, edges = _split_range(start_date, end_date)
+    sources = []
+
+    if months:
+        rollups = _rollup_queryset(user, months)
+        if category_id:
+            rollups = rollups.filter(category_id=category_id)
+        sources.append(
+            rollups.values('year', 'month', entry_type=F('category__type')).annotate(
+                total=sum_cents('total'), count=Sum('count')
+            ).order_by()
+        )
+    for edge_start, edge_end in edges:
+        items = TransactionItem.objects.filter(
+            transaction__owner=user,
+            transaction__date__range=(edge_start, edge_end),
+        )
+        if category_id:
+            items = items.filter(category_id=category_id)
+        sources.append(
+            items.annotate(
+                year=ExtractYear('transaction__date'),
+                month=ExtractMonth('transaction__date'),
+            ).values('year', 'month', 'entry_type').annotate(
+                total=sum_cents('amount'), count=Count('id')
+            ).order_by()
+        )
+
+    # Somas em centavos inteiros, convertidas para Decimal só no resultado
+    monthly_totals = {}
+    for source in sources:
+        for row in source:
+            data = monthly_totals.setdefault((row['year'], row['month']), {
+                'income': 0,
+                'expense': 0,
+                'count': 0,
+            })
+            if row['entry_type'] == Category.INCOME:
+                data['income'] += row['total']
+            else:  # EXPENSE
+                data['expense'] += row['total']
+            data['count'] += row['count']
+
+    for data in monthly_totals.values():
+        data['income'] = to_decimal(data['income'])
+        data['expense'] = to_decimal(data['expense'])
+    return monthly_totals
@@ -0,0 +1,50 @@
+from django.db import connection
+from django.db.models.expressions import RawSQL
+import re
+
+
+FTS_TABLE = 'core_transaction_fts'
+
+_WORD = re.compile(r'\w+')
+
+
+def fts_available():
+    """
+    Indica se o índice de busca existe no banco atual (criado pela migração
+    0005 apenas no SQLite com FTS5). O resultado fica guardado na conexão.
+    """
+    if connection.vendor != 'sqlite':
+        return False
+    name = connection.settings_dict['NAME']
+    cached = getattr(connection, '_core_fts_available', None)
+    if cached is None or cached[0] != name:
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = %s", [FTS_TABLE]
+            )
+            cached = (name, cursor.fetchone() is not None)
+        connection._core_fts_available = cached
+    return cached[1]
+
+
+def match_expression(term):
+    """
+    Converte o texto digitado em uma consulta FTS5: cada palavra vira um
+    prefixo entre aspas ("agu"* encontra "Água") e todas precisam aparecer
+    """
+    words = _WORD.findall(term)
+    return ' '.join(f'"{word}"*' for word in words)
+
+
+def search_transactions(queryset, term):
+    """
+    Filtra as transações cuja descrição contém as palavras de `term`,
+    usando o índice FTS5 quando disponível e icontains nos demais casos
+    """
+    expression = match_expression(term)
+    if not expression or not fts_available():
+        return queryset.filter(description__icontains=term)
+    return queryset.filter(pk__in=RawSQL(
+        f'SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s',
+        [expression],
+    ))
@@ -0,0 +1,185 @@
+from django.contrib.auth.models import User
+from django.db import connection, transaction
+from django.utils import timezone
+from .cache import bump_data_version
+from .imports import bulk_create_transactions
+from .models import Category, Transaction, TransactionItem
+from .rollups import rebuild_rollups
+from datetime import date
+from decimal import Decimal
+import calendar
+import random
+
+
+SEED_BATCH_SIZE = 5000
+
+# Categorias geradas para cada usuário:
+# (nome, tipo, peso no sorteio, valor mínimo, valor máximo, descrições)
+# O salário não entra no sorteio: é lançado uma vez por mês.
+SEED_CATEGORIES = [
+    ('Salário', Category.INCOME, 0, 2500, 15000, ['Salário mensal']),
+    ('Freelance', Category.INCOME, 3, 200, 3000, ['Projeto freelance', 'Consultoria']),
+    ('Rendimentos', Category.INCOME, 2, 5, 300, ['Rendimento poupança', 'Dividendos']),
+    ('Alimentação', Category.EXPENSE, 30, 15, 400, ['Supermercado', 'Padaria', 'Restaurante', 'Feira', 'Delivery']),
+    ('Transporte', Category.EXPENSE, 15, 5, 250, ['Combustível', 'Uber', 'Ônibus', 'Estacionamento']),
+    ('Moradia', Category.EXPENSE, 5, 800, 3000, ['Aluguel', 'Condomínio', 'IPTU']),
+    ('Luz', Category.EXPENSE, 3, 80, 400, ['Conta de luz']),
+    ('Água', Category.EXPENSE, 3, 40, 200, ['Conta de água']),
+    ('Lazer', Category.EXPENSE, 10, 20, 500, ['Cinema', 'Show', 'Viagem', 'Streaming']),
+    ('Saúde', Category.EXPENSE, 6, 30, 800, ['Farmácia', 'Consulta médica', 'Plano de saúde']),
+    ('Educação', Category.EXPENSE, 4, 50, 1500, ['Curso online', 'Livros', 'Mensalidade']),
+    ('Compras', Category.EXPENSE, 10, 30, 1200, ['Roupas', 'Eletrônicos', 'Móveis', 'Presente']),
+]
+
+
+def seed_username(index):
+    return f'seed{index:04d}'
+
+
+def seed_months(years, until=None):
+    """
+    Meses (ano, mês) gerados, em ordem, terminando em `until`
+    (padrão: o último mês completo, para não criar datas futuras)
+    """
+    if until is None:
+        today = timezone.now().date()
+        until = (today.year - 1, 12) if today.month == 1 else (today.year, today.month - 1)
+    year, month = until
+    months = []
+    for _ in range(years * 12):
+        months.append((year, month))
+        year, month = (year - 1, 12) if month == 1 else (year, month - 1)
+    months.reverse()
+    return months
+
+
+def _clear_ledger(user):
+    """
+    Remove as transações do usuário direto no banco; o delete() do ORM
+    dispararia os sinais para cada linha
+    """
+    items = TransactionItem._meta.db_table
+    transactions = Transaction._meta.db_table
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(
+            f'DELETE FROM {items} WHERE transaction_id IN (SELECT id FROM {transactions} WHERE owner_id = %s)',
+            [user.pk],
+        )
+        cursor.execute(f'DELETE FROM {transactions} WHERE owner_id = %s', [user.pk])
+
+
+def _seed_categories(user):
+    existing = {category.name: category for category in Category.objects.filter(user=user)}
+    missing = [
+        Category(name=name, type=category_type, user=user)
+        for name, category_type, *_ in SEED_CATEGORIES
+        if name not in existing
+    ]
+    if missing:
+        Category.objects.bulk_create(missing)
+        existing = {category.name: category for category in Category.objects.filter(user=user)}
+    # Só valores simples: a lista vai para os processos que sorteiam o razão
+    return [(existing[spec[0]].pk, *spec[1:]) for spec in SEED_CATEGORIES]
+
+
+def _amount(rng, minimum, maximum):
+    return Decimal(rng.randint(minimum * 100, maximum * 100)) / 100
+
+
+def prepare_user(index, password_hash):
+    """
+    Cria (ou limpa) o usuário seed<index> e as suas categorias.
+    Retorna (id do usuário, categorias) para generate_entries.
+    """
+    user, created = User.objects.get_or_create(
+        username=seed_username(index),
+        defaults={'email': f'{seed_username(index)}@demo.com', 'password': password_hash},
+    )
+    if not created:
+        _clear_ledger(user)
+    return user.pk, _seed_categories(user)
+
+
+def generate_entries(index, months, tx_per_month, items_per_tx, seed, categories):
+    """
+    Sorteia as transações do usuário seed<index>, sem tocar no banco (pode rodar
+    em outro processo). O gerador aleatório é semeado com (seed, usuário), então
+    o resultado não depende da ordem nem do processo em que cada usuário é gerado.
+    Retorna [(data, descrição, [(id da categoria, tipo, valor)])].
+    """
+    rng = random.Random(f'{seed}:{index}')
+    salary = categories[0]
+    drawable = [spec for spec in categories if spec[2]]
+    weights = [spec[2] for spec in drawable]
+    # Itens extras de uma transação são do mesmo tipo do primeiro
+    by_type = {
+        category_type: (
+            [spec for spec in drawable if spec[1] == category_type],
+            [spec[2] for spec in drawable if spec[1] == category_type],
+        )
+        for category_type in (Category.INCOME, Category.EXPENSE)
+    }
+    salary_amount = _amount(rng, salary[3], salary[4])
+
+    entries = []
+    for year, month in months:
+        last_day = calendar.monthrange(year, month)[1]
+        entries.append((date(year, month, min(5, last_day)), rng.choice(salary[5]), [(salary, salary_amount)]))
+        for _ in range(tx_per_month - 1):
+            first = rng.choices(drawable, weights)[0]
+            pool, pool_weights = by_type[first[1]]
+            specs = [first] + rng.choices(pool, pool_weights, k=rng.randint(1, items_per_tx) - 1)
+            entries.append((
+                date(year, month, rng.randint(1, last_day)),
+                rng.choice(specs[0][5]),
+                [(spec, _amount(rng, spec[3], spec[4])) for spec in specs],
+            ))
+    return [
+        (day, description, [(spec[0], spec[1], amount) for spec, amount in lines])
+        for day, description, lines in entries
+    ]
+
+
+def write_entries(user_id, entries, batch_size=SEED_BATCH_SIZE):
+    """
+    Grava as transações sorteadas por generate_entries com bulk_create e
+    recalcula os consolidados do usuário. Retorna (transações, itens).
+    """
+    transactions_created = items_created = 0
+    pending = []
+    for day, description, lines in entries:
+        items = []
+        for category_id, category_type, amount in lines:
+            item = TransactionItem(category_id=category_id, amount=amount)
+            item.set_entry_type(category_type)
+            items.append(item)
+        pending.append((
+            Transaction(description=description, date=day, owner_id=user_id),
+            items,
+        ))
+        transactions_created += 1
+        items_created += len(items)
+
+        if len(pending) >= batch_size:
+            # Commits curtos para não segurar o banco (o SQLite tem um único escritor)
+            with transaction.atomic():
+                bulk_create_transactions(pending, batch_size)
+
+    if pending:
+        with transaction.atomic():
+            bulk_create_transactions(pending, batch_size)
+
+    rebuild_rollups(user_id)
+    bump_data_version(user_id)
+    return transactions_created, items_created
+
+
+def generate_user_ledger(index, months, tx_per_month, items_per_tx, seed,
+                         password_hash, batch_size=SEED_BATCH_SIZE):
+    """
+    Gera (ou regera) o razão do usuário seed<index> no processo atual.
+    Retorna (transações, itens).
+    """
+    user_id, categories = prepare_user(index, password_hash)
+    entries = generate_entries(index, months, tx_per_month, items_per_tx, seed, categories)
+    return write_entries(user_id, entries, batch_size)
@@ -0,0 +1,157 @@
+from django.db.models.functions import TruncWeek
+from .cache import cached_per_user
+from .models import TransactionItem
+from .money import sum_cents, to_cents, to_decimal
+from .rollups import month_bounds, monthly_totals_between, opening_balance_cents
+from datetime import timedelta
+
+
+DAY = 'day'
+WEEK = 'week'
+MONTH = 'month'
+RESOLUTIONS = (DAY, WEEK, MONTH)
+
+# Escolha automática da resolução pelo tamanho do intervalo, em dias:
+# até DAILY_MAX_DAYS um ponto por dia, até WEEKLY_MAX_DAYS um por semana,
+# acima disso um por mês (calculado dos consolidados mensais)
+DAILY_MAX_DAYS = 92
+WEEKLY_MAX_DAYS = 366
+
+# Pontos por série enviados ao gráfico (padrão e máximo aceito)
+SERIES_MAX_POINTS = 200
+SERIES_POINTS_LIMIT = 2000
+
+
+def pick_resolution(start_date, end_date):
+    """
+    Resolução mais fina que mantém o intervalo em poucos pontos antes da redução
+    """
+    days = (end_date - start_date).days
+    if days < DAILY_MAX_DAYS:
+        return DAY
+    if days < WEEKLY_MAX_DAYS:
+        return WEEK
+    return MONTH
+
+
+def _daily_deltas(user, start_date, end_date):
+    rows = TransactionItem.objects.filter(
+        transaction__owner=user,
+        transaction__date__range=(start_date, end_date),
+    ).values('transaction__date').annotate(
+        total=sum_cents('signed_amount')
+    ).order_by('transaction__date')
+    return [(row['transaction__date'], row['total']) for row in rows]
+
+
+def _weekly_deltas(user, start_date, end_date):
+    # Cada semana é datada pelo seu último dia (ou pelo fim do intervalo)
+    rows = TransactionItem.objects.filter(
+        transaction__owner=user,
+        transaction__date__range=(start_date, end_date),
+    ).annotate(week=TruncWeek('transaction__date')).values('week').annotate(
+        total=sum_cents('signed_amount')
+    ).order_by('week')
+    return [(min(row['week'] + timedelta(days=6), end_date), row['total']) for row in rows]
+
+
+def _monthly_deltas(user, start_date, end_date):
+    # Cada mês é datado pelo seu último dia (ou pelo fim do intervalo)
+    monthly_totals = monthly_totals_between(user, start_date, end_date)
+    return [
+        (min(month_bounds(year, month)[1], end_date), to_cents(data['income']) - to_cents(data['expense']))
+        for (year, month), data in sorted(monthly_totals.items())
+    ]
+
+
+_DELTAS = {
+    DAY: _daily_deltas,
+    WEEK: _weekly_deltas,
+    MONTH: _monthly_deltas,
+}
+
+
+def lttb(xs, ys, threshold):
+    """
+    Largest-Triangle-Three-Buckets: índices de `threshold` pontos que preservam
+    o formato da série. Mantém o primeiro e o último; de cada balde intermediário
+    fica o ponto que forma o maior triângulo com o escolhido no balde anterior e
+    a média do balde seguinte.
+    """
+    count = len(xs)
+    if threshold >= count:
+        return list(range(count))
+    if threshold < 3:
+        return [0, count - 1][:max(threshold, 0)]
+
+    every = (count - 2) / (threshold - 2)
+    selected = [0]
+    previous = 0
+    for bucket in range(threshold - 2):
+        # Média do balde seguinte (o último balde usa o ponto final)
+        next_start = int((bucket + 1) * every) + 1
+        next_end = min(int((bucket + 2) * every) + 1, count)
+        average_x = sum(xs[next_start:next_end]) / (next_end - next_start)
+        average_y = sum(ys[next_start:next_end]) / (next_end - next_start)
+
+        chosen = start = int(bucket * every) + 1
+        largest = -1
+        for index in range(start, int((bucket + 1) * every) + 1):
+            area = abs(
+                (xs[previous] - average_x) * (ys[index] - ys[previous])
+                - (xs[previous] - xs[index]) * (average_y - ys[previous])
+            )
+            if area > largest:
+                largest = area
+                chosen = index
+        selected.append(chosen)
+        previous = chosen
+    selected.append(count - 1)
+    return selected
+
+
+def columnar(points, resolution=DAY):
+    """
+    Converte uma lista [{'date', 'balance'}] para o formato colunar das séries
+    """
+    return {
+        'resolution': resolution,
+        'dates': [point['date'] for point in points],
+        'values': [point['balance'] for point in points],
+    }
+
+
+def category_columns(category_totals):
+    """
+    Totais por categoria {nome: valor} como listas paralelas de nomes e valores
+    """
+    return {
+        'labels': list(category_totals),
+        'values': list(category_totals.values()),
+    }
+
+
+@cached_per_user('balance-series')
+def balance_series(user, start_date, end_date, resolution=None, max_points=SERIES_MAX_POINTS):
+    """
+    Saldo acumulado no intervalo, partindo do saldo real no início, na
+    resolução pedida (ou escolhida pelo tamanho do intervalo) e reduzido com
+    LTTB a no máximo `max_points` pontos
+    Retorna {'resolution', 'dates', 'values'} com listas paralelas
+    """
+    resolution = resolution or pick_resolution(start_date, end_date)
+    cumulative_balance = opening_balance_cents(user, start_date)
+
+    dates = []
+    values = []
+    for day, total in _DELTAS[resolution](user, start_date, end_date):
+        cumulative_balance += total
+        dates.append(day)
+        values.append(float(to_decimal(cumulative_balance)))
+
+    kept = lttb([day.toordinal() for day in dates], values, max_points)
+    return {
+        'resolution': resolution,
+        'dates': [dates[index].strftime('%Y-%m-%d') for index in kept],
+        'values': [values[index] for index in kept],
+    }
@@ -1,86 +1,120 @@
-from django.db.models import Sum, Q
+from concurrent.futures import ThreadPoolExecutor
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.db.models import Q
 from django.utils import timezone
-from .models import Transaction, TransactionItem, Category
-from decimal import Decimal
+from .models import Transaction, TransactionItem, Category, MonthlyCategoryTotal
+from .cache import cached_per_user
+from .money import sum_cents, to_cents, to_decimal
+from .rollups import category_totals_between, opening_balance_cents
+from .series import balance_series
 from collections import defaultdict
 import calendar
 import json
+import logging
+import threading
 
 
+logger = logging.getLogger(__name__)
+
+_prefetch_executor = None
+_prefetch_lock = threading.Lock()
+
+
+@cached_per_user('month-summary')
 def get_month_summary(user, year, month):
     """
     Obtém receita, despesa e saldo para um mês específico
     """
-    # Primeiro dia do mês
-    start_date = timezone.datetime(year, month, 1).date()
-    # Último dia do mês
-    last_day = calendar.monthrange(year, month)[1]
-    end_date = timezone.datetime(year, month, last_day).date()
+    # Lê os consolidados mensais em vez de percorrer os itens do mês
+    totals_by_type = MonthlyCategoryTotal.objects.filter(
+        user=user,
+        year=year,
+        month=month,
+        count__gt=0
+    ).values('category__type').annotate(total=sum_cents('total')).order_by()
     
-    # Obtém todas as transações do usuário no mês especificado
-    transactions = Transaction.objects.filter(
-        owner=user,
-        date__range=(start_date, end_date)
-    )
+    # Calcula os totais em centavos
+    total_income = 0
+    total_expense = 0
     
-    # Calcula os totais
-    total_income = Decimal('0.00')
-    total_expense = Decimal('0.00')
-    
-    for transaction in transactions:
-        for item in transaction.items.all():
-            if item.category.type == Category.INCOME:
-                total_income += item.amount
-            else:  # EXPENSE
-                total_expense += item.amount
-    
-    balance = total_income - total_expense
+    for row in totals_by_type:
+        if row['category__type'] == Category.INCOME:
+            total_income += row['total']
+        else:  # EXPENSE
+            total_expense += row['total']
     
     return {
-        'income': total_income,
-        'expense': total_expense,
-        'balance': balance
+        'income': to_decimal(total_income),
+        'expense': to_decimal(total_expense),
+        'balance': to_decimal(total_income - total_expense)
     }
 
 
+@cached_per_user('category-totals')
 def get_category_totals(user, year, month):
     """
     Obtém totais por categoria para um mês específico
     Retorna um dicionário que pode ser facilmente convertido para JSON
     """
+    # Agrupa os consolidados do mês por categoria
+    category_totals = MonthlyCategoryTotal.objects.filter(
+        user=user,
+        year=year,
+        month=month,
+        count__gt=0
+    ).values('category__name').annotate(total=sum_cents('total')).order_by('category__name')
+    
+    # Converte para dict regular e valores float para serialização JSON
+    result = {}
+    for row in category_totals:
+        result[row['category__name']] = float(to_decimal(row['total']))
+    
+    return result
+
+
+@cached_per_user('daily-balance')
+def get_daily_balance_series(user, year, month):
+    """
+    Obtém a série de saldo diário para um mês específico, partindo do saldo
+    real no início do mês
+    Retorna uma lista que pode ser facilmente convertida para JSON
+    """
     # Primeiro dia do mês
     start_date = timezone.datetime(year, month, 1).date()
     # Último dia do mês
     last_day = calendar.monthrange(year, month)[1]
     end_date = timezone.datetime(year, month, last_day).date()
     
-    # Obtém todos os itens de transação do usuário no mês especificado
-    transaction_items = TransactionItem.objects.filter(
+    # Saldo de cada dia do mês somado no banco, em centavos, uma linha por data
+    daily_amounts = TransactionItem.objects.filter(
         transaction__owner=user,
         transaction__date__range=(start_date, end_date)
-    ).select_related('category')
-    
-    # Agrupa por categoria
-    category_totals = defaultdict(Decimal)
+    ).values('transaction__date').annotate(
+        balance=sum_cents('signed_amount')
+    ).order_by('transaction__date')
     
-    for item in transaction_items:
-        if item.category.type == Category.INCOME:
-            category_totals[item.category.name] += item.amount
-        else:  # EXPENSE
-            category_totals[item.category.name] += item.amount
+    # Calcula o saldo cumulativo a partir do saldo de abertura do mês
+    balance_series = []
+    cumulative_balance = opening_balance_cents(user, start_date)
     
-    # Converte para dict regular e valores float para serialização JSON
-    result = {}
-    for key, value in category_totals.items():
-        result[key] = float(value)
+    for row in daily_amounts:
+        cumulative_balance += row['balance']
+        balance_series.append({
+            'date': row['transaction__date'].strftime('%Y-%m-%d'),
+            'balance': float(to_decimal(cumulative_balance))
+        })
     
-    return result
+    return balance_series
 
 
-def get_daily_balance_series(user, year, month):
+@cached_per_user('dashboard')
+def get_dashboard_data(user, year, month):
     """
-    Obtém a série de saldo diário para um mês específico
-    Retorna uma lista que pode ser facilmente convertida para JSON
+    Obtém resumo, totais por categoria e série de saldo diário de um mês
+    com uma única consulta agrupada por data e categoria
+    Retorna os mesmos dicionários de get_month_summary, get_category_totals
+    e get_daily_balance_series
     """
     # Primeiro dia do mês
     start_date = timezone.datetime(year, month, 1).date()
@@ -88,32 +122,156 @@ def get_daily_balance_series(user, year, month):
     last_day = calendar.monthrange(year, month)[1]
     end_date = timezone.datetime(year, month, last_day).date()
     
-    # Obtém todos os itens de transação do usuário no mês especificado
-    transaction_items = TransactionItem.objects.filter(
+    # Receitas e despesas somadas no banco, uma linha por (data, categoria)
+    rows = TransactionItem.objects.filter(
         transaction__owner=user,
         transaction__date__range=(start_date, end_date)
-    ).select_related('category', 'transaction')
+    ).values(
+        'transaction__date', 'category__name'
+    ).annotate(
+        income=sum_cents('amount', filter=Q(entry_type=Category.INCOME)),
+        expense=sum_cents('amount', filter=Q(entry_type=Category.EXPENSE))
+    ).order_by('transaction__date')
     
-    # Agrupa por data e calcula valores diários
-    daily_amounts = defaultdict(Decimal)
+    # Separa os resultados em Python, somando centavos inteiros
+    total_income = 0
+    total_expense = 0
+    category_totals = defaultdict(int)
+    daily_amounts = defaultdict(int)
     
-    for item in transaction_items:
-        date = item.transaction.date
-        if item.category.type == Category.INCOME:
-            daily_amounts[date] += item.amount
-        else:  # EXPENSE
-            daily_amounts[date] -= item.amount
+    for row in rows:
+        income = row['income'] or 0
+        expense = row['expense'] or 0
+        total_income += income
+        total_expense += expense
+        category_totals[row['category__name']] += income + expense
+        daily_amounts[row['transaction__date']] += income - expense
     
-    # Calcula o saldo cumulativo
-    dates = sorted(daily_amounts.keys())
+    # Calcula o saldo cumulativo a partir do saldo de abertura do mês
     balance_series = []
-    cumulative_balance = Decimal('0.00')
+    cumulative_balance = opening_balance_cents(user, start_date)
     
-    for date in dates:
+    for date in sorted(daily_amounts):
         cumulative_balance += daily_amounts[date]
         balance_series.append({
             'date': date.strftime('%Y-%m-%d'),
-            'balance': float(cumulative_balance)
+            'balance': float(to_decimal(cumulative_balance))
         })
     
-    return balance_series
\ No newline at end of file
+    return {
+        'summary': {
+            'income': to_decimal(total_income),
+            'expense': to_decimal(total_expense),
+            'balance': to_decimal(total_income - total_expense)
+        },
+        'category_totals': {
+            name: float(to_decimal(total)) for name, total in sorted(category_totals.items())
+        },
+        'daily_balance': balance_series
+    }
+
+
+@cached_per_user('transaction-report-totals')
+def get_transaction_report_totals(user, start_date=None, end_date=None, category_id=None):
+    """
+    Obtém receita, despesa e saldo das transações do relatório de transações
+    Considera todos os itens das transações que passam pelos filtros
+    """
+    transactions = Transaction.objects.filter(owner=user)
+    if start_date:
+        transactions = transactions.filter(date__gte=start_date)
+    if end_date:
+        transactions = transactions.filter(date__lte=end_date)
+    if category_id:
+        transactions = transactions.filter(items__category_id=category_id)
+    
+    totals = TransactionItem.objects.filter(
+        transaction__in=transactions.values('pk')
+    ).aggregate(
+        income=sum_cents('amount', filter=Q(entry_type=Category.INCOME)),
+        expense=sum_cents('amount', filter=Q(entry_type=Category.EXPENSE))
+    )
+    
+    total_income = totals['income'] or 0
+    total_expense = totals['expense'] or 0
+    
+    return {
+        'income': to_decimal(total_income),
+        'expense': to_decimal(total_expense),
+        'balance': to_decimal(total_income - total_expense)
+    }
+
+
+def shift_month(year, month, offset):
+    """
+    Retorna (ano, mês) deslocado de `offset` meses
+    """
+    year, month = divmod(year * 12 + month - 1 + offset, 12)
+    return year, month + 1
+
+
+@cached_per_user('dashboard-range')
+def get_range_dashboard_data(user, start_date, end_date):
+    """
+    Obtém resumo, totais por categoria e série de saldo de um intervalo de
+    datas. Meses completos vêm dos consolidados mensais; a série de saldo vem
+    de core.series, já no formato colunar e reduzida para o gráfico
+    """
+    category_totals = category_totals_between(user, start_date, end_date)
+    
+    # Calcula os totais em centavos
+    total_income = 0
+    total_expense = 0
+    
+    for data in category_totals.values():
+        if data['type'] == Category.INCOME:
+            total_income += to_cents(data['total'])
+        else:  # EXPENSE
+            total_expense += to_cents(data['total'])
+    
+    return {
+        'summary': {
+            'income': to_decimal(total_income),
+            'expense': to_decimal(total_expense),
+            'balance': to_decimal(total_income - total_expense)
+        },
+        'category_totals': {
+            name: float(data['total']) for name, data in category_totals.items()
+        },
+        'balance_series': balance_series(user, start_date, end_date)
+    }
+
+
+def _get_prefetch_executor():
+    global _prefetch_executor
+    with _prefetch_lock:
+        if _prefetch_executor is None:
+            _prefetch_executor = ThreadPoolExecutor(
+                max_workers=getattr(settings, 'DASHBOARD_PREFETCH_WORKERS', 1),
+                thread_name_prefix='dashboard-prefetch',
+            )
+        return _prefetch_executor
+
+
+def prefetch_dashboard_months(user, months):
+    """
+    Calcula e guarda em cache o dashboard dos meses informados em uma thread,
+    depois do commit, para que a navegação entre meses vizinhos seja um acerto
+    de cache. Desligado com DASHBOARD_PREFETCH = False.
+    """
+    if not getattr(settings, 'DASHBOARD_PREFETCH', True) or not months:
+        return
+    user_id = getattr(user, 'pk', user)
+    transaction.on_commit(lambda: _get_prefetch_executor().submit(_prefetch_in_thread, user_id, list(months)))
+
+
+def _prefetch_in_thread(user_id, months):
+    close_old_connections()
+    try:
+        for year, month in months:
+            get_dashboard_data(user_id, year, month)
+    except Exception:
+        logger.exception('Falha ao pré-calcular o dashboard do usuário %s', user_id)
+    finally:
+        # Cada thread abre sua própria conexão com o banco
+        close_old_connections()
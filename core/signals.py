@@ -0,0 +1,189 @@
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.db.models import F
+from django.db.models.signals import post_delete, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+from django.utils.dateparse import parse_date
+from .cache import bump_data_version
+from .models import Category, Transaction, TransactionItem
+from .rollups import apply_balance_delta, apply_delta, apply_transaction_delta, rebuild_checkpoints
+from .totals import signed_total, total_changed
+from decimal import Decimal
+import threading
+
+
+# Itens atualizados por UPDATE quando o tipo de uma categoria muda
+RETYPE_BATCH_SIZE = 2000
+
+# Transações sendo excluídas nesta thread: seus itens já foram retirados dos
+# consolidados de uma só vez em pre_delete e não devem ser descontados de novo
+_deleting = threading.local()
+
+
+def _deleting_ids():
+    if not hasattr(_deleting, 'ids'):
+        _deleting.ids = set()
+    return _deleting.ids
+
+
+def _as_date(value):
+    if isinstance(value, str):
+        return parse_date(value)
+    return value
+
+
+@receiver(pre_save, sender=Transaction)
+def remember_transaction_month(sender, instance, raw=False, **kwargs):
+    instance._rollup_previous = None
+    if raw or instance.pk is None:
+        return
+    instance._rollup_previous = Transaction.objects.filter(pk=instance.pk).values(
+        'owner_id', 'date'
+    ).first()
+
+
+@receiver(post_save, sender=Transaction)
+def move_transaction_rollups(sender, instance, created, raw=False, **kwargs):
+    bump_data_version(instance.owner_id)
+    previous = getattr(instance, '_rollup_previous', None)
+    if raw or created or previous is None:
+        return
+
+    new_date = _as_date(instance.date)
+    if previous['owner_id'] == instance.owner_id and previous['date'] == new_date:
+        return
+
+    # A data ou o dono mudou: os itens já gravados trocam de mês
+    if previous['owner_id'] != instance.owner_id:
+        bump_data_version(previous['owner_id'])
+    apply_transaction_delta(instance.pk, previous['owner_id'], previous['date'], -1)
+    apply_transaction_delta(instance.pk, instance.owner_id, new_date, 1)
+
+
+@receiver(pre_delete, sender=Transaction)
+def discount_deleted_transaction(sender, instance, **kwargs):
+    apply_transaction_delta(instance.pk, instance.owner_id, _as_date(instance.date), -1)
+    _deleting_ids().add(instance.pk)
+
+
+@receiver(post_delete, sender=Transaction)
+def forget_deleted_transaction(sender, instance, **kwargs):
+    _deleting_ids().discard(instance.pk)
+    bump_data_version(instance.owner_id)
+
+
+@receiver(pre_save, sender=TransactionItem)
+def remember_item_values(sender, instance, raw=False, **kwargs):
+    instance._rollup_previous = None
+    if raw or instance.pk is None:
+        return
+    instance._rollup_previous = TransactionItem.objects.filter(pk=instance.pk).values(
+        'category_id', 'amount', 'signed_amount', 'transaction_id', 'transaction__owner_id', 'transaction__date'
+    ).first()
+
+
+@receiver(post_save, sender=TransactionItem)
+def update_item_rollups(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+
+    previous = getattr(instance, '_rollup_previous', None)
+    if previous is not None:
+        apply_delta(
+            previous['transaction__owner_id'],
+            previous['transaction__date'],
+            previous['category_id'],
+            -previous['amount'],
+            -1,
+        )
+        apply_balance_delta(
+            previous['transaction__owner_id'],
+            previous['transaction__date'],
+            -previous['signed_amount'],
+        )
+
+    total_changed(instance.transaction_id)
+    if previous is not None and previous['transaction_id'] != instance.transaction_id:
+        total_changed(previous['transaction_id'])
+
+    parent = instance.transaction
+    bump_data_version(parent.owner_id)
+    if previous is not None and previous['transaction__owner_id'] != parent.owner_id:
+        bump_data_version(previous['transaction__owner_id'])
+    apply_delta(
+        parent.owner_id,
+        _as_date(parent.date),
+        instance.category_id,
+        Decimal(str(instance.amount)),
+        1,
+    )
+    apply_balance_delta(parent.owner_id, _as_date(parent.date), instance.signed_amount)
+
+
+@receiver(post_delete, sender=TransactionItem)
+def discount_deleted_item(sender, instance, **kwargs):
+    if instance.transaction_id in _deleting_ids():
+        return
+
+    parent = Transaction.objects.filter(pk=instance.transaction_id).values('owner_id', 'date').first()
+    if parent is None:
+        return
+    total_changed(instance.transaction_id)
+    bump_data_version(parent['owner_id'])
+    apply_delta(parent['owner_id'], parent['date'], instance.category_id, -Decimal(str(instance.amount)), -1)
+    apply_balance_delta(parent['owner_id'], parent['date'], -instance.signed_amount)
+
+
+@receiver(pre_save, sender=Category)
+def remember_category_type(sender, instance, raw=False, **kwargs):
+    instance._previous_type = None
+    if raw or instance.pk is None:
+        return
+    instance._previous_type = Category.objects.filter(pk=instance.pk).values_list(
+        'type', flat=True
+    ).first()
+
+
+@receiver(post_save, sender=Category)
+def retype_category_items(sender, instance, raw=False, **kwargs):
+    previous_type = getattr(instance, '_previous_type', None)
+    if raw or previous_type is None or previous_type == instance.type:
+        return
+
+    # Atualiza entry_type e signed_amount dos itens da categoria em lotes por pk,
+    # para não segurar uma única UPDATE sobre todos os itens do usuário
+    items = TransactionItem.objects.filter(category_id=instance.pk)
+    sign = TransactionItem.sign(instance.type)
+    last_pk = 0
+    with transaction.atomic():
+        while True:
+            batch = list(
+                items.filter(pk__gt=last_pk).order_by('pk').values_list('pk', flat=True)[:RETYPE_BATCH_SIZE]
+            )
+            if not batch:
+                break
+            batch_items = items.filter(pk__gte=batch[0], pk__lte=batch[-1])
+            batch_items.update(
+                entry_type=instance.type,
+                signed_amount=F('amount') * sign,
+            )
+            # Os totais das transações desses itens mudam de sinal junto
+            Transaction.objects.filter(pk__in=batch_items.values('transaction_id')).update(
+                total_amount=signed_total()
+            )
+            last_pk = batch[-1]
+        # Os saldos de fechamento do usuário também mudam a partir do primeiro mês afetado
+        rebuild_checkpoints(instance.user_id)
+
+
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+def invalidate_category_owner(sender, instance, **kwargs):
+    bump_data_version(instance.user_id)
+
+
+@receiver(post_save, sender=User)
+def invalidate_new_user(sender, instance, created, raw=False, **kwargs):
+    # Um id reaproveitado (ex.: após rollback) não deve enxergar o cache antigo
+    if created and not raw:
+        bump_data_version(instance.pk)
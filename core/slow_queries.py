@@ -0,0 +1,190 @@
+from django.conf import settings
+from logging.handlers import RotatingFileHandler
+from pathlib import Path
+import json
+import logging
+import os
+import re
+import sys
+import threading
+import time
+
+
+logger = logging.getLogger('core.slow_queries')
+logger.propagate = False
+
+# Arquivos cujo quadro da pilha identifica a origem da consulta, em ordem de preferência
+SOURCE_FILES = ('core/views.py', 'core/services.py', 'core/reports.py')
+
+MAX_PARAM_LENGTH = 200
+
+_CORE_DIR = os.path.dirname(os.path.abspath(__file__)) + os.sep
+_handler_lock = threading.Lock()
+_handler = None
+
+
+def log_path():
+    return Path(getattr(settings, 'SLOW_QUERY_LOG', 'slow_queries.log'))
+
+
+def _ensure_handler():
+    # O arquivo só é criado quando a primeira consulta lenta aparece;
+    # o handler é refeito se SLOW_QUERY_LOG mudar
+    global _handler
+    path = os.path.abspath(log_path())
+    if _handler is not None and _handler.baseFilename == path:
+        return
+    with _handler_lock:
+        if _handler is not None:
+            if _handler.baseFilename == path:
+                return
+            logger.removeHandler(_handler)
+            _handler.close()
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        _handler = RotatingFileHandler(
+            path,
+            maxBytes=getattr(settings, 'SLOW_QUERY_LOG_MAX_BYTES', 10 * 1024 * 1024),
+            backupCount=getattr(settings, 'SLOW_QUERY_LOG_BACKUPS', 5),
+            encoding='utf-8',
+        )
+        _handler.setFormatter(logging.Formatter('%(message)s'))
+        logger.addHandler(_handler)
+        logger.setLevel(logging.INFO)
+
+
+def originating_frame():
+    """
+    Quadro da pilha que originou a consulta: o mais próximo em views.py ou
+    services.py, senão o mais próximo no app core (fora deste módulo)
+    """
+    fallback = None
+    frame = sys._getframe(1)
+    while frame is not None:
+        filename = frame.f_code.co_filename.replace(os.sep, '/')
+        if filename.endswith(SOURCE_FILES):
+            return _describe(frame)
+        if (fallback is None and frame.f_code.co_filename.startswith(_CORE_DIR)
+                and frame.f_code.co_filename != __file__):
+            fallback = frame
+        frame = frame.f_back
+    return _describe(fallback) if fallback is not None else None
+
+
+def _describe(frame):
+    filename = os.path.relpath(frame.f_code.co_filename, os.path.dirname(_CORE_DIR.rstrip(os.sep)))
+    return f'{filename.replace(os.sep, "/")}:{frame.f_lineno} in {frame.f_code.co_name}'
+
+
+def _param(value):
+    text = repr(value)
+    if len(text) > MAX_PARAM_LENGTH:
+        text = text[:MAX_PARAM_LENGTH] + '...'
+    return text
+
+
+def slow_query_logger(execute, sql, params, many, context):
+    """
+    Execute wrapper que grava no log as consultas mais lentas que
+    SLOW_QUERY_THRESHOLD_MS, com parâmetros e quadro de origem
+    """
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        duration_ms = (time.perf_counter() - started) * 1000
+        threshold = getattr(settings, 'SLOW_QUERY_THRESHOLD_MS', None)
+        if threshold is not None and duration_ms >= threshold:
+            _ensure_handler()
+            if many:
+                # executemany: só o primeiro conjunto de parâmetros
+                params = next(iter(params or []), None)
+            logger.info(json.dumps({
+                'time': time.strftime('%Y-%m-%dT%H:%M:%S'),
+                'duration_ms': round(duration_ms, 3),
+                'database': context['connection'].alias,
+                'sql': sql,
+                'params': [_param(value) for value in params or []],
+                'many': many,
+                'frame': originating_frame(),
+            }))
+
+
+def install(connection, **kwargs):
+    """
+    Receptor de connection_created: instala o wrapper em cada conexão nova
+    """
+    if slow_query_logger not in connection.execute_wrappers:
+        connection.execute_wrappers.append(slow_query_logger)
+
+
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r'\b\d+(?:\.\d+)?\b')
+_PLACEHOLDER_LIST = re.compile(r'\(\s*\?(?:\s*,\s*\?)*\s*\)')
+_SPACES = re.compile(r'\s+')
+
+
+def fingerprint(sql):
+    """
+    Normaliza o SQL para agrupar consultas iguais com valores diferentes:
+    literais e parâmetros viram ?, listas IN viram (...)
+    """
+    sql = _STRING.sub('?', sql)
+    sql = sql.replace('%s', '?')
+    sql = _NUMBER.sub('?', sql)
+    sql = _PLACEHOLDER_LIST.sub('(...)', sql)
+    return _SPACES.sub(' ', sql).strip()
+
+
+def read_entries(path):
+    """
+    Entradas do log e das suas cópias rotacionadas (path.1, path.2, ...),
+    da mais antiga para a mais recente
+    """
+    path = Path(path)
+    rotated = sorted(
+        path.parent.glob(f'{path.name}.*'),
+        key=lambda item: int(item.suffix[1:]) if item.suffix[1:].isdigit() else 0,
+        reverse=True,
+    )
+    for log_file in rotated + [path]:
+        if not log_file.exists():
+            continue
+        with open(log_file, encoding='utf-8') as source:
+            for line in source:
+                try:
+                    yield json.loads(line)
+                except ValueError:
+                    # Linha truncada durante a rotação
+                    continue
+
+
+def summarize(entries):
+    """
+    Agrupa as entradas por fingerprint, ordenadas pelo tempo total
+    """
+    groups = {}
+    for entry in entries:
+        key = fingerprint(entry['sql'])
+        group = groups.get(key)
+        if group is None:
+            group = groups[key] = {
+                'fingerprint': key,
+                'count': 0,
+                'total_ms': 0.0,
+                'max_ms': 0.0,
+                'frames': {},
+                'example': entry,
+            }
+        group['count'] += 1
+        group['total_ms'] += entry['duration_ms']
+        if entry['duration_ms'] > group['max_ms']:
+            group['max_ms'] = entry['duration_ms']
+            group['example'] = entry
+        frame = entry.get('frame')
+        group['frames'][frame] = group['frames'].get(frame, 0) + 1
+
+    summary = sorted(groups.values(), key=lambda group: group['total_ms'], reverse=True)
+    for group in summary:
+        group['mean_ms'] = group['total_ms'] / group['count']
+        group['frames'] = sorted(group['frames'].items(), key=lambda item: item[1], reverse=True)
+    return summary
@@ -1,9 +1,53 @@
-from django.test import TestCase
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.apps import apps
+from django.core.cache import cache
+from django.core.cache.backends.filebased import FileBasedCache
+from django.db import connection
+from django.db.models.signals import pre_save
 from django.contrib.auth.models import User
+from django.urls import reverse
 from django.utils import timezone
 from decimal import Decimal
-from .models import Category, Transaction, TransactionItem
-from .services import get_month_summary, get_category_totals, get_daily_balance_series
+from .models import BalanceCheckpoint, Category, Transaction, TransactionItem, MonthlyCategoryTotal, ReportJob
+from .services import (
+    get_month_summary, get_category_totals, get_daily_balance_series, get_dashboard_data,
+    get_transaction_report_totals,
+)
+from .rollups import (
+    category_totals_between, monthly_totals_between, opening_balance, rebuild_checkpoints, rebuild_rollups,
+)
+from .cache import bump_data_version, get_data_version, make_cache_key
+from .pdf import PDF_ROWS_PER_TABLE, FlowableStream, StreamingCanvas, build_pdf, chunked_tables
+from .jobs import run_pending_jobs
+from .search import fts_available, search_transactions
+from .imports import csv_rows, import_transactions, ofx_rows
+from .benchmarks import (
+    MEMORY_BUDGETS, SCENARIOS, compare_results, memory_regressions, percentile, run_memory_scenario,
+    run_scenario, scenario_context,
+)
+from .seeding import generate_user_ledger, seed_months, seed_username
+from .metrics import registry as metrics_registry
+from .slow_queries import fingerprint, read_entries, summarize
+from .reports import REPORTS, RENDERERS
+from .money import cents, to_cents, to_decimal
+from . import services, signals
+from .totals import user_ranges
+from .series import SERIES_POINTS_LIMIT, balance_series, lttb, pick_resolution
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from reportlab.lib.pagesizes import A4
+from reportlab.platypus import SimpleDocTemplate
+import importlib
+import io
+from datetime import date, timedelta
+import json
+import os
+import tempfile
+import tracemalloc
+import pstats
+import re
+import unittest
 
 
 class CategoryModelTest(TestCase):
@@ -183,4 +227,1810 @@ class FormValidationTest(TestCase):
             'date': timezone.now().date()
         }
         form = TransactionForm(data=form_data)
-        self.assertTrue(form.is_valid())
\ No newline at end of file
+        self.assertTrue(form.is_valid())
+
+
+class MonthlyRollupTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='rollupuser',
+            password='testpass123'
+        )
+        self.income = Category.objects.create(
+            name='Salário Rollup',
+            type=Category.INCOME,
+            user=self.user
+        )
+        self.expense = Category.objects.create(
+            name='Mercado Rollup',
+            type=Category.EXPENSE,
+            user=self.user
+        )
+        self.transaction = Transaction.objects.create(
+            description='Mês de janeiro',
+            date=date(2024, 1, 15),
+            owner=self.user
+        )
+        TransactionItem.objects.create(
+            transaction=self.transaction,
+            category=self.income,
+            amount=Decimal('3000.00')
+        )
+        self.expense_item = TransactionItem.objects.create(
+            transaction=self.transaction,
+            category=self.expense,
+            amount=Decimal('500.00')
+        )
+
+    def rollups(self):
+        return {
+            (row.year, row.month, row.category_id): (row.total, row.count)
+            for row in MonthlyCategoryTotal.objects.filter(user=self.user, count__gt=0)
+        }
+
+    def test_items_are_added_to_rollups(self):
+        self.assertEqual(self.rollups(), {
+            (2024, 1, self.income.id): (Decimal('3000.00'), 1),
+            (2024, 1, self.expense.id): (Decimal('500.00'), 1),
+        })
+        summary = get_month_summary(self.user, 2024, 1)
+        self.assertEqual(summary['balance'], Decimal('2500.00'))
+
+    def test_item_update_and_delete(self):
+        self.expense_item.amount = Decimal('200.00')
+        self.expense_item.save()
+        self.assertEqual(self.rollups()[(2024, 1, self.expense.id)], (Decimal('200.00'), 1))
+
+        self.expense_item.delete()
+        self.assertNotIn((2024, 1, self.expense.id), self.rollups())
+
+    def test_transaction_date_change_moves_items(self):
+        self.transaction.date = date(2024, 2, 10)
+        self.transaction.save()
+        self.assertEqual(set(self.rollups()), {
+            (2024, 2, self.income.id),
+            (2024, 2, self.expense.id),
+        })
+
+    def test_transaction_delete_removes_items(self):
+        self.transaction.delete()
+        self.assertEqual(self.rollups(), {})
+
+    def test_rebuild_matches_incremental_rollups(self):
+        incremental = self.rollups()
+        MonthlyCategoryTotal.objects.all().delete()
+        rebuild_rollups(self.user)
+        self.assertEqual(self.rollups(), incremental)
+
+    def test_range_totals_combine_rollups_and_partial_months(self):
+        february = Transaction.objects.create(
+            description='Mês de fevereiro',
+            date=date(2024, 2, 20),
+            owner=self.user
+        )
+        TransactionItem.objects.create(
+            transaction=february,
+            category=self.expense,
+            amount=Decimal('100.00')
+        )
+
+        totals = category_totals_between(self.user, date(2024, 1, 10), date(2024, 2, 29))
+        self.assertEqual(totals['Mercado Rollup']['total'], Decimal('600.00'))
+        self.assertEqual(totals['Mercado Rollup']['count'], 2)
+
+        totals = category_totals_between(self.user, date(2024, 1, 16), date(2024, 2, 19))
+        self.assertEqual(totals, {})
+
+        monthly = monthly_totals_between(self.user, date(2024, 1, 1), date(2024, 2, 20))
+        self.assertEqual(monthly[(2024, 1)]['income'], Decimal('3000.00'))
+        self.assertEqual(monthly[(2024, 2)]['expense'], Decimal('100.00'))
+
+
+class DashboardDataTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='dashboarduser',
+            password='testpass123'
+        )
+        self.income = Category.objects.create(
+            name='Salário Dashboard',
+            type=Category.INCOME,
+            user=self.user
+        )
+        self.expense = Category.objects.create(
+            name='Aluguel Dashboard',
+            type=Category.EXPENSE,
+            user=self.user
+        )
+        for day, category, amount in [
+            (5, self.income, Decimal('3000.00')),
+            (5, self.expense, Decimal('1200.00')),
+            (12, self.expense, Decimal('300.50')),
+            (20, self.income, Decimal('150.25')),
+        ]:
+            transaction = Transaction.objects.create(
+                description=f'Dia {day}',
+                date=date(2024, 3, day),
+                owner=self.user
+            )
+            TransactionItem.objects.create(
+                transaction=transaction,
+                category=category,
+                amount=amount
+            )
+
+    def test_matches_individual_services(self):
+        data = get_dashboard_data(self.user, 2024, 3)
+        self.assertEqual(data['summary'], get_month_summary(self.user, 2024, 3))
+        self.assertEqual(data['category_totals'], get_category_totals(self.user, 2024, 3))
+        self.assertEqual(data['daily_balance'], get_daily_balance_series(self.user, 2024, 3))
+
+    def test_month_query_and_opening_balance_lookup(self):
+        # Uma consulta agrupada para o mês e uma busca do saldo de fechamento anterior
+        with self.assertNumQueries(2):
+            get_dashboard_data(self.user, 2024, 3)
+
+
+class UserDataCacheTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='cacheuser',
+            password='testpass123'
+        )
+        self.category = Category.objects.create(
+            name='Salário Cache',
+            type=Category.INCOME,
+            user=self.user
+        )
+        self.transaction = Transaction.objects.create(
+            description='Pagamento',
+            date=date(2024, 5, 10),
+            owner=self.user
+        )
+        self.item = TransactionItem.objects.create(
+            transaction=self.transaction,
+            category=self.category,
+            amount=Decimal('1000.00')
+        )
+
+    def test_repeated_calls_skip_the_database(self):
+        get_dashboard_data(self.user, 2024, 5)
+        with self.assertNumQueries(0):
+            data = get_dashboard_data(self.user, 2024, 5)
+        self.assertEqual(data['summary']['income'], Decimal('1000.00'))
+
+    def test_writes_invalidate_cached_results(self):
+        self.assertEqual(get_month_summary(self.user, 2024, 5)['income'], Decimal('1000.00'))
+
+        self.item.amount = Decimal('1500.00')
+        self.item.save()
+        self.assertEqual(get_month_summary(self.user, 2024, 5)['income'], Decimal('1500.00'))
+
+        self.category.name = 'Salário Renomeado'
+        self.category.save()
+        self.assertIn('Salário Renomeado', get_category_totals(self.user, 2024, 5))
+
+    def test_versions_are_per_user(self):
+        other = User.objects.create_user(username='otheruser', password='testpass123')
+        version = get_data_version(self.user.pk)
+        bump_data_version(other.pk)
+        self.assertEqual(get_data_version(self.user.pk), version)
+
+    def test_file_cache_invalidates_other_workers(self):
+        with tempfile.TemporaryDirectory() as location:
+            backend = 'django.core.cache.backends.filebased.FileBasedCache'
+            with self.settings(CACHES={'default': {'BACKEND': backend, 'LOCATION': location}}):
+                # Outro worker: uma instância própria do backend no mesmo diretório
+                other_worker = FileBasedCache(location, {})
+                version_key = f'core:data-version:{self.user.pk}'
+                get_dashboard_data(self.user, 2024, 5)
+                version = other_worker.get(version_key)
+                self.assertIsNotNone(other_worker.get(make_cache_key('dashboard', self.user.pk, [(2024, 5), {}])))
+
+                self.item.amount = Decimal('1500.00')
+                self.item.save()
+                self.assertNotEqual(other_worker.get(version_key), version)
+                self.assertEqual(other_worker.get(version_key), get_data_version(self.user.pk))
+
+
+class StreamingPdfExportTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='pdfuser',
+            password='testpass123'
+        )
+        self.category = Category.objects.create(
+            name='Mercado PDF',
+            type=Category.EXPENSE,
+            user=self.user
+        )
+        transaction = Transaction.objects.create(
+            description='Compras',
+            date=date(2024, 6, 1),
+            owner=self.user
+        )
+        items = [
+            TransactionItem(transaction=transaction, category=self.category, amount=Decimal('10.00'))
+            for _ in range(200)
+        ]
+        for item in items:
+            item.set_entry_type()
+        TransactionItem.objects.bulk_create(items)
+        self.client.force_login(self.user)
+
+    def test_pdf_is_streamed_from_a_file_with_page_sized_tables(self):
+        response = self.client.get(reverse('report_transactions'), {'format': 'pdf'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'application/pdf')
+        self.assertIn('relatorio_transacoes.pdf', response['Content-Disposition'])
+        self.assertTrue(response.streaming)
+
+        content = b''.join(response.streaming_content)
+        self.assertTrue(content.startswith(b'%PDF'))
+        pages = content.count(b'/Type /Page') - content.count(b'/Type /Pages')
+        self.assertGreaterEqual(pages, 200 // PDF_ROWS_PER_TABLE)
+
+    def test_flowable_stream_reads_lazily(self):
+        consumed = []
+
+        def source():
+            for number in range(10):
+                consumed.append(number)
+                yield number
+
+        stream = FlowableStream(source(), lookahead=2)
+        self.assertEqual(stream[0], 0)
+        self.assertEqual(len(consumed), 2)
+        del stream[0]
+        self.assertEqual(len(stream), 2)
+        self.assertEqual(len(consumed), 3)
+
+    def pdf_objects(self, content):
+        """
+        Lê a tabela xref e devolve o corpo de cada objeto, conferindo que cada
+        deslocamento aponta para o objeto certo
+        """
+        startxref = int(content[content.rindex(b'startxref') + len(b'startxref'):].split()[0])
+        xref, trailer = content[startxref:].split(b'trailer', 1)
+        lines = xref.split(b'\n')
+        self.assertEqual(lines[0], b'xref')
+        first, size = map(int, lines[1].split())
+        self.assertEqual(first, 0)
+        self.assertEqual(int(re.search(rb'/Size (\d+)', trailer).group(1)), size)
+        entries = [line for line in lines[2:] if line]
+        self.assertEqual(len(entries), size)
+        objects = {}
+        for number, entry in enumerate(entries):
+            if not entry.endswith(b' n '):
+                continue
+            offset = int(entry[:10])
+            header = b'%d 0 obj\n' % number
+            self.assertTrue(content[offset:].startswith(header), f'Objeto {number} fora do lugar')
+            objects[number] = content[offset + len(header):content.index(b'endobj', offset)]
+        return objects
+
+    def page_streams(self, content):
+        """
+        Conteúdo de cada página, na ordem do documento, seguindo as referências
+        a partir da xref
+        """
+        objects = self.pdf_objects(content)
+        pages = next(body for body in objects.values() if b'/Type /Pages' in body)
+        kids = re.search(rb'/Kids \[([^\]]*)\]', pages).group(1)
+        streams = []
+        for page in re.findall(rb'(\d+) 0 R', kids):
+            body = objects[int(page)]
+            self.assertIn(b'/Type /Page', body)
+            stream = objects[int(re.search(rb'/Contents (\d+) 0 R', body).group(1))]
+            self.assertTrue(stream.startswith(b'<<'))
+            length = int(re.search(rb'/Length (\d+)', stream).group(1))
+            start = stream.index(b'stream\n') + len(b'stream\n')
+            self.assertEqual(stream[start + length:].strip(), b'endstream')
+            streams.append(stream[start:start + length])
+        return streams
+
+    def test_streamed_pdf_has_consistent_cross_references(self):
+        content = b''.join(self.client.get(reverse('report_transactions'), {'format': 'pdf'}).streaming_content)
+        self.assertTrue(content.endswith(b'%%EOF\n'))
+        self.assertGreaterEqual(len(self.page_streams(content)), 200 // PDF_ROWS_PER_TABLE)
+
+    def test_streamed_pages_match_reportlab_output(self):
+        header = ['Data', 'Descrição', 'Categoria', 'Valor']
+        rows = [['01/01/2024', f'Descrição {number}', 'Categoria', f'R$ {number},00'] for number in range(200)]
+
+        def pages(**kwargs):
+            output = io.BytesIO()
+            doc = SimpleDocTemplate(output, pagesize=A4, pageCompression=0)
+            doc.build(list(chunked_tables(header, rows)), **kwargs)
+            return self.page_streams(output.getvalue())
+
+        streamed = pages(canvasmaker=StreamingCanvas)
+        self.assertGreaterEqual(len(streamed), 200 // PDF_ROWS_PER_TABLE)
+        self.assertEqual(streamed, pages())
+
+    def test_finished_pages_leave_memory(self):
+        def rows(count):
+            for number in range(count):
+                yield ['01/01/2024', f'Descrição {number}', 'Categoria', f'R$ {number},00']
+
+        peaks = []
+        for count in (PDF_ROWS_PER_TABLE * 20, PDF_ROWS_PER_TABLE * 200):
+            with tempfile.TemporaryFile() as output:
+                tracemalloc.start()
+                try:
+                    build_pdf(chunked_tables(['Data', 'Descrição', 'Categoria', 'Valor'], rows(count)), output)
+                    peaks.append(tracemalloc.get_traced_memory()[1] / 1024)
+                finally:
+                    tracemalloc.stop()
+        # 180 páginas a mais custam só o registro de cada uma no documento
+        self.assertLess(peaks[1] - peaks[0], 180 * 3)
+
+
+class StreamingExportTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='exportuser',
+            password='testpass123'
+        )
+        self.income = Category.objects.create(
+            name='Salário Export',
+            type=Category.INCOME,
+            user=self.user
+        )
+        self.expense = Category.objects.create(
+            name='Água Export',
+            type=Category.EXPENSE,
+            user=self.user
+        )
+        transaction = Transaction.objects.create(
+            description='Conta de água',
+            date=date(2024, 7, 3),
+            owner=self.user
+        )
+        TransactionItem.objects.create(transaction=transaction, category=self.income, amount=Decimal('50.00'))
+        TransactionItem.objects.create(transaction=transaction, category=self.expense, amount=Decimal('80.25'))
+        self.client.force_login(self.user)
+
+    def get_lines(self, url_name, export_format, **params):
+        response = self.client.get(reverse(url_name), {'format': export_format, **params})
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        return b''.join(response.streaming_content).decode('utf-8').splitlines()
+
+    def test_transactions_csv(self):
+        lines = self.get_lines('report_transactions', 'csv')
+        self.assertEqual(lines[0], '\ufeffData,Descrição,Categoria,Valor,Tipo')
+        self.assertIn('2024-07-03,Conta de água,Água Export,80.25,EXPENSE', lines)
+        self.assertEqual(len(lines), 3)
+
+    def test_transactions_ndjson(self):
+        lines = self.get_lines('report_transactions', 'ndjson', category=self.expense.id)
+        rows = [json.loads(line) for line in lines]
+        self.assertEqual(len(rows), 2)
+        self.assertEqual(rows[1], {
+            'date': '2024-07-03',
+            'description': 'Conta de água',
+            'category': 'Água Export',
+            'amount': '80.25',
+            'type': 'EXPENSE',
+        })
+
+    def test_aggregated_reports(self):
+        lines = self.get_lines('report_transactions_by_category', 'csv')
+        self.assertIn('Salário Export,INCOME,50.00,1', lines)
+
+        rows = [json.loads(line) for line in self.get_lines('report_transactions_by_month', 'ndjson')]
+        self.assertEqual(rows, [{
+            'month': '2024-07',
+            'income': '50.00',
+            'expense': '80.25',
+            'balance': '-30.25',
+            'count': 2,
+        }])
+
+
+class ReportJobTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='jobuser',
+            password='testpass123'
+        )
+        category = Category.objects.create(
+            name='Salário Job',
+            type=Category.INCOME,
+            user=self.user
+        )
+        transaction = Transaction.objects.create(
+            description='Pagamento',
+            date=date(2024, 8, 5),
+            owner=self.user
+        )
+        TransactionItem.objects.create(transaction=transaction, category=category, amount=Decimal('10.00'))
+        self.client.force_login(self.user)
+        self.jobs_dir = tempfile.TemporaryDirectory()
+        self.settings_override = override_settings(
+            REPORT_JOBS_IN_PROCESS=False,
+            REPORT_JOBS_DIR=self.jobs_dir.name
+        )
+        self.settings_override.enable()
+
+    def tearDown(self):
+        self.settings_override.disable()
+        self.jobs_dir.cleanup()
+
+    def test_submit_poll_and_download(self):
+        response = self.client.post(reverse('report_job_submit'), {
+            'report': 'transactions_by_month',
+            'start_date': '2024-01-01',
+        })
+        self.assertEqual(response.status_code, 202)
+        job_id = response.json()['id']
+        self.assertEqual(response.json()['status'], ReportJob.PENDING)
+
+        self.assertEqual(run_pending_jobs(), 1)
+
+        status = self.client.get(reverse('report_job_status', args=[job_id])).json()
+        self.assertEqual(status['status'], ReportJob.DONE)
+
+        download = self.client.get(status['download_url'])
+        self.assertEqual(download.status_code, 200)
+        self.assertTrue(b''.join(download.streaming_content).startswith(b'%PDF'))
+
+    def test_invalid_report_and_other_users_jobs(self):
+        response = self.client.post(reverse('report_job_submit'), {'report': 'unknown'})
+        self.assertEqual(response.status_code, 400)
+
+        other = User.objects.create_user(username='otherjobuser', password='testpass123')
+        job = ReportJob.objects.create(user=other, report='transactions')
+        self.assertEqual(self.client.get(reverse('report_job_status', args=[job.pk])).status_code, 404)
+        self.assertEqual(self.client.get(reverse('report_job_download', args=[job.pk])).status_code, 404)
+
+
+@unittest.skipUnless(connection.vendor == 'sqlite', 'EXPLAIN QUERY PLAN é específico do SQLite')
+class QueryPlanTest(TestCase):
+    """
+    Garante que as consultas das telas e relatórios usam índices nas tabelas
+    do razão, em vez de varrer a tabela inteira
+    """
+    LEDGER_SCAN = re.compile(r'SCAN (core_transaction|core_transactionitem|core_monthlycategorytotal|U\d+)\b')
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='planuser',
+            password='testpass123'
+        )
+        self.income = Category.objects.create(name='Salário Plano', type=Category.INCOME, user=self.user)
+        self.expense = Category.objects.create(name='Mercado Plano', type=Category.EXPENSE, user=self.user)
+        for month in range(1, 4):
+            transaction = Transaction.objects.create(
+                description=f'Mês {month}',
+                date=date(2024, month, 10),
+                owner=self.user
+            )
+            TransactionItem.objects.create(transaction=transaction, category=self.income, amount=Decimal('1000.00'))
+            TransactionItem.objects.create(transaction=transaction, category=self.expense, amount=Decimal('300.00'))
+        self.client.force_login(self.user)
+
+    def assert_no_ledger_scans(self, queries):
+        checked = 0
+        with connection.cursor() as cursor:
+            for query in queries:
+                sql = query['sql']
+                if not sql.startswith('SELECT'):
+                    continue
+                cursor.execute('EXPLAIN QUERY PLAN ' + sql)
+                for row in cursor.fetchall():
+                    detail = row[-1]
+                    self.assertIsNone(
+                        self.LEDGER_SCAN.search(detail),
+                        f'Varredura completa em:\n{sql}\nPlano: {detail}'
+                    )
+                checked += 1
+        self.assertGreater(checked, 0)
+
+    def test_services_use_indexes(self):
+        with CaptureQueriesContext(connection) as context:
+            get_dashboard_data.uncached(self.user, 2024, 2)
+            get_month_summary.uncached(self.user, 2024, 2)
+            category_totals_between.uncached(self.user, date(2024, 1, 15), date(2024, 3, 5))
+            monthly_totals_between.uncached(self.user, date(2024, 1, 15), date(2024, 3, 5), self.expense.id)
+        self.assert_no_ledger_scans(context.captured_queries)
+
+    def test_item_aggregations_use_covering_index(self):
+        # As somas por tipo/valor com sinal devem sair só do índice, sem ler
+        # as linhas de core_transactionitem
+        with CaptureQueriesContext(connection) as context:
+            get_dashboard_data.uncached(self.user, 2024, 2)
+            category_totals_between.uncached(self.user, date(2024, 1, 15), date(2024, 3, 5))
+            monthly_totals_between.uncached(self.user, date(2024, 1, 15), date(2024, 3, 5), self.expense.id)
+            rebuild_rollups(self.user)
+        plans = []
+        with connection.cursor() as cursor:
+            for query in context.captured_queries:
+                sql = query['sql']
+                if sql.startswith('SELECT') and 'SUM(' in sql and 'core_transactionitem' in sql:
+                    cursor.execute('EXPLAIN QUERY PLAN ' + sql)
+                    plans.append((sql, [row[-1] for row in cursor.fetchall()]))
+        self.assertGreater(len(plans), 0)
+        for sql, details in plans:
+            item_steps = [detail for detail in details if 'core_transactionitem' in detail]
+            self.assertTrue(item_steps, sql)
+            for detail in item_steps:
+                self.assertIn('COVERING INDEX core_item_tx_cat_type_amt_idx', detail, f'{sql}\nPlano: {detail}')
+
+    def test_views_use_indexes(self):
+        filters = {'start_date': '2024-01-15', 'end_date': '2024-03-05', 'category': self.expense.id}
+        requests = [
+            ('dashboard', {}),
+            ('transaction_list', {}),
+            ('report_transactions', filters),
+            ('report_transactions', {**filters, 'format': 'pdf'}),
+            ('report_transactions', {**filters, 'format': 'csv'}),
+            ('report_transactions_by_category', filters),
+            ('report_transactions_by_month', {**filters, 'format': 'ndjson'}),
+        ]
+        for url_name, params in requests:
+            with self.subTest(url_name=url_name, params=params):
+                with CaptureQueriesContext(connection) as context:
+                    response = self.client.get(reverse(url_name), params)
+                    if response.streaming:
+                        b''.join(response.streaming_content)
+                self.assertEqual(response.status_code, 200)
+                self.assert_no_ledger_scans(context.captured_queries)
+
+
+class TransactionKeysetPaginationTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='pageuser',
+            password='testpass123'
+        )
+        self.income = Category.objects.create(name='Salário Página', type=Category.INCOME, user=self.user)
+        self.expense = Category.objects.create(name='Mercado Página', type=Category.EXPENSE, user=self.user)
+        # Várias transações no mesmo dia para exercitar o desempate por id
+        for index in range(45):
+            transaction = Transaction.objects.create(
+                description=f'Transação {index}',
+                date=date(2024, 1, 1 + index // 3),
+                owner=self.user
+            )
+            category = self.income if index % 2 else self.expense
+            TransactionItem.objects.create(transaction=transaction, category=category, amount=Decimal('10.00'))
+            TransactionItem.objects.create(transaction=transaction, category=category, amount=Decimal('5.00'))
+        self.client.force_login(self.user)
+
+    def walk(self, **params):
+        """
+        Percorre as páginas para frente e retorna as respostas
+        """
+        responses = [self.client.get(reverse('transaction_list'), params)]
+        while responses[-1].context['page_obj'].has_next:
+            cursor = responses[-1].context['page_obj'].next_cursor
+            responses.append(self.client.get(reverse('transaction_list'), {**params, 'cursor': cursor}))
+        return responses
+
+    def test_pages_cover_all_transactions_in_order(self):
+        responses = self.walk()
+        self.assertEqual(len(responses), 3)
+        ids = [t.pk for response in responses for t in response.context['transactions']]
+        expected = list(Transaction.objects.filter(owner=self.user).order_by('-date', '-id').values_list('pk', flat=True))
+        self.assertEqual(ids, expected)
+        self.assertFalse(responses[0].context['page_obj'].has_previous)
+
+    def test_previous_cursor_returns_previous_page(self):
+        responses = self.walk()
+        last_page = responses[-1].context['page_obj']
+        response = self.client.get(reverse('transaction_list'), {'cursor': last_page.previous_cursor})
+        self.assertEqual(
+            [t.pk for t in response.context['transactions']],
+            [t.pk for t in responses[1].context['transactions']]
+        )
+
+    def test_type_filter_lists_each_transaction_once(self):
+        responses = self.walk(type=Category.INCOME)
+        ids = [t.pk for response in responses for t in response.context['transactions']]
+        self.assertEqual(len(ids), 22)
+        self.assertEqual(len(ids), len(set(ids)))
+
+    def test_no_count_query(self):
+        cursor = self.client.get(reverse('transaction_list')).context['page_obj'].next_cursor
+        with CaptureQueriesContext(connection) as context:
+            self.client.get(reverse('transaction_list'), {'cursor': cursor})
+        self.assertFalse(any('COUNT(' in query['sql'] for query in context.captured_queries))
+
+    def test_invalid_cursor_returns_404(self):
+        response = self.client.get(reverse('transaction_list'), {'cursor': 'lixo'})
+        self.assertEqual(response.status_code, 404)
+
+
+class TransactionSearchTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='searchuser',
+            password='testpass123'
+        )
+        for description in ['Conta de Água', 'Supermercado', 'Salário de março', 'Aluguel']:
+            Transaction.objects.create(description=description, date=date(2024, 3, 1), owner=self.user)
+
+    def search(self, term):
+        queryset = Transaction.objects.filter(owner=self.user)
+        return sorted(search_transactions(queryset, term).values_list('description', flat=True))
+
+    def test_accent_and_prefix_matching(self):
+        self.assertEqual(self.search('agua'), ['Conta de Água'])
+        self.assertEqual(self.search('Sal'), ['Salário de março'])
+        self.assertEqual(self.search('super'), ['Supermercado'])
+        self.assertEqual(self.search('conta agu'), ['Conta de Água'])
+        self.assertEqual(self.search('luz'), [])
+
+    def test_index_follows_updates_and_deletes(self):
+        transaction = Transaction.objects.get(description='Aluguel')
+        Transaction.objects.filter(pk=transaction.pk).update(description='Condomínio')
+        self.assertEqual(self.search('aluguel'), [])
+        self.assertEqual(self.search('condominio'), ['Condomínio'])
+        transaction.delete()
+        self.assertEqual(self.search('condominio'), [])
+
+    def test_only_owner_transactions(self):
+        other = User.objects.create_user(username='othersearch', password='testpass123')
+        Transaction.objects.create(description='Água do vizinho', date=date(2024, 3, 1), owner=other)
+        self.assertEqual(self.search('agua'), ['Conta de Água'])
+
+    def test_list_view_search(self):
+        self.client.force_login(self.user)
+        response = self.client.get(reverse('transaction_list'), {'search': 'água'})
+        self.assertEqual([t.description for t in response.context['transactions']], ['Conta de Água'])
+
+    @unittest.skipUnless(connection.vendor == 'sqlite', 'FTS5 é específico do SQLite')
+    def test_uses_fts_index(self):
+        self.assertTrue(fts_available())
+        with CaptureQueriesContext(connection) as context:
+            self.search('agua')
+        self.assertIn('core_transaction_fts', context.captured_queries[-1]['sql'])
+
+
+class TransactionImportTest(TestCase):
+    CSV = (
+        'Data;Descrição;Valor;Categoria\n'
+        '05/03/2024;Salário de março;5.000,00;Salário Import\n'
+        '2024-03-07;Conta de Água;-120,50;\n'
+        '08/03/2024;Supermercado;-350,25;Mercado Import\n'
+        '09/03/2024;Sem valor;abc;\n'
+        '10/03/2024;Presente;80,00;Desconhecida\n'
+    ).encode('utf-8')
+
+    OFX = (
+        'OFXHEADER:100\nDATA:OFXSGML\nENCODING:USASCII\nCHARSET:1252\n\n'
+        '<OFX><BANKMSGSRSV1><STMTTRNRS><STMTRS><BANKTRANLIST>'
+        '<STMTTRN><TRNTYPE>DEBIT<DTPOSTED>20240311120000[-3:BRT]<TRNAMT>-45.90<MEMO>Farmácia</STMTTRN>'
+        '<STMTTRN><TRNTYPE>CREDIT<DTPOSTED>20240312<TRNAMT>200.00<NAME>Pix recebido</STMTTRN>'
+        '</BANKTRANLIST></STMTRS></STMTTRNRS></BANKMSGSRSV1></OFX>'
+    ).encode('cp1252')
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='importuser',
+            password='testpass123'
+        )
+        self.salary = Category.objects.create(name='Salário Import', type=Category.INCOME, user=self.user)
+        self.market = Category.objects.create(name='Mercado Import', type=Category.EXPENSE, user=self.user)
+        self.other_income = Category.objects.create(name='Outras Receitas Import', type=Category.INCOME, user=self.user)
+        self.other_expense = Category.objects.create(name='Outras Despesas Import', type=Category.EXPENSE, user=self.user)
+
+    def test_csv_import(self):
+        result = import_transactions(
+            self.user,
+            csv_rows(io.BytesIO(self.CSV)),
+            income_category=self.other_income,
+            expense_category=self.other_expense,
+            batch_size=2,
+        )
+        self.assertEqual(result['created'], 3)
+        self.assertEqual(result['error_count'], 2)
+        self.assertEqual([line for line, _ in result['errors']], [5, 6])
+
+        water = Transaction.objects.get(owner=self.user, description='Conta de Água')
+        self.assertEqual(water.date, date(2024, 3, 7))
+        self.assertEqual(water.total_amount, Decimal('-120.50'))
+        self.assertEqual(water.items.get().category, self.other_expense)
+        salary = Transaction.objects.get(owner=self.user, description='Salário de março')
+        self.assertEqual(salary.total_amount, Decimal('5000.00'))
+        self.assertEqual(salary.items.get().amount, Decimal('5000.00'))
+
+    def test_csv_import_rejects_negative_amount_for_income_category(self):
+        statement = 'Data;Descrição;Valor;Categoria\n05/03/2024;Estorno;-100,00;Salário Import\n'.encode('utf-8')
+        result = import_transactions(self.user, csv_rows(io.BytesIO(statement)))
+        self.assertEqual(result['created'], 0)
+        self.assertEqual([line for line, _ in result['errors']], [2])
+        self.assertFalse(Transaction.objects.filter(owner=self.user).exists())
+
+    def test_csv_import_rejects_positive_amount_for_expense_category(self):
+        statement = 'Data;Descrição;Valor;Categoria\n05/03/2024;Reembolso;50,00;Mercado Import\n'.encode('utf-8')
+        result = import_transactions(self.user, csv_rows(io.BytesIO(statement)))
+        self.assertEqual(result['created'], 0)
+        self.assertEqual([line for line, _ in result['errors']], [2])
+        self.assertFalse(Transaction.objects.filter(owner=self.user).exists())
+
+    def test_ofx_import(self):
+        result = import_transactions(
+            self.user,
+            ofx_rows(io.BytesIO(self.OFX)),
+            income_category=self.other_income,
+            expense_category=self.other_expense,
+        )
+        self.assertEqual(result['created'], 2)
+        pharmacy = Transaction.objects.get(owner=self.user, description='Farmácia')
+        self.assertEqual(pharmacy.date, date(2024, 3, 11))
+        self.assertEqual(pharmacy.total_amount, Decimal('-45.90'))
+        self.assertTrue(Transaction.objects.filter(owner=self.user, description='Pix recebido').exists())
+
+    def test_import_updates_rollups_and_cache(self):
+        version = get_data_version(self.user.id)
+        import_transactions(
+            self.user,
+            csv_rows(io.BytesIO(self.CSV)),
+            income_category=self.other_income,
+            expense_category=self.other_expense,
+        )
+        self.assertNotEqual(get_data_version(self.user.id), version)
+        imported = sorted(MonthlyCategoryTotal.objects.filter(user=self.user).values_list('category_id', 'total', 'count'))
+        rebuild_rollups(self.user)
+        rebuilt = sorted(MonthlyCategoryTotal.objects.filter(user=self.user).values_list('category_id', 'total', 'count'))
+        self.assertEqual(imported, rebuilt)
+        self.assertEqual(get_month_summary(self.user, 2024, 3)['expense'], Decimal('470.75'))
+
+    def test_command(self):
+        with tempfile.NamedTemporaryFile(suffix='.ofx') as statement:
+            statement.write(self.OFX)
+            statement.flush()
+            output = io.StringIO()
+            call_command(
+                'import_transactions', statement.name,
+                user='importuser',
+                income_category='Outras Receitas Import',
+                expense_category='Outras Despesas Import',
+                stdout=output,
+            )
+        self.assertIn('2 transações importadas', output.getvalue())
+        self.assertEqual(Transaction.objects.filter(owner=self.user).count(), 2)
+
+    def test_upload_view(self):
+        self.client.force_login(self.user)
+        response = self.client.post(reverse('transaction_import'), {
+            'file': SimpleUploadedFile('extrato.csv', self.CSV, content_type='text/csv'),
+            'expense_category': self.other_expense.pk,
+        })
+        self.assertRedirects(response, reverse('transaction_list'))
+        self.assertEqual(Transaction.objects.filter(owner=self.user).count(), 3)
+
+    def test_upload_view_rejects_invalid_header(self):
+        self.client.force_login(self.user)
+        response = self.client.post(reverse('transaction_import'), {
+            'file': SimpleUploadedFile('extrato.csv', b'foo,bar\n1,2\n', content_type='text/csv'),
+        })
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.context['form'].errors)
+        self.assertFalse(Transaction.objects.filter(owner=self.user).exists())
+
+
+class SeedScaleTest(TestCase):
+    def seed(self, **options):
+        call_command(
+            'seed', users=2, years=1, until='2024-06', tx_per_month=5, items_per_tx=2, seed=7,
+            stdout=io.StringIO(), **options
+        )
+        return list(
+            Transaction.objects.filter(owner__username__startswith='seed').order_by(
+                'owner__username', 'date', 'description', 'total_amount'
+            ).values_list('owner__username', 'date', 'description', 'total_amount')
+        )
+
+    def test_generates_requested_volume(self):
+        rows = self.seed()
+        self.assertEqual(len(rows), 2 * 12 * 5)
+        self.assertTrue(all(date(2023, 7, 1) <= row[1] <= date(2024, 6, 30) for row in rows))
+        self.assertEqual(Category.objects.filter(user__username='seed0001').count(), 12)
+        # Os dois usuários têm categorias com os mesmos nomes
+        self.assertEqual(Category.objects.filter(name='Salário', user__username__startswith='seed').count(), 2)
+        items = TransactionItem.objects.filter(transaction__owner__username='seed0001').count()
+        self.assertTrue(12 * 5 <= items <= 12 * 5 * 2)
+
+    def test_deterministic_and_rollups_consistent(self):
+        first = self.seed()
+        second = self.seed()
+        self.assertEqual(first, second)
+
+        user = User.objects.get(username='seed0002')
+        seeded = sorted(MonthlyCategoryTotal.objects.filter(user=user).values_list('year', 'month', 'category_id', 'total', 'count'))
+        rebuild_rollups(user)
+        rebuilt = sorted(MonthlyCategoryTotal.objects.filter(user=user).values_list('year', 'month', 'category_id', 'total', 'count'))
+        self.assertEqual(seeded, rebuilt)
+
+    def test_parallel_workers_match_single_process(self):
+        serial = self.seed()
+        self.assertEqual(self.seed(workers=2), serial)
+        self.assertEqual(Transaction.objects.filter(owner__username__startswith='seed').count(), 2 * 12 * 5)
+
+    def test_demo_seed_is_atomic(self):
+        saved = []
+
+        def fail_midway(sender, instance, **kwargs):
+            saved.append(instance)
+            if len(saved) == 10:
+                raise RuntimeError('falha simulada')
+
+        pre_save.connect(fail_midway, sender=TransactionItem)
+        try:
+            with self.assertRaises(RuntimeError):
+                call_command('seed', stdout=io.StringIO())
+        finally:
+            pre_save.disconnect(fail_midway, sender=TransactionItem)
+
+        # Nada do mês de demonstração fica gravado pela metade
+        demo = User.objects.get(username='demo')
+        self.assertFalse(Transaction.objects.filter(owner=demo).exists())
+        self.assertFalse(MonthlyCategoryTotal.objects.filter(user=demo).exists())
+
+        call_command('seed', stdout=io.StringIO())
+        self.assertEqual(Transaction.objects.filter(owner=demo).count(), 20)
+
+    def test_total_amount_matches_items(self):
+        self.seed()
+        for transaction in Transaction.objects.filter(owner__username='seed0001').prefetch_related('items__category'):
+            expected = sum(
+                item.amount if item.category.type == Category.INCOME else -item.amount
+                for item in transaction.items.all()
+            )
+            self.assertEqual(transaction.total_amount, expected)
+
+
+class CategoryPerUserNameTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='catuser', password='testpass123')
+        self.other = User.objects.create_user(username='catother', password='testpass123')
+        Category.objects.create(name='Mercado', type=Category.EXPENSE, user=self.other)
+        self.client.force_login(self.user)
+
+    def test_same_name_for_different_users(self):
+        response = self.client.post(reverse('category_create'), {'name': 'Mercado', 'type': Category.EXPENSE})
+        self.assertRedirects(response, reverse('category_list'))
+        self.assertTrue(Category.objects.filter(user=self.user, name='Mercado').exists())
+
+    def test_duplicate_name_for_same_user(self):
+        Category.objects.create(name='Mercado', type=Category.EXPENSE, user=self.user)
+        response = self.client.post(reverse('category_create'), {'name': 'Mercado', 'type': Category.EXPENSE})
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('name', response.context['form'].errors)
+
+
+class BenchmarkTest(TestCase):
+    def setUp(self):
+        call_command(
+            'seed', users=1, years=1, until='2024-06', tx_per_month=3, items_per_tx=2,
+            stdout=io.StringIO()
+        )
+        self.user = User.objects.get(username='seed0001')
+
+    def test_every_scenario_runs(self):
+        context = scenario_context(self.user)
+        for name in SCENARIOS:
+            with self.subTest(scenario=name):
+                result = run_scenario(name, self.user, context, repeat=2, warmup=0)
+                self.assertIn(result['status'], (200, 302))
+                self.assertGreater(result['queries'], 0)
+                self.assertGreater(result['peak_memory_kb'], 0)
+                self.assertLessEqual(result['p50_ms'], result['p90_ms'])
+
+    def test_percentile(self):
+        values = [5, 1, 4, 2, 3, 10, 9, 8, 7, 6]
+        self.assertEqual(percentile(values, 50), 5)
+        self.assertEqual(percentile(values, 90), 9)
+        self.assertEqual(percentile(values, 99), 10)
+
+    def test_compare_flags_regressions(self):
+        before = {'20/mes': {'dashboard': {'p50_ms': 10.0, 'queries': 3, 'peak_memory_kb': 100.0}}}
+        same = {'20/mes': {'dashboard': {'p50_ms': 11.0, 'queries': 3, 'peak_memory_kb': 110.0}}}
+        worse = {'20/mes': {'dashboard': {'p50_ms': 20.0, 'queries': 4, 'peak_memory_kb': 200.0}}}
+        self.assertEqual(compare_results(before, same), [])
+        self.assertEqual(
+            [metric for _, _, metric, _, _ in compare_results(before, worse)],
+            ['p50_ms', 'queries', 'peak_memory_kb']
+        )
+
+
+class MemoryRegressionTest(TestCase):
+    def test_report_peaks_within_budget_and_linear(self):
+        months = seed_months(1, until=(2024, 6))
+        results = {}
+        for tx_per_month in (10, 100):
+            _, items = generate_user_ledger(1, months, tx_per_month, 3, 42, 'x')
+            user = User.objects.get(username=seed_username(1))
+            context = scenario_context(user)
+            results[items] = {
+                name: run_memory_scenario(name, user, context)
+                for name in MEMORY_BUDGETS
+            }
+        self.assertEqual(memory_regressions(results), [])
+
+    def test_flags_budget_and_super_linear_growth(self):
+        results = {
+            1000: {'report_transactions_by_month': 100.0},
+            10000: {'report_transactions_by_month': 20000.0},
+        }
+        problems = memory_regressions(results)
+        self.assertEqual([(name, items) for name, items, _ in problems], [
+            ('report_transactions_by_month', 10000),
+            ('report_transactions_by_month', 10000),
+        ])
+        self.assertIn('orçamento', problems[0][2])
+        self.assertIn('expoente', problems[1][2])
+
+
+class QueryBudgetTest(TestCase):
+    """
+    Cada URL de core.urls tem um número máximo de consultas, que não pode
+    crescer com o volume de dados do usuário
+    """
+    # nome da URL -> (máximo de consultas, método, parâmetros)
+    BUDGETS = {
+        'home': (2, 'get', {}),
+        'dashboard': (5, 'get', {}),
+        'category_list': (4, 'get', {}),
+        'category_create': (2, 'get', {}),
+        'category_update': (3, 'get', {}),
+        'category_delete': (3, 'get', {}),
+        'transaction_list': (3, 'get', {}),
+        'transaction_create': (3, 'get', {}),
+        'transaction_import': (4, 'get', {}),
+        'transaction_detail': (4, 'get', {}),
+        'transaction_update': (5, 'get', {}),
+        'transaction_delete': (3, 'get', {}),
+        'report_transactions': (7, 'get', {'start_date': '2024-01-01', 'end_date': '2024-12-31'}),
+        'report_transactions_by_category': (5, 'get', {'start_date': '2024-01-01', 'end_date': '2024-12-31'}),
+        'report_transactions_by_month': (5, 'get', {'start_date': '2024-01-01', 'end_date': '2024-12-31'}),
+        'report_job_submit': (4, 'post', {'report': 'transactions'}),
+        'report_job_status': (3, 'get', {}),
+        'report_job_download': (3, 'get', {}),
+        'signup': (0, 'get', {}),
+        'metrics': (1, 'get', {}),
+        'dashboard_series': (4, 'get', {}),
+    }
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='budgetuser',
+            password='testpass123'
+        )
+        self.income = Category.objects.create(name='Salário Budget', type=Category.INCOME, user=self.user)
+        self.expense = Category.objects.create(name='Mercado Budget', type=Category.EXPENSE, user=self.user)
+        self.transaction = self.add_transactions(1)[0]
+
+        self.report_file = tempfile.NamedTemporaryFile(suffix='.pdf')
+        self.report_file.write(b'%PDF-1.4')
+        self.report_file.flush()
+        self.job = ReportJob.objects.create(
+            user=self.user,
+            report='transactions',
+            status=ReportJob.DONE,
+            file_path=self.report_file.name
+        )
+        self.client.force_login(self.user)
+
+    def tearDown(self):
+        self.report_file.close()
+
+    def add_transactions(self, count):
+        today = timezone.now().date()
+        created = []
+        for index in range(count):
+            transaction = Transaction.objects.create(
+                description=f'Compra {index}',
+                date=today.replace(day=1) if index % 2 else date(2024, 1 + index % 12, 10),
+                owner=self.user
+            )
+            TransactionItem.objects.create(transaction=transaction, category=self.income, amount=Decimal('100.00'))
+            TransactionItem.objects.create(transaction=transaction, category=self.expense, amount=Decimal('40.00'))
+            TransactionItem.objects.create(transaction=transaction, category=self.expense, amount=Decimal('15.50'))
+            created.append(transaction)
+        return created
+
+    def url_args(self, name):
+        if name in ('category_update', 'category_delete'):
+            return [self.expense.pk]
+        if name in ('transaction_detail', 'transaction_update', 'transaction_delete'):
+            return [self.transaction.pk]
+        if name in ('report_job_status', 'report_job_download'):
+            return [self.job.pk]
+        return []
+
+    def count_queries(self, name):
+        _, method, params = self.BUDGETS[name]
+        if name == 'signup':
+            self.client.logout()
+        with CaptureQueriesContext(connection) as context:
+            response = getattr(self.client, method)(reverse(name, args=self.url_args(name)), params)
+            if response.streaming:
+                b''.join(response.streaming_content)
+            response.close()
+        if name == 'signup':
+            self.client.force_login(self.user)
+        self.assertLess(response.status_code, 400, name)
+        return len(context.captured_queries)
+
+    def test_every_url_has_a_budget(self):
+        from .urls import urlpatterns
+        self.assertEqual({pattern.name for pattern in urlpatterns}, set(self.BUDGETS))
+
+    def test_query_counts_within_budget_and_constant(self):
+        small = {}
+        for name in self.BUDGETS:
+            small[name] = self.count_queries(name)
+
+        self.add_transactions(30)
+        for name, (budget, _, _) in self.BUDGETS.items():
+            with self.subTest(url=name):
+                large = self.count_queries(name)
+                self.assertLessEqual(large, budget)
+                self.assertEqual(small[name], large)
+
+
+class TimingMiddlewareTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='timinguser',
+            password='testpass123'
+        )
+        category = Category.objects.create(name='Salário Timing', type=Category.INCOME, user=self.user)
+        transaction = Transaction.objects.create(description='Salário', date=date(2024, 5, 5), owner=self.user)
+        TransactionItem.objects.create(transaction=transaction, category=category, amount=Decimal('10.00'))
+        self.client.force_login(self.user)
+
+    def server_timing(self, response):
+        metrics = {}
+        for metric in response['Server-Timing'].split(', '):
+            name, *params = metric.split(';')
+            metrics[name] = dict(param.split('=', 1) for param in params)
+        return metrics
+
+    def test_server_timing_header(self):
+        response = self.client.get(reverse('dashboard'))
+        metrics = self.server_timing(response)
+        self.assertTrue({'total', 'db', 'app', 'template'} <= set(metrics))
+        self.assertGreater(float(metrics['total']['dur']), 0)
+        self.assertRegex(metrics['db']['desc'], r'"[1-9]\d* queries"')
+        self.assertNotIn('pdf', metrics)
+
+    def test_pdf_time_reported(self):
+        response = self.client.get(reverse('report_transactions'), {'format': 'pdf'})
+        b''.join(response.streaming_content)
+        self.assertIn('pdf', self.server_timing(response))
+
+    def test_structured_log_line(self):
+        with self.assertLogs('core.timing', 'INFO') as logs:
+            self.client.get(reverse('report_transactions_by_month'))
+        record = json.loads(logs.records[-1].getMessage())
+        self.assertEqual(record['view'], 'report_transactions_by_month')
+        self.assertEqual(record['status'], 200)
+        self.assertGreater(record['queries'], 0)
+        self.assertGreaterEqual(record['total_ms'], record['db_ms'] + record['template_ms'])
+
+
+class MetricsEndpointTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='metricsuser',
+            password='testpass123'
+        )
+        category = Category.objects.create(name='Salário Metrics', type=Category.INCOME, user=self.user)
+        transaction = Transaction.objects.create(description='Salário', date=date(2024, 5, 5), owner=self.user)
+        TransactionItem.objects.create(transaction=transaction, category=category, amount=Decimal('10.00'))
+        self.client.force_login(self.user)
+
+    def samples(self):
+        response = self.client.get(reverse('metrics'))
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response['Content-Type'].startswith('text/plain; version=0.0.4'))
+        samples = {}
+        for line in response.content.decode().splitlines():
+            if line and not line.startswith('#'):
+                name, value = line.rsplit(' ', 1)
+                samples[name] = float(value)
+        return samples
+
+    def test_request_histograms_by_url_name(self):
+        before = self.samples()
+        self.client.get(reverse('dashboard'))
+        self.client.get(reverse('dashboard'))
+        after = self.samples()
+        count = 'finance_request_duration_seconds_count{view="dashboard"}'
+        self.assertEqual(after[count] - before.get(count, 0), 2)
+        self.assertEqual(
+            after['finance_request_duration_seconds_bucket{view="dashboard",le="+Inf"}'], after[count]
+        )
+        queries = 'finance_request_queries_sum{view="dashboard"}'
+        self.assertGreater(after[queries] - before.get(queries, 0), 0)
+
+    def test_cache_and_pdf_counters(self):
+        before = self.samples()
+        self.client.get(reverse('dashboard'))
+        self.client.get(reverse('dashboard'))
+        response = self.client.get(reverse('report_transactions'), {'format': 'pdf'})
+        size = len(b''.join(response.streaming_content))
+        after = self.samples()
+
+        def delta(name):
+            return after.get(name, 0) - before.get(name, 0)
+
+        self.assertGreaterEqual(delta('finance_cache_requests_total{namespace="dashboard",result="hit"}'), 1)
+        self.assertGreaterEqual(delta('finance_cache_requests_total{namespace="dashboard",result="miss"}'), 1)
+        self.assertEqual(delta('finance_pdf_bytes_total'), size)
+
+    def test_active_report_jobs(self):
+        ReportJob.objects.create(user=self.user, report='transactions', status=ReportJob.PENDING)
+        ReportJob.objects.create(user=self.user, report='transactions', status=ReportJob.DONE)
+        samples = self.samples()
+        self.assertEqual(samples['finance_report_jobs_active{status="pending"}'], 1)
+        self.assertEqual(samples['finance_report_jobs_active{status="running"}'], 0)
+
+    def test_aggregates_other_processes(self):
+        self.client.get(reverse('dashboard'))
+        with tempfile.TemporaryDirectory() as directory, self.settings(METRICS_DIR=directory):
+            own = self.samples()
+            # Outro worker com exatamente as mesmas métricas
+            with open(os.path.join(directory, '99999.json'), 'w') as other:
+                json.dump(metrics_registry.snapshot(), other)
+            combined = self.samples()
+            metrics_registry.flush(force=True)
+            self.assertTrue(os.path.exists(os.path.join(directory, f'{os.getpid()}.json')))
+        count = 'finance_request_duration_seconds_count{view="dashboard"}'
+        self.assertEqual(combined[count], 2 * own[count])
+
+    @override_settings(METRICS_TOKEN='segredo')
+    def test_token_required_when_configured(self):
+        self.assertEqual(self.client.get(reverse('metrics')).status_code, 401)
+        response = self.client.get(reverse('metrics'), HTTP_AUTHORIZATION='Bearer segredo')
+        self.assertEqual(response.status_code, 200)
+
+
+class SlowQueryLogTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='slowuser',
+            password='testpass123'
+        )
+        category = Category.objects.create(name='Salário Slow', type=Category.INCOME, user=self.user)
+        transaction = Transaction.objects.create(description='Salário', date=date(2024, 5, 5), owner=self.user)
+        TransactionItem.objects.create(transaction=transaction, category=category, amount=Decimal('10.00'))
+        self.client.force_login(self.user)
+        self.directory = tempfile.TemporaryDirectory()
+        self.log = os.path.join(self.directory.name, 'slow.log')
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_logs_queries_above_threshold_with_origin(self):
+        with self.settings(SLOW_QUERY_THRESHOLD_MS=0, SLOW_QUERY_LOG=self.log):
+            self.client.get(reverse('dashboard'))
+        entries = list(read_entries(self.log))
+        self.assertTrue(entries)
+        for entry in entries:
+            self.assertGreaterEqual(entry['duration_ms'], 0)
+            self.assertIsInstance(entry['params'], list)
+        frames = {entry['frame'] for entry in entries}
+        self.assertTrue(any(frame and frame.startswith('core/services.py:') for frame in frames), frames)
+
+    def test_nothing_logged_below_threshold(self):
+        with self.settings(SLOW_QUERY_THRESHOLD_MS=60 * 1000, SLOW_QUERY_LOG=self.log):
+            self.client.get(reverse('dashboard'))
+        self.assertEqual(list(read_entries(self.log)), [])
+
+    def test_fingerprint(self):
+        self.assertEqual(
+            fingerprint("SELECT *  FROM t WHERE id IN (%s, %s, %s) AND name = 'x''y' LIMIT 21"),
+            'SELECT * FROM t WHERE id IN (...) AND name = ? LIMIT ?'
+        )
+
+    def test_summary_command_ranks_by_total_time(self):
+        entries = [
+            {'sql': 'SELECT a FROM t WHERE id = %s', 'duration_ms': 150.0, 'frame': 'core/views.py:1 in a'},
+            {'sql': 'SELECT a FROM t WHERE id = %s', 'duration_ms': 250.0, 'frame': 'core/views.py:1 in a'},
+            {'sql': 'SELECT b FROM t WHERE id IN (%s, %s)', 'duration_ms': 300.0, 'frame': None},
+        ]
+        with open(self.log, 'w') as log:
+            log.writelines(json.dumps(entry) + '\n' for entry in entries)
+
+        summary = summarize(read_entries(self.log))
+        self.assertEqual([group['count'] for group in summary], [2, 1])
+        self.assertEqual(summary[0]['total_ms'], 400.0)
+        self.assertEqual(summary[0]['max_ms'], 250.0)
+
+        output = io.StringIO()
+        call_command('slow_queries', file=self.log, stdout=output)
+        text = output.getvalue()
+        self.assertIn('3 consultas lentas, 2 distintas', text)
+        self.assertLess(text.index('SELECT a FROM t'), text.index('SELECT b FROM t'))
+        self.assertIn('core/views.py:1 in a (2x)', text)
+
+
+class ProfilerMiddlewareTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='profileuser',
+            password='testpass123',
+            is_staff=True
+        )
+        category = Category.objects.create(name='Salário Profile', type=Category.INCOME, user=self.user)
+        transaction = Transaction.objects.create(description='Salário', date=date(2024, 5, 5), owner=self.user)
+        TransactionItem.objects.create(transaction=transaction, category=category, amount=Decimal('10.00'))
+        self.client.force_login(self.user)
+        self.directory = tempfile.TemporaryDirectory()
+        self.settings_override = self.settings(PROFILES_DIR=self.directory.name)
+        self.settings_override.enable()
+
+    def tearDown(self):
+        self.settings_override.disable()
+        self.directory.cleanup()
+
+    def test_staff_gets_sorted_stats_page(self):
+        response = self.client.get(reverse('dashboard'), {'_profile': '1', '_profile_sort': 'tottime'})
+        self.assertEqual(response.status_code, 200)
+        self.assertTemplateUsed(response, 'core/profile.html')
+        self.assertEqual(response.context['sort'], 'tottime')
+        self.assertIn('function calls', response.context['stats'])
+        self.assertIn('get_dashboard_data', response.context['stats'])
+        profiles = os.listdir(self.directory.name)
+        self.assertEqual(len(profiles), 1)
+        self.assertRegex(profiles[0], r'-dashboard-\d+-\w+\.prof$')
+
+    def test_pdf_export_profiled_and_downloadable(self):
+        response = self.client.get(
+            reverse('report_transactions_by_month'), {'format': 'pdf', '_profile': 'download'}
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'application/octet-stream')
+        with tempfile.NamedTemporaryFile(suffix='.prof') as output:
+            output.write(b''.join(response.streaming_content))
+            output.flush()
+            stats = pstats.Stats(output.name)
+        self.assertTrue(any(func[2] == 'build_pdf' for func in stats.stats))
+
+    def test_ignored_for_non_staff(self):
+        self.user.is_staff = False
+        self.user.save()
+        response = self.client.get(reverse('dashboard'), {'_profile': '1'})
+        self.assertTemplateUsed(response, 'core/dashboard.html')
+        self.assertEqual(os.listdir(self.directory.name), [])
+
+
+class ReportEngineTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='reportuser',
+            password='testpass123'
+        )
+        self.income = Category.objects.create(name='Salário Report', type=Category.INCOME, user=self.user)
+        self.expense = Category.objects.create(name='Mercado Report', type=Category.EXPENSE, user=self.user)
+        for day, category, amount in ((5, self.income, '1000.00'), (12, self.expense, '250.00')):
+            transaction = Transaction.objects.create(description='Lançamento', date=date(2024, 3, day), owner=self.user)
+            TransactionItem.objects.create(transaction=transaction, category=category, amount=Decimal(amount))
+        self.client.force_login(self.user)
+
+    def test_every_report_in_every_format(self):
+        for name, report_class in REPORTS.items():
+            report = report_class(self.user, {'start_date': '2024-01-01', 'end_date': '2024-12-31'})
+            self.assertEqual(report.data['balance'], Decimal('750.00'))
+            for row in report.rows():
+                self.assertEqual(len(row), len(report.columns))
+            for export_format in RENDERERS:
+                with self.subTest(report=name, format=export_format):
+                    response = self.client.get(reverse(f'report_{name}'), {'format': export_format})
+                    self.assertEqual(response.status_code, 200)
+                    if export_format != 'html':
+                        body = b''.join(response.streaming_content)
+                        self.assertIn(report.filename, response['Content-Disposition'])
+                        self.assertTrue(body)
+
+    def test_aggregation_runs_once_per_report(self):
+        report = REPORTS['transactions_by_month'](self.user, {})
+        with CaptureQueriesContext(connection) as context:
+            list(report.rows())
+            report.context()
+            list(report.rows())
+        aggregations = [query for query in context.captured_queries if 'core_monthlycategorytotal' in query['sql']]
+        self.assertEqual(len(aggregations), 1)
+
+    def test_export_reuses_html_preview_aggregation(self):
+        self.client.get(reverse('report_transactions_by_category'))
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(reverse('report_transactions_by_category'), {'format': 'csv'})
+            content = b''.join(response.streaming_content).decode()
+        self.assertFalse([query for query in context.captured_queries if 'core_monthlycategorytotal' in query['sql']])
+        self.assertIn('Mercado Report,EXPENSE,250.00,1', content)
+
+
+class IntegerCentsAggregationTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='centsuser',
+            password='testpass123'
+        )
+        self.income = Category.objects.create(name='Salário Cents', type=Category.INCOME, user=self.user)
+        self.expense = Category.objects.create(name='Mercado Cents', type=Category.EXPENSE, user=self.user)
+        transaction = Transaction.objects.create(description='Centavos', date=date(2024, 3, 10), owner=self.user)
+        for amount in ('0.10', '0.20', '0.29', '1234567.89'):
+            TransactionItem.objects.create(transaction=transaction, category=self.income, amount=Decimal(amount))
+        TransactionItem.objects.create(transaction=transaction, category=self.expense, amount=Decimal('0.30'))
+
+    def assertExact(self, value, expected):
+        self.assertEqual(value, Decimal(expected))
+        self.assertEqual(value.as_tuple().exponent, -2)
+
+    def test_conversions(self):
+        self.assertEqual(to_cents(Decimal('0.29')), 29)
+        self.assertEqual(to_cents(Decimal('-10.005')), -1001)
+        self.assertExact(to_decimal(123456789), '1234567.89')
+        self.assertExact(to_decimal(None), '0.00')
+
+    def test_cents_rounds_each_value(self):
+        # 0.29 * 100 em ponto flutuante é 28.999999999999996
+        values = TransactionItem.objects.filter(category=self.income).annotate(
+            value=cents('amount')
+        ).order_by('id').values_list('value', flat=True)
+        self.assertEqual(list(values), [10, 20, 29, 123456789])
+
+    def test_aggregates_are_exact(self):
+        self.assertExact(get_month_summary(self.user, 2024, 3)['income'], '1234568.48')
+        self.assertExact(get_transaction_report_totals(self.user)['balance'], '1234568.18')
+        self.assertExact(category_totals_between(self.user)['Salário Cents']['total'], '1234568.48')
+        months = monthly_totals_between(self.user, date(2024, 3, 5), date(2024, 4, 30))
+        self.assertExact(months[(2024, 3)]['expense'], '0.30')
+        self.assertEqual(get_dashboard_data(self.user, 2024, 3)['daily_balance'][-1]['balance'], 1234568.18)
+
+    def test_checkpoint_backfill_is_exact(self):
+        migration = importlib.import_module('core.migrations.0008_balancecheckpoint')
+        written = list(BalanceCheckpoint.objects.filter(user=self.user).values_list('year', 'month', 'balance'))
+        BalanceCheckpoint.objects.all().delete()
+        migration.backfill_checkpoints(apps, None)
+        backfilled = BalanceCheckpoint.objects.get(user=self.user)
+        self.assertEqual(written, [(2024, 3, backfilled.balance)])
+        self.assertExact(backfilled.balance, '1234568.18')
+
+
+class DenormalizedEntryTypeTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='entrytypeuser',
+            password='testpass123'
+        )
+        self.income = Category.objects.create(name='Salário Entry', type=Category.INCOME, user=self.user)
+        self.expense = Category.objects.create(name='Mercado Entry', type=Category.EXPENSE, user=self.user)
+        transaction = Transaction.objects.create(description='Mês', date=date(2024, 3, 10), owner=self.user)
+        TransactionItem.objects.create(transaction=transaction, category=self.income, amount=Decimal('100.00'))
+        for amount in ('10.00', '20.00', '30.00', '40.00', '50.00'):
+            TransactionItem.objects.create(transaction=transaction, category=self.expense, amount=Decimal(amount))
+        self.client.force_login(self.user)
+
+    def entries(self, category):
+        return set(TransactionItem.objects.filter(category=category).values_list('entry_type', 'signed_amount'))
+
+    def test_items_carry_type_and_signed_amount(self):
+        self.assertEqual(self.entries(self.income), {(Category.INCOME, Decimal('100.00'))})
+        self.assertIn((Category.EXPENSE, Decimal('-30.00')), self.entries(self.expense))
+
+        item = TransactionItem.objects.filter(category=self.expense).first()
+        item.category = self.income
+        item.save(update_fields=['category'])
+        item.refresh_from_db()
+        self.assertEqual((item.entry_type, item.signed_amount), (Category.INCOME, item.amount))
+
+    def test_category_type_change_updates_items_in_batches(self):
+        self.assertEqual(get_transaction_report_totals(self.user)['balance'], Decimal('-50.00'))
+
+        batch_size = signals.RETYPE_BATCH_SIZE
+        signals.RETYPE_BATCH_SIZE = 2
+        try:
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.post(
+                    reverse('category_update', args=[self.expense.pk]),
+                    {'name': self.expense.name, 'type': Category.INCOME},
+                )
+        finally:
+            signals.RETYPE_BATCH_SIZE = batch_size
+        self.assertEqual(response.status_code, 302)
+
+        updates = [query['sql'] for query in queries.captured_queries
+                   if query['sql'].startswith('UPDATE "core_transactionitem"')]
+        self.assertEqual(len(updates), 3)
+        self.assertEqual(self.entries(self.expense), {
+            (Category.INCOME, Decimal(amount)) for amount in ('10.00', '20.00', '30.00', '40.00', '50.00')
+        })
+        self.assertEqual(get_transaction_report_totals(self.user)['balance'], Decimal('250.00'))
+
+    def test_migration_backfills_existing_rows(self):
+        migration = importlib.import_module('core.migrations.0007_transactionitem_entry_type')
+        TransactionItem.objects.update(entry_type='', signed_amount=0)
+        migration.backfill_entry_type(apps, None)
+        self.assertEqual(self.entries(self.income), {(Category.INCOME, Decimal('100.00'))})
+        self.assertIn((Category.EXPENSE, Decimal('-50.00')), self.entries(self.expense))
+
+    def test_totals_do_not_join_categories(self):
+        with CaptureQueriesContext(connection) as queries:
+            totals = get_transaction_report_totals(self.user)
+            series = get_daily_balance_series(self.user, 2024, 3)
+        self.assertEqual(totals['income'], Decimal('100.00'))
+        self.assertEqual(totals['expense'], Decimal('150.00'))
+        self.assertEqual(series[-1]['balance'], -50.0)
+        aggregates = [query['sql'] for query in queries.captured_queries if 'SUM(' in query['sql']]
+        self.assertEqual(len(aggregates), 2)
+        for sql in aggregates:
+            self.assertNotIn('core_category', sql)
+
+
+class TransactionTotalTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='totalsuser',
+            password='testpass123'
+        )
+        self.income = Category.objects.create(name='Salário Totals', type=Category.INCOME, user=self.user)
+        self.expense = Category.objects.create(name='Mercado Totals', type=Category.EXPENSE, user=self.user)
+
+    def create_transaction(self, *amounts, owner=None):
+        transaction = Transaction.objects.create(
+            description='Totais', date=date(2024, 3, 10), owner=owner or self.user
+        )
+        for category, amount in amounts:
+            TransactionItem.objects.create(transaction=transaction, category=category, amount=Decimal(amount))
+        return transaction
+
+    def items_data(self, *items, prefix='items'):
+        data = {
+            f'{prefix}-TOTAL_FORMS': str(len(items)),
+            f'{prefix}-INITIAL_FORMS': '0',
+            f'{prefix}-MIN_NUM_FORMS': '0',
+            f'{prefix}-MAX_NUM_FORMS': '1000',
+        }
+        for index, (category, amount) in enumerate(items):
+            data[f'{prefix}-{index}-category'] = category.pk
+            data[f'{prefix}-{index}-amount'] = amount
+        return data
+
+    def test_create_view_updates_total_once(self):
+        self.client.force_login(self.user)
+        data = {'description': 'Compras', 'date': '2024-03-10'}
+        data.update(self.items_data((self.income, '100.00'), (self.expense, '30.25'), (self.expense, '9.50')))
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(reverse('transaction_create'), data)
+        updates = [query['sql'] for query in queries.captured_queries
+                   if query['sql'].startswith('UPDATE "core_transaction" ')]
+        self.assertRedirects(response, reverse('transaction_list'))
+
+        transaction = Transaction.objects.get(owner=self.user)
+        self.assertEqual(transaction.total_amount, Decimal('60.25'))
+        self.assertEqual(len(updates), 1)
+        self.assertNotIn('core_category', ' '.join(updates))
+
+    def test_item_changes_keep_total(self):
+        transaction = self.create_transaction((self.income, '50.00'), (self.expense, '20.00'))
+        transaction.refresh_from_db()
+        self.assertEqual(transaction.total_amount, Decimal('30.00'))
+
+        transaction.items.filter(category=self.expense).get().delete()
+        transaction.refresh_from_db()
+        self.assertEqual(transaction.total_amount, Decimal('50.00'))
+
+        self.expense.type = Category.INCOME
+        self.expense.save()
+        self.create_transaction((self.expense, '5.00'))
+        other = self.create_transaction((self.expense, '7.00'))
+        self.expense.type = Category.EXPENSE
+        self.expense.save()
+        other.refresh_from_db()
+        self.assertEqual(other.total_amount, Decimal('-7.00'))
+
+    def test_admin_inline_updates_total(self):
+        admin_user = User.objects.create_superuser(username='totalsadmin', password='testpass123')
+        self.client.force_login(admin_user)
+        data = {'description': 'Admin', 'date': '2024-03-10', 'owner': self.user.pk}
+        data.update(self.items_data((self.income, '80.00'), (self.expense, '12.40')))
+        response = self.client.post(reverse('admin:core_transaction_add'), data)
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(Transaction.objects.get(owner=self.user).total_amount, Decimal('67.60'))
+
+    def test_import_sets_totals(self):
+        statement = 'Data;Descrição;Valor\n01/03/2024;Salário;1.000,00\n02/03/2024;Mercado;-45,90\n'
+        import_transactions(
+            self.user,
+            csv_rows(io.BytesIO(statement.encode())),
+            income_category=self.income,
+            expense_category=self.expense,
+        )
+        totals = sorted(Transaction.objects.filter(owner=self.user).values_list('total_amount', flat=True))
+        self.assertEqual(totals, [Decimal('-45.90'), Decimal('1000.00')])
+
+    def test_reconcile_command_reports_and_repairs_drift(self):
+        other_user = User.objects.create_user(username='totalsother', password='testpass123')
+        other_category = Category.objects.create(name='Outra Totals', type=Category.EXPENSE, user=other_user)
+        drifted = self.create_transaction((self.income, '10.00'), (self.expense, '2.50'))
+        self.create_transaction((self.income, '3.00'))
+        self.create_transaction((other_category, '4.00'), owner=other_user)
+        Transaction.objects.filter(pk=drifted.pk).update(total_amount=Decimal('10.00'))
+
+        output = io.StringIO()
+        call_command('reconcile_totals', dry_run=True, batch_size=1, stdout=output)
+        self.assertIn('3 transações conferidas', output.getvalue())
+        self.assertIn('1 com total divergente (R$ 2.50 de diferença)', output.getvalue())
+        self.assertIn(f'transação {drifted.pk}: R$ 10.00 guardado, R$ 7.50 pelos itens', output.getvalue())
+        drifted.refresh_from_db()
+        self.assertEqual(drifted.total_amount, Decimal('10.00'))
+
+        call_command('reconcile_totals', stdout=io.StringIO())
+        drifted.refresh_from_db()
+        self.assertEqual(drifted.total_amount, Decimal('7.50'))
+        output = io.StringIO()
+        call_command('reconcile_totals', stdout=output)
+        self.assertIn('0 com total divergente', output.getvalue())
+
+    def test_user_ranges_balance_transactions(self):
+        users = [self.user] + [
+            User.objects.create_user(username=f'totalsrange{index}', password='testpass123')
+            for index in range(3)
+        ]
+        for user in users:
+            category = Category.objects.create(name='Faixa Totals', type=Category.EXPENSE, user=user)
+            self.create_transaction((category, '1.00'), owner=user)
+        ranges = user_ranges(2)
+        self.assertEqual(ranges, [(users[0].pk, users[1].pk), (users[2].pk, users[3].pk)])
+        self.assertEqual(user_ranges(10)[-1][1], users[3].pk)
+
+
+class BalanceCheckpointTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='checkpointuser',
+            password='testpass123'
+        )
+        self.income = Category.objects.create(name='Salário Checkpoint', type=Category.INCOME, user=self.user)
+        self.expense = Category.objects.create(name='Mercado Checkpoint', type=Category.EXPENSE, user=self.user)
+        self.january = self.create_transaction(date(2024, 1, 10), (self.income, '1000.00'), (self.expense, '200.00'))
+        self.march = self.create_transaction(date(2024, 3, 5), (self.expense, '100.00'))
+        self.create_transaction(date(2024, 3, 20), (self.income, '50.00'))
+
+    def create_transaction(self, day, *amounts):
+        transaction = Transaction.objects.create(description='Saldo', date=day, owner=self.user)
+        for category, amount in amounts:
+            TransactionItem.objects.create(transaction=transaction, category=category, amount=Decimal(amount))
+        return transaction
+
+    def checkpoints(self):
+        return list(BalanceCheckpoint.objects.filter(user=self.user).order_by('year', 'month').values_list(
+            'year', 'month', 'balance'
+        ))
+
+    def balances(self):
+        # Meses que ficaram sem movimento repetem o fechamento anterior e são ignorados
+        balances = []
+        for year, month, balance in self.checkpoints():
+            if balance != (balances[-1][2] if balances else 0):
+                balances.append((year, month, balance))
+        return balances
+
+    def assertMatchesRebuild(self):
+        incremental = self.balances()
+        rebuild_checkpoints(self.user)
+        self.assertEqual(incremental, self.balances())
+
+    def test_checkpoints_follow_writes(self):
+        self.assertEqual(self.checkpoints(), [
+            (2024, 1, Decimal('800.00')),
+            (2024, 3, Decimal('750.00')),
+        ])
+
+        item = self.march.items.get()
+        item.amount = Decimal('120.00')
+        item.save()
+        self.assertMatchesRebuild()
+
+        self.march.date = date(2024, 2, 28)
+        self.march.save()
+        self.assertMatchesRebuild()
+        self.assertIn((2024, 2, Decimal('680.00')), self.checkpoints())
+
+        self.january.items.filter(category=self.expense).delete()
+        self.assertMatchesRebuild()
+        self.january.delete()
+        self.assertMatchesRebuild()
+
+        self.expense.type = Category.INCOME
+        self.expense.save()
+        self.assertMatchesRebuild()
+        self.assertEqual(self.balances()[-1], (2024, 3, Decimal('170.00')))
+
+    def test_import_updates_checkpoints(self):
+        statement = 'Data;Descrição;Valor\n15/12/2023;Bônus;300,00\n02/02/2024;Farmácia;-45,90\n'
+        import_transactions(
+            self.user,
+            csv_rows(io.BytesIO(statement.encode())),
+            income_category=self.income,
+            expense_category=self.expense,
+        )
+        self.assertMatchesRebuild()
+        self.assertEqual(self.checkpoints()[0], (2023, 12, Decimal('300.00')))
+
+    def test_opening_balance_is_a_lookup_plus_partial_month(self):
+        with self.assertNumQueries(2):
+            self.assertEqual(opening_balance(self.user, date(2024, 3, 10)), Decimal('700.00'))
+        with self.assertNumQueries(1):
+            self.assertEqual(opening_balance(self.user, date(2024, 3, 1)), Decimal('800.00'))
+        self.assertEqual(opening_balance(self.user, date(2024, 1, 10)), Decimal('0.00'))
+        self.assertEqual(opening_balance(self.user, date(2025, 1, 1)), Decimal('750.00'))
+
+    def test_daily_series_starts_from_true_balance(self):
+        series = get_daily_balance_series(self.user, 2024, 3)
+        self.assertEqual(series, [
+            {'date': '2024-03-05', 'balance': 700.0},
+            {'date': '2024-03-20', 'balance': 750.0},
+        ])
+        self.assertEqual(get_dashboard_data(self.user, 2024, 3)['daily_balance'], series)
+
+    def test_migration_backfill_matches_rebuild(self):
+        migration = importlib.import_module('core.migrations.0008_balancecheckpoint')
+        BalanceCheckpoint.objects.all().delete()
+        migration.backfill_checkpoints(apps, None)
+        self.assertMatchesRebuild()
+
+
+class DashboardNavigationTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='navigationuser',
+            password='testpass123'
+        )
+        self.income = Category.objects.create(name='Salário Navigation', type=Category.INCOME, user=self.user)
+        self.expense = Category.objects.create(name='Mercado Navigation', type=Category.EXPENSE, user=self.user)
+        for year in (2022, 2023):
+            for month in range(1, 13):
+                transaction = Transaction.objects.create(
+                    description='Mês', date=date(year, month, 15), owner=self.user
+                )
+                TransactionItem.objects.create(transaction=transaction, category=self.income, amount=Decimal('100.00'))
+                TransactionItem.objects.create(transaction=transaction, category=self.expense, amount=Decimal('30.00'))
+        self.client.force_login(self.user)
+
+    def test_month_navigation(self):
+        response = self.client.get(reverse('dashboard'), {'year': 2023, 'month': 1})
+        self.assertContains(response, 'Janeiro de 2023')
+        self.assertContains(response, '?year=2022&amp;month=12')
+        self.assertContains(response, '?year=2023&amp;month=2')
+        self.assertEqual(response.context['summary']['balance'], Decimal('70.00'))
+        self.assertEqual(response.context['balance_series'], {
+            'resolution': 'day', 'dates': ['2023-01-15'], 'values': [910.0],
+        })
+
+        response = self.client.get(reverse('dashboard'), {'year': 2023, 'month': 13})
+        today = timezone.now().date()
+        self.assertEqual(response.context['year'], today.year)
+
+    def test_neighbour_months_are_prefetched_after_commit(self):
+        with self.captureOnCommitCallbacks() as callbacks:
+            self.client.get(reverse('dashboard'), {'year': 2023, 'month': 1})
+        self.assertEqual(len(callbacks), 1)
+        with self.settings(DASHBOARD_PREFETCH=False), self.captureOnCommitCallbacks() as callbacks:
+            self.client.get(reverse('dashboard'), {'year': 2023, 'month': 1})
+        self.assertEqual(callbacks, [])
+
+    def test_range_spanning_years_uses_monthly_aggregates(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('dashboard'), {'start': '2022-01-01', 'end': '2023-12-31'})
+        item_queries = [query['sql'] for query in queries.captured_queries if 'core_transactionitem' in query['sql']]
+        self.assertEqual(item_queries, [])
+        self.assertContains(response, '01/01/2022 a 31/12/2023')
+        self.assertEqual(response.context['summary'], {
+            'income': Decimal('2400.00'),
+            'expense': Decimal('720.00'),
+            'balance': Decimal('1680.00'),
+        })
+        self.assertEqual(response.context['category_totals'], {
+            'labels': ['Mercado Navigation', 'Salário Navigation'],
+            'values': [720.0, 2400.0],
+        })
+        series = response.context['balance_series']
+        self.assertEqual(series['resolution'], 'month')
+        self.assertEqual(len(series['dates']), 24)
+        self.assertEqual((series['dates'][0], series['values'][0]), ('2022-01-31', 70.0))
+        self.assertEqual((series['dates'][-1], series['values'][-1]), ('2023-12-31', 1680.0))
+
+    def test_short_range_has_daily_points_from_opening_balance(self):
+        response = self.client.get(reverse('dashboard'), {'start': '2023-01-10', 'end': '2023-02-20'})
+        self.assertEqual(response.context['balance_series'], {
+            'resolution': 'day',
+            'dates': ['2023-01-15', '2023-02-15'],
+            'values': [910.0, 980.0],
+        })
+        self.assertEqual(response.context['summary']['income'], Decimal('200.00'))
+
+
+class DashboardPrefetchTest(TransactionTestCase):
+    def test_neighbour_months_are_cached_in_background(self):
+        user = User.objects.create_user(username='prefetchuser', password='testpass123')
+        category = Category.objects.create(name='Mercado Prefetch', type=Category.EXPENSE, user=user)
+        transaction = Transaction.objects.create(description='Compras', date=date(2024, 2, 10), owner=user)
+        TransactionItem.objects.create(transaction=transaction, category=category, amount=Decimal('25.00'))
+        self.client.force_login(user)
+
+        self.client.get(reverse('dashboard'), {'year': 2024, 'month': 3})
+        # O executor tem uma só thread: quando esta tarefa termina, o pré-cálculo também terminou
+        services._get_prefetch_executor().submit(lambda: None).result(timeout=10)
+
+        for year, month in ((2024, 2), (2024, 4)):
+            self.assertIsNotNone(cache.get(make_cache_key('dashboard', user.pk, [(year, month), {}])))
+        with self.assertNumQueries(0):
+            data = get_dashboard_data(user, 2024, 2)
+        self.assertEqual(data['summary']['expense'], Decimal('25.00'))
+
+
+class SeriesDownsamplingTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='seriesuser',
+            password='testpass123'
+        )
+        self.income = Category.objects.create(name='Salário Series', type=Category.INCOME, user=self.user)
+        self.expense = Category.objects.create(name='Mercado Series', type=Category.EXPENSE, user=self.user)
+        transactions = []
+        day = date(2021, 1, 1)
+        while day <= date(2023, 12, 31):
+            transactions.append(Transaction(description='Dia', date=day, owner=self.user))
+            day += timedelta(days=1)
+        Transaction.objects.bulk_create(transactions)
+        items = []
+        for transaction in Transaction.objects.filter(owner=self.user):
+            # Receita no dia 1, despesa nos demais dias
+            if transaction.date.day == 1:
+                item = TransactionItem(transaction=transaction, category=self.income, amount=Decimal('310.00'))
+            else:
+                item = TransactionItem(transaction=transaction, category=self.expense, amount=Decimal('10.00'))
+            item.set_entry_type()
+            items.append(item)
+        TransactionItem.objects.bulk_create(items)
+        rebuild_rollups(self.user)
+        self.client.force_login(self.user)
+
+    def test_lttb_keeps_endpoints_and_budget(self):
+        xs = list(range(1000))
+        ys = [(index % 50) * (-1) ** (index // 50) for index in xs]
+        kept = lttb(xs, ys, 40)
+        self.assertEqual(len(kept), 40)
+        self.assertEqual((kept[0], kept[-1]), (0, 999))
+        self.assertEqual(kept, sorted(set(kept)))
+        self.assertEqual(lttb(xs[:10], ys[:10], 40), list(range(10)))
+
+    def test_resolution_follows_range_length(self):
+        self.assertEqual(pick_resolution(date(2023, 1, 1), date(2023, 3, 31)), 'day')
+        self.assertEqual(pick_resolution(date(2023, 1, 1), date(2023, 12, 31)), 'week')
+        self.assertEqual(pick_resolution(date(2021, 1, 1), date(2023, 12, 31)), 'month')
+
+    def test_every_resolution_ends_at_the_same_balance(self):
+        expected = float(opening_balance(self.user, date(2023, 7, 1)))
+        for resolution in ('day', 'week', 'month'):
+            series = balance_series(self.user, date(2023, 1, 1), date(2023, 6, 30), resolution, SERIES_POINTS_LIMIT)
+            self.assertEqual(series['resolution'], resolution)
+            self.assertEqual(series['dates'][-1], '2023-06-30')
+            self.assertEqual(series['values'][-1], expected)
+
+    def test_endpoint_returns_compact_columnar_json(self):
+        response = self.client.get(reverse('dashboard_series'), {
+            'start': '2021-01-01', 'end': '2023-12-31', 'resolution': 'day', 'points': 100,
+        })
+        self.assertEqual(response['Content-Type'], 'application/json')
+        data = response.json()
+        self.assertEqual(set(data), {'resolution', 'dates', 'values'})
+        self.assertEqual(data['resolution'], 'day')
+        self.assertEqual(len(data['dates']), 100)
+        self.assertEqual(len(data['values']), 100)
+        self.assertEqual((data['dates'][0], data['dates'][-1]), ('2021-01-01', '2023-12-31'))
+        self.assertLess(len(response.content), 4 * 1024)
+
+        data = self.client.get(reverse('dashboard_series'), {'start': '2021-01-01', 'end': '2023-12-31'}).json()
+        self.assertEqual(data['resolution'], 'month')
+        self.assertEqual(len(data['dates']), 36)
@@ -0,0 +1,104 @@
+from django.template.backends.django import DjangoTemplates
+from contextlib import contextmanager
+from contextvars import ContextVar
+import time
+
+
+_current = ContextVar('core_request_timings', default=None)
+
+
+class RequestTimings:
+    """
+    Tempos acumulados de uma requisição, em milissegundos. O tempo de SQL é
+    contado à parte: template e pdf não incluem as consultas feitas durante eles.
+    """
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.sql_ms = 0.0
+        self.queries = 0
+        self.spans = {}
+
+    def total_ms(self):
+        return (time.perf_counter() - self.started) * 1000
+
+    def record_query(self, duration_ms):
+        self.sql_ms += duration_ms
+        self.queries += 1
+
+    def add(self, name, duration_ms):
+        self.spans[name] = self.spans.get(name, 0.0) + duration_ms
+
+
+def current_timings():
+    return _current.get()
+
+
+def start_request():
+    timings = RequestTimings()
+    return timings, _current.set(timings)
+
+
+def finish_request(token):
+    _current.reset(token)
+
+
+@contextmanager
+def timed(name):
+    """
+    Soma a duração do bloco ao trecho `name` da requisição atual, descontando
+    o SQL executado dentro dele. Fora de uma requisição não faz nada.
+    """
+    timings = _current.get()
+    if timings is None:
+        yield
+        return
+    started = time.perf_counter()
+    sql_before = timings.sql_ms
+    try:
+        yield
+    finally:
+        elapsed = (time.perf_counter() - started) * 1000
+        timings.add(name, elapsed - (timings.sql_ms - sql_before))
+
+
+def sql_timer(execute, sql, params, many, context):
+    """
+    Execute wrapper (connection.execute_wrapper) que mede as consultas
+    """
+    timings = _current.get()
+    if timings is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        timings.record_query((time.perf_counter() - started) * 1000)
+
+
+class TimedTemplate:
+    """
+    Template que mede o tempo de renderização
+    """
+
+    def __init__(self, template):
+        self.template = template
+
+    def __getattr__(self, name):
+        return getattr(self.template, name)
+
+    def render(self, context=None, request=None):
+        with timed('template'):
+            return self.template.render(context, request)
+
+
+class TimedDjangoTemplates(DjangoTemplates):
+    """
+    Backend padrão do Django com medição do tempo de renderização
+    """
+
+    def from_string(self, template_code):
+        return TimedTemplate(super().from_string(template_code))
+
+    def get_template(self, template_name):
+        return TimedTemplate(super().get_template(template_name))
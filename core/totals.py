@@ -0,0 +1,150 @@
+from django.db.models import Count, F, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce, Round
+from contextlib import contextmanager
+from .models import Transaction, TransactionItem
+from .money import cents, sum_cents
+import threading
+
+
+# Transações conferidas por lote em reconcile_range
+RECONCILE_BATCH_SIZE = 1000
+
+# Quantidade de divergências guardadas como exemplo no relatório
+DRIFT_EXAMPLES = 10
+
+_pending = threading.local()
+
+
+def _item_sum(expression):
+    """
+    Subconsulta com a soma dos itens da transação externa
+    """
+    return Subquery(
+        TransactionItem.objects.filter(transaction=OuterRef('pk')).order_by().values(
+            'transaction'
+        ).annotate(total=expression).values('total')
+    )
+
+
+def signed_total():
+    """
+    Soma com sinal dos itens da transação (zero se não houver itens)
+    """
+    return Coalesce(
+        _item_sum(Round(Sum('signed_amount'), 2)),
+        Value(0),
+        output_field=Transaction._meta.get_field('total_amount'),
+    )
+
+
+def signed_total_cents():
+    """
+    Mesma soma de signed_total(), em centavos inteiros
+    """
+    return Coalesce(_item_sum(sum_cents('signed_amount')), Value(0))
+
+
+def refresh_totals(transaction_ids):
+    """
+    Recalcula total_amount das transações informadas com uma única UPDATE.
+    Retorna o número de transações atualizadas.
+    """
+    transaction_ids = list(transaction_ids)
+    if not transaction_ids:
+        return 0
+    return Transaction.objects.filter(pk__in=transaction_ids).update(total_amount=signed_total())
+
+
+def total_changed(transaction_id):
+    """
+    Chamado pelos sinais quando um item da transação muda: recalcula o total
+    agora ou, dentro de deferred_totals(), ao final do bloco
+    """
+    pending = getattr(_pending, 'ids', None)
+    if pending is None:
+        refresh_totals([transaction_id])
+    else:
+        pending.add(transaction_id)
+
+
+@contextmanager
+def deferred_totals():
+    """
+    Agrupa as mudanças de itens do bloco (ex.: um formset inteiro) em uma só
+    UPDATE de total_amount, feita ao sair. Blocos aninhados usam o externo.
+    """
+    if getattr(_pending, 'ids', None) is not None:
+        yield
+        return
+
+    _pending.ids = set()
+    try:
+        yield
+        pending = _pending.ids
+    finally:
+        del _pending.ids
+    refresh_totals(pending)
+
+
+def user_ranges(workers):
+    """
+    Divide os donos de transações em até `workers` intervalos contíguos de id
+    (primeiro, último), com quantidades de transações parecidas
+    """
+    counts = list(
+        Transaction.objects.values('owner_id').annotate(count=Count('id')).order_by('owner_id').values_list(
+            'owner_id', 'count'
+        )
+    )
+    total = sum(count for _, count in counts)
+    ranges = []
+    first = None
+    seen = 0
+    for owner_id, count in counts:
+        if first is None:
+            first = owner_id
+        seen += count
+        # Fecha o intervalo quando atinge a sua fração do total
+        if seen * workers >= total * (len(ranges) + 1):
+            ranges.append((first, owner_id))
+            first = None
+    return ranges
+
+
+def reconcile_range(first_user_id, last_user_id, batch_size=RECONCILE_BATCH_SIZE, dry_run=False):
+    """
+    Confere total_amount das transações dos usuários com id entre
+    first_user_id e last_user_id (inclusive), em lotes por pk: uma consulta
+    encontra as divergentes do lote e uma UPDATE corrige só essas.
+    Retorna um dicionário com 'checked', 'drifted', 'drift_cents' (soma das
+    diferenças absolutas) e 'examples' [(pk, guardado, correto) em centavos].
+    """
+    transactions = Transaction.objects.filter(owner__gte=first_user_id, owner__lte=last_user_id)
+    result = {'checked': 0, 'drifted': 0, 'drift_cents': 0, 'examples': []}
+    last_pk = 0
+
+    while True:
+        batch = list(
+            transactions.filter(pk__gt=last_pk).order_by('pk').values_list('pk', flat=True)[:batch_size]
+        )
+        if not batch:
+            break
+        last_pk = batch[-1]
+        result['checked'] += len(batch)
+
+        stale = list(
+            transactions.filter(pk__range=(batch[0], batch[-1])).annotate(
+                stored=cents('total_amount'),
+                expected=signed_total_cents(),
+            ).exclude(stored=F('expected')).order_by('pk').values_list('pk', 'stored', 'expected')
+        )
+        if not stale:
+            continue
+
+        result['drifted'] += len(stale)
+        result['drift_cents'] += sum(abs(expected - stored) for _, stored, expected in stale)
+        result['examples'].extend(stale[:DRIFT_EXAMPLES - len(result['examples'])])
+        if not dry_run:
+            refresh_totals(pk for pk, _, _ in stale)
+
+    return result
@@ -8,6 +8,7 @@ urlpatterns = [
     
     # Dashboard
     path('dashboard/', views.dashboard, name='dashboard'),
+    path('dashboard/series/', views.dashboard_series, name='dashboard_series'),
     
     # Categorias
     path('categories/', views.CategoryListView.as_view(), name='category_list'),
@@ -18,15 +19,22 @@ urlpatterns = [
     # Transações
     path('transactions/', views.TransactionListView.as_view(), name='transaction_list'),
     path('transactions/new/', views.TransactionCreateView.as_view(), name='transaction_create'),
+    path('transactions/import/', views.transaction_import, name='transaction_import'),
     path('transactions/<int:pk>/', views.TransactionDetailView.as_view(), name='transaction_detail'),
     path('transactions/<int:pk>/edit/', views.TransactionUpdateView.as_view(), name='transaction_update'),
     path('transactions/<int:pk>/delete/', views.TransactionDeleteView.as_view(), name='transaction_delete'),
     
     # Relatórios
-    path('reports/transactions/', views.report_transactions, name='report_transactions'),
-    path('reports/transactions-by-category/', views.report_transactions_by_category, name='report_transactions_by_category'),
-    path('reports/transactions-by-month/', views.report_transactions_by_month, name='report_transactions_by_month'),
+    path('reports/transactions/', views.report, {'name': 'transactions'}, name='report_transactions'),
+    path('reports/transactions-by-category/', views.report, {'name': 'transactions_by_category'}, name='report_transactions_by_category'),
+    path('reports/transactions-by-month/', views.report, {'name': 'transactions_by_month'}, name='report_transactions_by_month'),
+    path('reports/jobs/', views.report_job_submit, name='report_job_submit'),
+    path('reports/jobs/<int:pk>/', views.report_job_status, name='report_job_status'),
+    path('reports/jobs/<int:pk>/download/', views.report_job_download, name='report_job_download'),
     
     # Registro
     path('accounts/signup/', SignUpView.as_view(), name='signup'),
+    
+    # Monitoramento
+    path('metrics', views.metrics, name='metrics'),
 ]
\ No newline at end of file
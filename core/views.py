@@ -2,25 +2,28 @@ from django.shortcuts import render, get_object_or_404, redirect
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth.mixins import LoginRequiredMixin
 from django.views.generic import ListView, CreateView, UpdateView, DeleteView, DetailView
-from django.urls import reverse_lazy
+from django.urls import reverse, reverse_lazy
+from django.views.decorators.http import require_POST
 from django.contrib import messages
+from django.conf import settings
 from django.db import transaction
 from django.utils import timezone
-from django.http import HttpResponse
-from .models import Category, Transaction, TransactionItem
-from .forms import TransactionForm, TransactionItemFormSet
-from .services import get_month_summary, get_category_totals, get_daily_balance_series
+from django.http import FileResponse, Http404, HttpResponse, JsonResponse
+from .models import Category, ReportJob, Transaction, TransactionItem
+from .forms import TransactionForm, TransactionImportForm, TransactionItemFormSet
+from .services import get_dashboard_data, get_range_dashboard_data, prefetch_dashboard_months, shift_month
+from .reports import REPORTS, RENDERERS, parse_filter_date, render_html
+from .jobs import submit_report_job
+from .pagination import InvalidCursor, KeysetPaginator
+from .search import search_transactions
+from .imports import StatementError, detect_format, import_transactions, statement_rows
+from .metrics import registry as metrics_registry
+from .totals import deferred_totals
+from .series import RESOLUTIONS, SERIES_MAX_POINTS, SERIES_POINTS_LIMIT, balance_series, category_columns, columnar
+from .rollups import month_bounds
 import calendar
-from django.db.models import Sum, Q
+from django.db.models import Exists, OuterRef, Sum, Q
 from django.db.models import Prefetch
-from reportlab.pdfgen import canvas
-from reportlab.lib.pagesizes import letter, A4
-from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-from reportlab.lib.units import inch
-from reportlab.lib import colors
-from io import BytesIO
-from django.utils.dateparse import parse_date
 from django.utils.formats import date_format
 from datetime import datetime
 
@@ -37,629 +40,83 @@ def home(request):
 
 
 @login_required
-def report_transactions(request):
+def report(request, name):
     """
-    View para relatório de transações com filtros por data e categoria
+    Relatório `name` em HTML ou no formato pedido em ?format= (pdf, csv, ndjson)
     """
-    # Check if this is a PDF export request
-    if request.GET.get('format') == 'pdf':
-        return report_transactions_pdf(request)
-    
-    transactions = Transaction.objects.filter(owner=request.user).order_by('-date')
-    
-    # Apply filters
-    start_date = request.GET.get('start_date')
-    end_date = request.GET.get('end_date')
-    category_id = request.GET.get('category')
-    
-    if start_date and start_date != 'None':
-        transactions = transactions.filter(date__gte=start_date)
-    if end_date and end_date != 'None':
-        transactions = transactions.filter(date__lte=end_date)
-    if category_id and category_id != 'None':
-        transactions = transactions.filter(items__category_id=category_id)
-        
-    # Get categories for filter dropdown - filtrar apenas as categorias do usuário
-    categories = Category.objects.filter(user=request.user).order_by('name')
-    
-    # Calculate totals
-    total_income = sum(
-        item.amount for transaction in transactions 
-        for item in transaction.items.all() 
-        if item.category.type == Category.INCOME
-    )
-    total_expense = sum(
-        item.amount for transaction in transactions 
-        for item in transaction.items.all() 
-        if item.category.type == Category.EXPENSE
-    )
-    balance = total_income - total_expense
-    
-    context = {
-        'transactions': transactions,
-        'categories': categories,
-        'start_date': start_date,
-        'end_date': end_date,
-        'category_id': category_id,
-        'total_income': total_income,
-        'total_expense': total_expense,
-        'balance': balance,
+    report = REPORTS[name](request.user, request.GET)
+    renderer = RENDERERS.get(request.GET.get('format'), render_html)
+    return renderer(request, report)
+
+
+def _report_job_payload(job):
+    payload = {
+        'id': job.pk,
+        'report': job.report,
+        'status': job.status,
+        'error': job.error,
+        'created_at': job.created_at.isoformat(),
+        'status_url': reverse('report_job_status', args=[job.pk]),
     }
-    
-    return render(request, 'core/report_transactions.html', context)
+    if job.status == ReportJob.DONE:
+        payload['download_url'] = reverse('report_job_download', args=[job.pk])
+    return payload
 
 
 @login_required
-def report_transactions_pdf(request):
+@require_POST
+def report_job_submit(request):
     """
-    Generate PDF for transactions report
+    Agenda a geração de um relatório em PDF e devolve o id da tarefa
     """
-    # Get data
-    transactions = Transaction.objects.filter(owner=request.user).order_by('-date')
-    
-    # Apply filters
-    start_date = request.GET.get('start_date')
-    end_date = request.GET.get('end_date')
-    category_id = request.GET.get('category')
-    
-    if start_date and start_date != 'None':
-        transactions = transactions.filter(date__gte=start_date)
-    if end_date and end_date != 'None':
-        transactions = transactions.filter(date__lte=end_date)
-    if category_id and category_id != 'None':
-        transactions = transactions.filter(items__category_id=category_id)
-        
-    # Calculate totals
-    total_income = sum(
-        item.amount for transaction in transactions 
-        for item in transaction.items.all() 
-        if item.category.type == Category.INCOME
-    )
-    total_expense = sum(
-        item.amount for transaction in transactions 
-        for item in transaction.items.all() 
-        if item.category.type == Category.EXPENSE
-    )
-    balance = total_income - total_expense
-    
-    # Create PDF
-    buffer = BytesIO()
-    doc = SimpleDocTemplate(buffer, pagesize=A4)
-    elements = []
-    
-    # Styles
-    styles = getSampleStyleSheet()
-    title_style = ParagraphStyle(
-        'CustomTitle',
-        parent=styles['Heading1'],
-        fontSize=18,
-        spaceAfter=30,
-    )
-    
-    # Title
-    elements.append(Paragraph("Relatório de Transações", title_style))
-    elements.append(Spacer(1, 20))
-    
-    # Filters info
-    filter_text = "Filtros aplicados: "
-    if start_date and start_date != 'None':
-        parsed_date = parse_date(start_date)
-        if parsed_date:
-            filter_text += f"De {parsed_date.strftime('%d/%m/%Y')} "
-    if end_date and end_date != 'None':
-        parsed_date = parse_date(end_date)
-        if parsed_date:
-            filter_text += f"Até {parsed_date.strftime('%d/%m/%Y')} "
-    if category_id and category_id != 'None':
-        try:
-            category = Category.objects.get(id=category_id)
-            filter_text += f"Categoria: {category.name}"
-        except Category.DoesNotExist:
-            pass
-    
-    if not (start_date or end_date or category_id) or (start_date == 'None' and end_date == 'None' and category_id == 'None'):
-        filter_text += "Nenhum"
-        
-    elements.append(Paragraph(filter_text, styles['Normal']))
-    elements.append(Spacer(1, 20))
-    
-    # Summary table
-    summary_data = [
-        ['Receitas', 'Despesas', 'Saldo'],
-        [f'R$ {total_income:.2f}', f'R$ {total_expense:.2f}', f'R$ {balance:.2f}']
-    ]
+    report = request.POST.get('report')
+    if report not in REPORTS:
+        return JsonResponse({'error': 'Relatório inválido.'}, status=400)
     
-    summary_table = Table(summary_data)
-    summary_table.setStyle(TableStyle([
-        ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
-        ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-        ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-        ('FONTSIZE', (0, 0), (-1, 0), 14),
-        ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-        ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
-        ('FONTNAME', (0, 1), (-1, -1), 'Helvetica'),
-        ('FONTSIZE', (0, 1), (-1, -1), 12),
-        ('GRID', (0, 0), (-1, -1), 1, colors.black)
-    ]))
-    
-    elements.append(summary_table)
-    elements.append(Spacer(1, 30))
-    
-    # Transactions table
-    if transactions:
-        # Table header
-        transaction_data = [['Data', 'Descrição', 'Categoria', 'Valor', 'Tipo']]
-        
-        # Table data
-        for transaction in transactions:
-            for item in transaction.items.all():
-                transaction_data.append([
-                    transaction.date.strftime('%d/%m/%Y'),
-                    transaction.description,
-                    item.category.name,
-                    f'R$ {item.amount:.2f}',
-                    'Receita' if item.category.type == Category.INCOME else 'Despesa'
-                ])
-        
-        transaction_table = Table(transaction_data)
-        transaction_table.setStyle(TableStyle([
-            ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
-            ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-            ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-            ('FONTSIZE', (0, 0), (-1, 0), 12),
-            ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-            ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
-            ('FONTNAME', (0, 1), (-1, -1), 'Helvetica'),
-            ('FONTSIZE', (0, 1), (-1, -1), 10),
-            ('GRID', (0, 0), (-1, -1), 1, colors.black)
-        ]))
-        
-        elements.append(Paragraph("Transações", styles['Heading2']))
-        elements.append(Spacer(1, 12))
-        elements.append(transaction_table)
-    
-    # Build PDF
-    doc.build(elements)
-    
-    # Return PDF
-    buffer.seek(0)
-    response = HttpResponse(buffer.getvalue(), content_type='application/pdf')
-    response['Content-Disposition'] = 'attachment; filename="relatorio_transacoes.pdf"'
-    return response
+    params = {key: request.POST.get(key, '') for key in ('start_date', 'end_date', 'category')}
+    job = submit_report_job(request.user, report, params)
+    return JsonResponse(_report_job_payload(job), status=202)
 
 
 @login_required
-def report_transactions_by_category(request):
+def report_job_status(request, pk):
     """
-    View for transactions report grouped by category with date filter
+    Situação de uma tarefa de relatório do usuário
     """
-    # Check if this is a PDF export request
-    if request.GET.get('format') == 'pdf':
-        return report_transactions_by_category_pdf(request)
-    
-    # Apply date filters
-    start_date = request.GET.get('start_date')
-    end_date = request.GET.get('end_date')
-    
-    # Build query for transaction items
-    items = TransactionItem.objects.filter(transaction__owner=request.user)
-    
-    if start_date and start_date != 'None':
-        items = items.filter(transaction__date__gte=start_date)
-    if end_date and end_date != 'None':
-        items = items.filter(transaction__date__lte=end_date)
-        
-    # Group by category and calculate totals
-    category_totals = {}
-    for item in items.select_related('category', 'transaction'):
-        category_name = item.category.name
-        category_type = item.category.type
-        
-        if category_name not in category_totals:
-            category_totals[category_name] = {
-                'type': category_type,
-                'total': 0,
-                'count': 0
-            }
-            
-        category_totals[category_name]['total'] += float(item.amount)
-        category_totals[category_name]['count'] += 1
-    
-    # Calculate general totals
-    total_income = sum(data['total'] for data in category_totals.values() if data['type'] == Category.INCOME)
-    total_expense = sum(data['total'] for data in category_totals.values() if data['type'] == Category.EXPENSE)
-    balance = total_income - total_expense
-    
-    context = {
-        'category_totals': category_totals,
-        'start_date': start_date,
-        'end_date': end_date,
-        'total_income': total_income,
-        'total_expense': total_expense,
-        'balance': balance,
-    }
-    
-    return render(request, 'core/report_transactions_by_category.html', context)
+    job = get_object_or_404(ReportJob, pk=pk, user=request.user)
+    return JsonResponse(_report_job_payload(job))
 
 
 @login_required
-def report_transactions_by_category_pdf(request):
+def report_job_download(request, pk):
     """
-    Generate PDF for transactions by category report
+    Download do PDF de uma tarefa concluída
     """
-    # Apply date filters
-    start_date = request.GET.get('start_date')
-    end_date = request.GET.get('end_date')
-    
-    # Build query for transaction items
-    items = TransactionItem.objects.filter(transaction__owner=request.user)
-    
-    if start_date and start_date != 'None':
-        items = items.filter(transaction__date__gte=start_date)
-    if end_date and end_date != 'None':
-        items = items.filter(transaction__date__lte=end_date)
-        
-    # Group by category and calculate totals
-    category_totals = {}
-    for item in items.select_related('category', 'transaction'):
-        category_name = item.category.name
-        category_type = item.category.type
-        
-        if category_name not in category_totals:
-            category_totals[category_name] = {
-                'type': category_type,
-                'total': 0,
-                'count': 0
-            }
-            
-        category_totals[category_name]['total'] += float(item.amount)
-        category_totals[category_name]['count'] += 1
-    
-    # Calculate general totals
-    total_income = sum(data['total'] for data in category_totals.values() if data['type'] == Category.INCOME)
-    total_expense = sum(data['total'] for data in category_totals.values() if data['type'] == Category.EXPENSE)
-    balance = total_income - total_expense
-    
-    # Create PDF
-    buffer = BytesIO()
-    doc = SimpleDocTemplate(buffer, pagesize=A4)
-    elements = []
-    
-    # Styles
-    styles = getSampleStyleSheet()
-    title_style = ParagraphStyle(
-        'CustomTitle',
-        parent=styles['Heading1'],
-        fontSize=18,
-        spaceAfter=30,
+    job = get_object_or_404(ReportJob, pk=pk, user=request.user, status=ReportJob.DONE)
+    try:
+        output = open(job.file_path, 'rb')
+    except FileNotFoundError:
+        raise Http404('Arquivo do relatório não encontrado.')
+    return FileResponse(
+        output,
+        as_attachment=True,
+        filename=f'{REPORTS[job.report].filename}.pdf',
+        content_type='application/pdf',
     )
-    
-    # Title
-    elements.append(Paragraph("Relatório de Transações por Categoria", title_style))
-    elements.append(Spacer(1, 20))
-    
-    # Filters info
-    filter_text = "Filtros aplicados: "
-    if start_date and start_date != 'None':
-        parsed_date = parse_date(start_date)
-        if parsed_date:
-            filter_text += f"De {parsed_date.strftime('%d/%m/%Y')} "
-    if end_date and end_date != 'None':
-        parsed_date = parse_date(end_date)
-        if parsed_date:
-            filter_text += f"Até {parsed_date.strftime('%d/%m/%Y')} "
-    
-    if not (start_date or end_date) or (start_date == 'None' and end_date == 'None'):
-        filter_text += "Nenhum"
-        
-    elements.append(Paragraph(filter_text, styles['Normal']))
-    elements.append(Spacer(1, 20))
-    
-    # Summary table
-    summary_data = [
-        ['Receitas', 'Despesas', 'Saldo'],
-        [f'R$ {total_income:.2f}', f'R$ {total_expense:.2f}', f'R$ {balance:.2f}']
-    ]
-    
-    summary_table = Table(summary_data)
-    summary_table.setStyle(TableStyle([
-        ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
-        ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-        ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-        ('FONTSIZE', (0, 0), (-1, 0), 14),
-        ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-        ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
-        ('FONTNAME', (0, 1), (-1, -1), 'Helvetica'),
-        ('FONTSIZE', (0, 1), (-1, -1), 12),
-        ('GRID', (0, 0), (-1, -1), 1, colors.black)
-    ]))
-    
-    elements.append(summary_table)
-    elements.append(Spacer(1, 30))
-    
-    # Category table
-    if category_totals:
-        # Table header
-        category_data = [['Categoria', 'Tipo', 'Total', 'Quantidade']]
-        
-        # Table data
-        for category_name, data in category_totals.items():
-            category_data.append([
-                category_name,
-                'Receita' if data['type'] == Category.INCOME else 'Despesa',
-                f'R$ {data["total"]:.2f}',
-                str(data['count'])
-            ])
-        
-        category_table = Table(category_data)
-        category_table.setStyle(TableStyle([
-            ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
-            ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-            ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-            ('FONTSIZE', (0, 0), (-1, 0), 12),
-            ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-            ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
-            ('FONTNAME', (0, 1), (-1, -1), 'Helvetica'),
-            ('FONTSIZE', (0, 1), (-1, -1), 10),
-            ('GRID', (0, 0), (-1, -1), 1, colors.black)
-        ]))
-        
-        elements.append(Paragraph("Transações por Categoria", styles['Heading2']))
-        elements.append(Spacer(1, 12))
-        elements.append(category_table)
-    
-    # Build PDF
-    doc.build(elements)
-    
-    # Return PDF
-    buffer.seek(0)
-    response = HttpResponse(buffer.getvalue(), content_type='application/pdf')
-    response['Content-Disposition'] = 'attachment; filename="relatorio_transacoes_categoria.pdf"'
-    return response
-
-
-@login_required
-def report_transactions_by_month(request):
-    """
-    View for transactions report grouped by month with date and category filters
-    """
-    # Check if this is a PDF export request
-    if request.GET.get('format') == 'pdf':
-        return report_transactions_by_month_pdf(request)
-    
-    # Apply filters
-    start_date = request.GET.get('start_date')
-    end_date = request.GET.get('end_date')
-    category_id = request.GET.get('category')
-    
-    # Build query for transaction items
-    items = TransactionItem.objects.filter(transaction__owner=request.user)
-    
-    if start_date and start_date != 'None':
-        items = items.filter(transaction__date__gte=start_date)
-    if end_date and end_date != 'None':
-        items = items.filter(transaction__date__lte=end_date)
-    if category_id and category_id != 'None':
-        items = items.filter(category_id=category_id)
-        
-    # Group by month and calculate totals
-    monthly_totals = {}
-    for item in items.select_related('category', 'transaction'):
-        # Get year-month key
-        date = item.transaction.date
-        month_key = date.strftime('%Y-%m')
-        month_name = date.strftime('%m/%Y')
-        
-        if month_key not in monthly_totals:
-            monthly_totals[month_key] = {
-                'name': month_name,
-                'income': 0,
-                'expense': 0,
-                'balance': 0,
-                'count': 0
-            }
-            
-        if item.category.type == Category.INCOME:
-            monthly_totals[month_key]['income'] += float(item.amount)
-        else:  # EXPENSE
-            monthly_totals[month_key]['expense'] += float(item.amount)
-            
-        monthly_totals[month_key]['count'] += 1
-    
-    # Calculate balance for each month
-    for data in monthly_totals.values():
-        data['balance'] = data['income'] - data['expense']
-    
-    # Sort by month
-    sorted_monthly_totals = sorted(monthly_totals.items(), key=lambda x: x[0])
-    
-    # Calculate general totals
-    total_income = sum(data[1]['income'] for data in sorted_monthly_totals)
-    total_expense = sum(data[1]['expense'] for data in sorted_monthly_totals)
-    total_balance = total_income - total_expense
-    
-    # Get categories for filter dropdown - filtrar apenas as categorias do usuário
-    categories = Category.objects.filter(user=request.user).order_by('name')
-    
-    context = {
-        'monthly_totals': sorted_monthly_totals,
-        'categories': categories,
-        'start_date': start_date,
-        'end_date': end_date,
-        'category_id': category_id,
-        'total_income': total_income,
-        'total_expense': total_expense,
-        'total_balance': total_balance,
-    }
-    
-    return render(request, 'core/report_transactions_by_month.html', context)
 
 
-@login_required
-def report_transactions_by_month_pdf(request):
+def metrics(request):
     """
-    Generate PDF for transactions by month report
+    Métricas no formato de exposição do Prometheus. Com METRICS_TOKEN
+    definido, exige o cabeçalho Authorization: Bearer <token>.
     """
-    # Apply filters
-    start_date = request.GET.get('start_date')
-    end_date = request.GET.get('end_date')
-    category_id = request.GET.get('category')
-    
-    # Build query for transaction items
-    items = TransactionItem.objects.filter(transaction__owner=request.user)
-    
-    if start_date and start_date != 'None':
-        items = items.filter(transaction__date__gte=start_date)
-    if end_date and end_date != 'None':
-        items = items.filter(transaction__date__lte=end_date)
-    if category_id and category_id != 'None':
-        items = items.filter(category_id=category_id)
-        
-    # Group by month and calculate totals
-    monthly_totals = {}
-    for item in items.select_related('category', 'transaction'):
-        # Get year-month key
-        date = item.transaction.date
-        month_key = date.strftime('%Y-%m')
-        month_name = date.strftime('%m/%Y')
-        
-        if month_key not in monthly_totals:
-            monthly_totals[month_key] = {
-                'name': month_name,
-                'income': 0,
-                'expense': 0,
-                'balance': 0,
-                'count': 0
-            }
-            
-        if item.category.type == Category.INCOME:
-            monthly_totals[month_key]['income'] += float(item.amount)
-        else:  # EXPENSE
-            monthly_totals[month_key]['expense'] += float(item.amount)
-            
-        monthly_totals[month_key]['count'] += 1
-    
-    # Calculate balance for each month
-    for data in monthly_totals.values():
-        data['balance'] = data['income'] - data['expense']
-    
-    # Sort by month
-    sorted_monthly_totals = sorted(monthly_totals.items(), key=lambda x: x[0])
-    
-    # Calculate general totals
-    total_income = sum(data[1]['income'] for data in sorted_monthly_totals)
-    total_expense = sum(data[1]['expense'] for data in sorted_monthly_totals)
-    total_balance = total_income - total_expense
-    
-    # Create PDF
-    buffer = BytesIO()
-    doc = SimpleDocTemplate(buffer, pagesize=A4)
-    elements = []
-    
-    # Styles
-    styles = getSampleStyleSheet()
-    title_style = ParagraphStyle(
-        'CustomTitle',
-        parent=styles['Heading1'],
-        fontSize=18,
-        spaceAfter=30,
+    token = getattr(settings, 'METRICS_TOKEN', None)
+    if token and request.headers.get('Authorization') != f'Bearer {token}':
+        return HttpResponse(status=401)
+    return HttpResponse(
+        metrics_registry.expose(),
+        content_type='text/plain; version=0.0.4; charset=utf-8',
     )
-    
-    # Title
-    elements.append(Paragraph("Relatório de Transações por Mês", title_style))
-    elements.append(Spacer(1, 20))
-    
-    # Filters info
-    filter_text = "Filtros aplicados: "
-    if start_date and start_date != 'None':
-        parsed_date = parse_date(start_date)
-        if parsed_date:
-            filter_text += f"De {parsed_date.strftime('%d/%m/%Y')} "
-    if end_date and end_date != 'None':
-        parsed_date = parse_date(end_date)
-        if parsed_date:
-            filter_text += f"Até {parsed_date.strftime('%d/%m/%Y')} "
-    if category_id and category_id != 'None':
-        try:
-            category = Category.objects.get(id=category_id)
-            filter_text += f"Categoria: {category.name}"
-        except Category.DoesNotExist:
-            pass
-    
-    if not (start_date or end_date or category_id) or (start_date == 'None' and end_date == 'None' and category_id == 'None'):
-        filter_text += "Nenhum"
-        
-    elements.append(Paragraph(filter_text, styles['Normal']))
-    elements.append(Spacer(1, 20))
-    
-    # Summary table
-    summary_data = [
-        ['Receitas', 'Despesas', 'Saldo'],
-        [f'R$ {total_income:.2f}', f'R$ {total_expense:.2f}', f'R$ {total_balance:.2f}']
-    ]
-    
-    summary_table = Table(summary_data)
-    summary_table.setStyle(TableStyle([
-        ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
-        ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-        ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-        ('FONTSIZE', (0, 0), (-1, 0), 14),
-        ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-        ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
-        ('FONTNAME', (0, 1), (-1, -1), 'Helvetica'),
-        ('FONTSIZE', (0, 1), (-1, -1), 12),
-        ('GRID', (0, 0), (-1, -1), 1, colors.black)
-    ]))
-    
-    elements.append(summary_table)
-    elements.append(Spacer(1, 30))
-    
-    # Monthly table
-    if sorted_monthly_totals:
-        # Table header
-        monthly_data = [['Mês', 'Receitas', 'Despesas', 'Saldo', 'Quantidade']]
-        
-        # Table data
-        for month_key, data in sorted_monthly_totals:
-            monthly_data.append([
-                data['name'],
-                f'R$ {data["income"]:.2f}',
-                f'R$ {data["expense"]:.2f}',
-                f'R$ {data["balance"]:.2f}',
-                str(data['count'])
-            ])
-        
-        monthly_table = Table(monthly_data)
-        monthly_table.setStyle(TableStyle([
-            ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
-            ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-            ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-            ('FONTSIZE', (0, 0), (-1, 0), 12),
-            ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-            ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
-            ('FONTNAME', (0, 1), (-1, -1), 'Helvetica'),
-            ('FONTSIZE', (0, 1), (-1, -1), 10),
-            ('GRID', (0, 0), (-1, -1), 1, colors.black)
-        ]))
-        
-        elements.append(Paragraph("Transações por Mês", styles['Heading2']))
-        elements.append(Spacer(1, 12))
-        elements.append(monthly_table)
-    
-    # Build PDF
-    doc.build(elements)
-    
-    # Return PDF
-    buffer.seek(0)
-    response = HttpResponse(buffer.getvalue(), content_type='application/pdf')
-    response['Content-Disposition'] = 'attachment; filename="relatorio_transacoes_mes.pdf"'
-    return response
 
 
 class CategoryListView(LoginRequiredMixin, ListView):
@@ -676,6 +133,16 @@ class CategoryListView(LoginRequiredMixin, ListView):
         return queryset
 
 
+def _category_name_taken(category):
+    """
+    O nome da categoria é único por usuário; o formulário não valida isso
+    porque o usuário não é um de seus campos
+    """
+    return Category.objects.filter(
+        user=category.user, name=category.name
+    ).exclude(pk=category.pk).exists()
+
+
 class CategoryCreateView(LoginRequiredMixin, CreateView):
     model = Category
     template_name = 'core/category_form.html'
@@ -684,6 +151,9 @@ class CategoryCreateView(LoginRequiredMixin, CreateView):
 
     def form_valid(self, form):
         form.instance.user = self.request.user
+        if _category_name_taken(form.instance):
+            form.add_error('name', 'Você já possui uma categoria com este nome.')
+            return self.form_invalid(form)
         messages.success(self.request, 'Categoria criada com sucesso!')
         return super().form_valid(form)
 
@@ -698,6 +168,9 @@ class CategoryUpdateView(LoginRequiredMixin, UpdateView):
         return Category.objects.filter(user=self.request.user)
 
     def form_valid(self, form):
+        if _category_name_taken(form.instance):
+            form.add_error('name', 'Você já possui uma categoria com este nome.')
+            return self.form_invalid(form)
         messages.success(self.request, 'Categoria atualizada com sucesso!')
         return super().form_valid(form)
 
@@ -732,7 +205,7 @@ class TransactionListView(LoginRequiredMixin, ListView):
         # Pesquisa por descrição
         search = self.request.GET.get('search')
         if search:
-            queryset = queryset.filter(description__icontains=search)
+            queryset = search_transactions(queryset, search)
             
         # Filtra por intervalo de datas
         start_date = self.request.GET.get('start_date')
@@ -745,12 +218,25 @@ class TransactionListView(LoginRequiredMixin, ListView):
         # Filtra por tipo (receita/despesa)
         transaction_type = self.request.GET.get('type')
         if transaction_type:
-            if transaction_type == 'INCOME':
-                queryset = queryset.filter(items__category__type='INCOME')
-            elif transaction_type == 'EXPENSE':
-                queryset = queryset.filter(items__category__type='EXPENSE')
-                
-        return queryset.distinct()
+            if transaction_type in (Category.INCOME, Category.EXPENSE):
+                # EXISTS em vez de JOIN + DISTINCT: cada transação aparece uma vez
+                queryset = queryset.filter(Exists(TransactionItem.objects.filter(
+                    transaction=OuterRef('pk'),
+                    entry_type=transaction_type,
+                )))
+
+        return queryset
+
+    def paginate_queryset(self, queryset, page_size):
+        """
+        Paginação por cursor em (data, id), sem OFFSET nem COUNT
+        """
+        paginator = KeysetPaginator(queryset, page_size, fields=('date', 'id'))
+        try:
+            page = paginator.page(self.request.GET.get('cursor'))
+        except InvalidCursor:
+            raise Http404('Cursor de paginação inválido')
+        return paginator, page, page.object_list, page.has_next or page.has_previous
 
 
 class TransactionCreateView(LoginRequiredMixin, CreateView):
@@ -779,25 +265,16 @@ class TransactionCreateView(LoginRequiredMixin, CreateView):
                 return self.form_invalid(form)
             
             # Salva transação e itens
-            with transaction.atomic():
+            with transaction.atomic(), deferred_totals():
                 self.object = form.save(commit=False)
                 self.object.owner = self.request.user
                 self.object.save()
                 
-                # Salva formset
+                # Salva formset; o valor total é recalculado em uma única
+                # UPDATE ao sair de deferred_totals()
                 formset.instance = self.object
                 formset.save()
                 
-                # Calcula o valor total
-                total = 0
-                for item in self.object.items.all():
-                    if item.category.type == 'INCOME':
-                        total += item.amount
-                    else:  # EXPENSE
-                        total -= item.amount
-                self.object.total_amount = total
-                self.object.save()
-                
                 messages.success(self.request, 'Transação criada com sucesso!')
                 return redirect('transaction_list')
         else:
@@ -833,23 +310,14 @@ class TransactionUpdateView(LoginRequiredMixin, UpdateView):
                 return self.form_invalid(form)
             
             # Salva transação e itens
-            with transaction.atomic():
+            with transaction.atomic(), deferred_totals():
                 self.object = form.save()
                 
-                # Salva formset
+                # Salva formset; o valor total é recalculado em uma única
+                # UPDATE ao sair de deferred_totals()
                 formset.instance = self.object
                 formset.save()
                 
-                # Calcula o valor total
-                total = 0
-                for item in self.object.items.all():
-                    if item.category.type == 'INCOME':
-                        total += item.amount
-                    else:  # EXPENSE
-                        total -= item.amount
-                self.object.total_amount = total
-                self.object.save()
-                
                 messages.success(self.request, 'Transação atualizada com sucesso!')
                 return redirect('transaction_list')
         else:
@@ -862,7 +330,9 @@ class TransactionDetailView(LoginRequiredMixin, DetailView):
     context_object_name = 'transaction'
 
     def get_queryset(self):
-        return Transaction.objects.filter(owner=self.request.user)
+        return Transaction.objects.filter(owner=self.request.user).prefetch_related(
+            Prefetch('items', queryset=TransactionItem.objects.select_related('category'))
+        )
 
 
 class TransactionDeleteView(LoginRequiredMixin, DeleteView):
@@ -878,34 +348,124 @@ class TransactionDeleteView(LoginRequiredMixin, DeleteView):
         return super().delete(request, *args, **kwargs)
 
 
+@login_required
+def transaction_import(request):
+    """
+    Importação de extrato bancário (CSV ou OFX) enviado pelo usuário
+    """
+    if request.method == 'POST':
+        form = TransactionImportForm(request.POST, request.FILES, user=request.user)
+        if form.is_valid():
+            upload = form.cleaned_data['file']
+            import_format = form.cleaned_data['format'] or detect_format(upload.name)
+            try:
+                result = import_transactions(
+                    request.user,
+                    statement_rows(upload.file, import_format),
+                    income_category=form.cleaned_data['income_category'],
+                    expense_category=form.cleaned_data['expense_category'],
+                )
+            except (StatementError, UnicodeDecodeError) as exc:
+                form.add_error('file', f'Não foi possível ler o extrato: {exc}')
+            else:
+                messages.success(request, f"{result['created']} transações importadas com sucesso!")
+                for line, message in result['errors']:
+                    messages.warning(request, f'Linha {line}: {message}')
+                if result['error_count'] > len(result['errors']):
+                    messages.warning(
+                        request,
+                        f"... e mais {result['error_count'] - len(result['errors'])} linhas com erro."
+                    )
+                return redirect('transaction_list')
+    else:
+        form = TransactionImportForm(user=request.user)
+
+    return render(request, 'core/transaction_import.html', {'form': form})
+
+
+def _dashboard_month(params, today):
+    """
+    Mês pedido em ?year=&month=, ou o mês atual se ausente ou inválido
+    """
+    try:
+        year = int(params.get('year', today.year))
+        month = int(params.get('month', today.month))
+    except ValueError:
+        return today.year, today.month
+    if not (1 <= year <= 9999 and 1 <= month <= 12):
+        return today.year, today.month
+    return year, month
+
+
 @login_required
 def dashboard(request):
-    # Obtém o mês e ano atual
-    today = timezone.now().date()
-    year = today.year
-    month = today.month
-    
     # Nomes dos meses em português
     portuguese_month_names = [
         '', 'Janeiro', 'Fevereiro', 'Março', 'Abril', 'Maio', 'Junho',
         'Julho', 'Agosto', 'Setembro', 'Outubro', 'Novembro', 'Dezembro'
     ]
     
-    # Obtém os dados do resumo
-    summary = get_month_summary(request.user, year, month)
-    
-    # Obtém os totais por categoria
-    category_totals = get_category_totals(request.user, year, month)
-    
-    # Obtém a série de saldo diário
-    daily_balance = get_daily_balance_series(request.user, year, month)
+    # Intervalo arbitrário em ?start=&end=; sem ele, um mês (o atual por padrão)
+    start_date = parse_filter_date(request.GET.get('start'))
+    end_date = parse_filter_date(request.GET.get('end'))
+    if start_date and end_date and start_date <= end_date:
+        dashboard_data = get_range_dashboard_data(request.user, start_date, end_date)
+        context = {
+            'range_mode': True,
+            'start_date': start_date,
+            'end_date': end_date,
+            'balance_series': dashboard_data['balance_series'],
+        }
+    else:
+        year, month = _dashboard_month(request.GET, timezone.now().date())
+        
+        # Obtém resumo, totais por categoria e saldo diário em uma única consulta
+        dashboard_data = get_dashboard_data(request.user, year, month)
+        
+        # Os meses vizinhos ficam em cache para a navegação anterior/próximo
+        previous_month = shift_month(year, month, -1)
+        next_month = shift_month(year, month, 1)
+        prefetch_dashboard_months(request.user, [
+            neighbour for neighbour in (previous_month, next_month) if 1 <= neighbour[0] <= 9999
+        ])
+        
+        context = {
+            'range_mode': False,
+            'month_name': portuguese_month_names[month],
+            'year': year,
+            'previous_month': previous_month,
+            'next_month': next_month,
+            # Um mês tem no máximo 31 pontos: a série diária vai sem redução
+            'balance_series': columnar(dashboard_data['daily_balance']),
+        }
     
-    context = {
-        'summary': summary,
-        'category_totals': category_totals,
-        'daily_balance': daily_balance,
-        'month_name': portuguese_month_names[month],
-        'year': year,
-    }
+    context.update({
+        'summary': dashboard_data['summary'],
+        'category_totals': category_columns(dashboard_data['category_totals']),
+    })
     
-    return render(request, 'core/dashboard.html', context)
\ No newline at end of file
+    return render(request, 'core/dashboard.html', context)
+
+
+@login_required
+def dashboard_series(request):
+    """
+    Série de saldo em JSON colunar para gráficos: ?start=&end= (padrão: mês
+    atual), ?resolution=day|week|month (padrão: pelo tamanho do intervalo) e
+    ?points= (padrão: SERIES_MAX_POINTS)
+    """
+    start_date = parse_filter_date(request.GET.get('start'))
+    end_date = parse_filter_date(request.GET.get('end'))
+    if not (start_date and end_date and start_date <= end_date):
+        today = timezone.now().date()
+        start_date, end_date = month_bounds(today.year, today.month)
+
+    resolution = request.GET.get('resolution')
+    if resolution not in RESOLUTIONS:
+        resolution = None
+    try:
+        max_points = min(max(int(request.GET.get('points', SERIES_MAX_POINTS)), 3), SERIES_POINTS_LIMIT)
+    except ValueError:
+        max_points = SERIES_MAX_POINTS
+
+    return JsonResponse(balance_series(request.user, start_date, end_date, resolution, max_points))
\ No newline at end of file
@@ -12,6 +12,7 @@ https://docs.djangoproject.com/en/5.2/ref/settings/
 
 from pathlib import Path
 import os
+import sys
 
 # Constrói caminhos dentro do projeto assim: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -42,12 +43,14 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'core.middleware.TimingMiddleware',  # Server-Timing e log de tempos por requisição
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.locale.LocaleMiddleware',  # Para i18n
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'core.middleware.ProfilerMiddleware',  # ?_profile=1 para usuários da equipe
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -56,7 +59,7 @@ ROOT_URLCONF = 'finance_control.urls'
 
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        'BACKEND': 'core.timing.TimedDjangoTemplates',  # DjangoTemplates com medição de tempo
         'DIRS': [os.path.join(BASE_DIR, 'templates')],  # Adiciona diretório de templates
         'APP_DIRS': True,
         'OPTIONS': {
@@ -83,6 +86,104 @@ DATABASES = {
 }
 
 
+# Cache
+# https://docs.djangoproject.com/en/5.2/topics/cache/
+# O padrão é um cache em disco (FINANCE_CACHE_DIR, padrão: cache/), que todos os
+# workers do servidor enxergam: a invalidação por usuário (core.cache) só vale
+# para outros processos se o contador de versão estiver num cache compartilhado.
+# FINANCE_CACHE_LOCMEM=1 usa o cache em memória, só para desenvolvimento com um
+# único processo, e com validade curta. Os testes sempre usam o cache em memória.
+
+TESTING = 'test' in sys.argv[1:2]
+
+if TESTING or os.environ.get('FINANCE_CACHE_LOCMEM'):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'finance-control',
+        }
+    }
+    # Tempo de vida (segundos) dos resultados de dashboard e relatórios em cache
+    FINANCE_CACHE_TIMEOUT = 60
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': os.environ.get('FINANCE_CACHE_DIR', BASE_DIR / 'cache'),
+            'OPTIONS': {
+                'MAX_ENTRIES': 5000,
+            },
+        }
+    }
+    FINANCE_CACHE_TIMEOUT = 60 * 60
+
+
+# Relatórios em segundo plano
+# Com REPORT_JOBS_IN_PROCESS = False as tarefas ficam pendentes até serem
+# processadas pelo comando `python manage.py run_report_jobs`.
+
+REPORT_JOBS_DIR = BASE_DIR / 'report_jobs'
+REPORT_JOBS_IN_PROCESS = True
+REPORT_JOB_WORKERS = 2
+
+
+# Dashboard
+# Ao exibir um mês, os meses vizinhos são calculados em uma thread e guardados
+# em cache, para que a navegação anterior/próximo não espere pelo banco.
+
+DASHBOARD_PREFETCH = True
+DASHBOARD_PREFETCH_WORKERS = 1
+
+
+# Métricas (/metrics)
+# Com vários workers, defina FINANCE_METRICS_DIR: cada processo grava suas
+# métricas ali e a exposição soma as de todos. Limpe o diretório ao reiniciar
+# o servidor. FINANCE_METRICS_TOKEN, se definido, protege o endpoint.
+
+METRICS_DIR = os.environ.get('FINANCE_METRICS_DIR')
+METRICS_TOKEN = os.environ.get('FINANCE_METRICS_TOKEN')
+
+
+# Consultas lentas
+# Consultas mais lentas que SLOW_QUERY_THRESHOLD_MS vão para SLOW_QUERY_LOG
+# (com rotação); `python manage.py slow_queries` resume o log.
+# FINANCE_SLOW_QUERY_MS=off desativa o registro.
+
+_slow_query_ms = os.environ.get('FINANCE_SLOW_QUERY_MS', '100')
+SLOW_QUERY_THRESHOLD_MS = None if _slow_query_ms == 'off' else float(_slow_query_ms)
+SLOW_QUERY_LOG = Path(os.environ.get('FINANCE_SLOW_QUERY_LOG', BASE_DIR / 'logs' / 'slow_queries.log'))
+SLOW_QUERY_LOG_MAX_BYTES = 10 * 1024 * 1024
+SLOW_QUERY_LOG_BACKUPS = 5
+
+
+# Perfis de requisição (?_profile=1, apenas usuários da equipe)
+
+PROFILES_DIR = Path(os.environ.get('FINANCE_PROFILES_DIR', BASE_DIR / 'profiles'))
+
+
+# Log
+# https://docs.djangoproject.com/en/5.2/topics/logging/
+# core.timing registra uma linha JSON por requisição (tempo total, SQL,
+# templates, PDF). Defina FINANCE_TIMING_LOG_LEVEL=INFO para ativá-la.
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {
+            'class': 'logging.StreamHandler',
+        },
+    },
+    'loggers': {
+        'core.timing': {
+            'handlers': ['console'],
+            'level': os.environ.get('FINANCE_TIMING_LOG_LEVEL', 'WARNING'),
+            'propagate': False,
+        },
+    },
+}
+
+
 # Validação de senha
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
 